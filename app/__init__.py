@@ -5,13 +5,13 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_swagger_ui import get_swaggerui_blueprint
-from config import Config
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
 
-# Load environment variables from .env file
+# Load environment variables from .env file (before config reads them)
 load_dotenv()
 
+from config import Config
+
 # Initialize extensions without attaching them to an app yet
 db = SQLAlchemy()
 migrate = Migrate()
@@ -53,35 +53,59 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
 
 
+    # Sized connection pools report checkout waits and in-use counts to /metrics
+    from .utils.instrumentation import instrumented_engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = instrumented_engine_options(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+
     # Initialize extensions with the app
     db.init_app(app)
     migrate.init_app(app, db)
 
+    from .utils.api_key_cache import client_cache
+    from .utils.instrumentation import instrumentation
+    from .services.plan_cache_service import plan_cache
+    from .services.plan_job_service import plan_jobs
+    from .services.llm_client import llm_client
+    from .services.scheduler_service import job_scheduler
+    from .services.nutrition_rollup_service import nutrition_rollup
+    client_cache.init_app(app)
+    instrumentation.init_app(app)
+    llm_client.init_app(app)
+    plan_cache.init_app(app)
+    plan_jobs.init_app(app)
+    job_scheduler.init_app(app)
+    nutrition_rollup.init_app(app)
+
     # Register Blueprints for all your API routes
     from .api.auth_routes import auth_bp
     from .api.diet_routes import diet_bp
     from .api.workout_routes import workout_bp
     from .api.progress_routes import progress_bp
     from .api.reward_routes import reward_bp
+    from .api.import_routes import import_bp
+    from .api.export_routes import export_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(diet_bp, url_prefix='/api/diet')
     app.register_blueprint(workout_bp, url_prefix='/api/workout')
     app.register_blueprint(progress_bp, url_prefix='/api/progress')
     app.register_blueprint(reward_bp, url_prefix='/api/reward')
+    app.register_blueprint(import_bp, url_prefix='/api/import')
+    app.register_blueprint(export_bp, url_prefix='/api/export')
 
     # Register the Swagger UI blueprint with the app
     app.register_blueprint(swaggerui_blueprint)
 
     # --- Set up and start the background scheduler ---
-    # Avoid running the scheduler during tests
-    if not app.config.get("TESTING"):
-        from .services.adaptive_planner_service import run_weekly_adaptive_planning
-
-        scheduler = BackgroundScheduler(daemon=True)
-        # Schedule the job to run every Sunday at 2 AM
-        scheduler.add_job(run_weekly_adaptive_planning, 'cron', day_of_week='sun', hour=2)
-        scheduler.start()
+    from .services.adaptive_planner_service import run_weekly_adaptive_planning
+
+    # Schedule the job to run every Sunday at 2 AM. Every process starts a
+    # scheduler, but a database lease makes sure only one of them runs it.
+    job_scheduler.register('weekly_adaptive_planning', run_weekly_adaptive_planning, day_of_week='sun', hour=2)
+
+    # Avoid running the scheduler during tests (jobs can still be run with `flask jobs run`)
+    if not app.config.get("TESTING") and app.config.get("SCHEDULER_ENABLED", True):
+        job_scheduler.start()
     # ---------------------------------------------
    
     from app import models
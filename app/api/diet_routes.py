@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app, g
-from app.models import db, User, DietLog
+from flask import Blueprint, request, jsonify, current_app, g, url_for
+from app.models import db, User, DietLog, DietPlan, PlanJob
 from app.services.diet_planner import DietPlannerService
+from app.services.plan_job_service import plan_jobs
+from app.services.llm_client import llm_client
+from app.services.rule_based_planner import llm_required
 from app.services.reporting_service import ReportingService
-import google.generativeai as genai
-from datetime import datetime
+from app.services.bulk_logging_service import BulkLoggingService
+from datetime import datetime, date
 from pydantic import ValidationError
 from app.schemas.diet_schemas import DietLogSchema, GenerateDietPlanSchema
 from app.utils.decorators import require_api_key # 1. IMPORT THE DECORATOR
+from app.utils.pagination import paginate_by_date, PaginationError
+from app.utils.timestamps import utc_now
+from app.utils.energy import missing_measurements, IncompleteProfileError
 
 # Create a Blueprint for diet routes
 diet_bp = Blueprint('diet_bp', __name__)
@@ -25,23 +31,88 @@ def generate_diet_plan():
         description="User not found or does not belong to this client."
     )
     
-    try:
-        gemini_api_key = current_app.config.get('GEMINI_API_KEY')
-        if not gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not configured in .env file.")
-        genai.configure(api_key=gemini_api_key)
-    except Exception as e:
-        return jsonify({"error": "API Key configuration error", "details": str(e)}), 500
+    # The calorie target needs the body measurements
+    missing = missing_measurements(user)
+    if missing:
+        return jsonify({"error": "Incomplete profile", "details": f"Set {', '.join(missing)} on the user first."}), 400
+
+    # The shared LLM client is set up once at startup; just make sure it has a key
+    if llm_required() and not llm_client.is_configured:
+        return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured in .env file."}), 500
 
     planner = DietPlannerService(user=user, form_data=data.dict())
-    result = planner.generate_plan()
+    result = planner.generate_plan(use_cache=not data.bypass_cache)
 
     if result.get("success"):
-        return jsonify(result['plan']), 200
+        new_plan = DietPlan(
+            client_id=g.client.id, # 4. ASSOCIATE PLAN WITH THE CLIENT
+            author=user,
+            generated_plan=result['plan']
+        )
+        db.session.add(new_plan)
+        db.session.commit()
+        response = jsonify(result['plan'])
+        response.headers['X-Plan-Cache'] = 'HIT' if result.get('cached') else 'MISS'
+        response.headers['X-Plan-Source'] = result.get('source', 'llm')
+        return response, 200
     else:
         return jsonify({"error": result.get("error")}), 500
 
 
+@diet_bp.route('/<int:user_id>/plan/latest', methods=['GET'])
+@require_api_key # 2. PROTECT THE ROUTE
+def get_latest_diet_plan(user_id):
+    """Returns the most recently saved diet plan without generating a new one."""
+    # 3. SCOPING BY CLIENT ALSO VERIFIES THE USER BELONGS TO IT (one indexed lookup)
+    plan = DietPlan.query.filter_by(client_id=g.client.id, user_id=user_id).order_by(
+        DietPlan.created_at.desc()
+    ).first_or_404(description="No diet plan found for this user.")
+    return jsonify(plan.to_dict()), 200
+
+
+@diet_bp.route('/plan-jobs', methods=['POST'])
+@require_api_key # 2. PROTECT THE ROUTE
+def create_diet_plan_job():
+    """
+    Queues diet plan generation in the background and returns immediately.
+    Poll the returned status_url for the result.
+    """
+    raw_data = request.get_json()
+    try:
+        data = GenerateDietPlanSchema(**raw_data)
+    except ValidationError as e:
+        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+
+    # 3. VERIFY USER BELONGS TO THE AUTHENTICATED CLIENT
+    user = User.query.filter_by(id=data.user_id, client_id=g.client.id).first_or_404(
+        description="User not found or does not belong to this client."
+    )
+
+    # The calorie target needs the body measurements
+    missing = missing_measurements(user)
+    if missing:
+        return jsonify({"error": "Incomplete profile", "details": f"Set {', '.join(missing)} on the user first."}), 400
+
+    if llm_required() and not llm_client.is_configured:
+        return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured in .env file."}), 500
+
+    job = plan_jobs.submit('diet', user, g.client.id, data.model_dump())
+    status_url = url_for('diet_bp.get_diet_plan_job', job_id=job.id)
+    return jsonify({"job_id": job.id, "status": job.status, "status_url": status_url}), 202, {"Location": status_url}
+
+
+@diet_bp.route('/plan-jobs/<job_id>', methods=['GET'])
+@require_api_key # 2. PROTECT THE ROUTE
+def get_diet_plan_job(job_id):
+    # 3. ONLY RETURN JOBS THAT BELONG TO THE AUTHENTICATED CLIENT
+    job = PlanJob.query.filter_by(id=job_id, kind='diet', client_id=g.client.id).first_or_404(
+        description="Plan job not found or does not belong to this client."
+    )
+    # A job orphaned by a worker restart is reported as failed instead of pending forever
+    plan_jobs.fail_if_stale(job)
+    return jsonify(job.to_dict()), 200
+
+
 @diet_bp.route('/log', methods=['POST'])
 @require_api_key # 2. PROTECT THE ROUTE
 def log_meal():
@@ -49,7 +120,7 @@ def log_meal():
     try:
         data = DietLogSchema(**raw_data)
     except ValidationError as e:
-        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+        return jsonify({"error": "Invalid input", "details": e.errors(include_context=False)}), 400
     
     # 3. VERIFY USER BELONGS TO THE AUTHENTICATED CLIENT
     user = User.query.filter_by(id=data.user_id, client_id=g.client.id).first_or_404(
@@ -66,7 +137,8 @@ def log_meal():
             calories=data.calories,
             protein_g=macros.get('protein_g'),
             carbs_g=macros.get('carbs_g'),
-            fat_g=macros.get('fat_g')
+            fat_g=macros.get('fat_g'),
+            date=data.date or utc_now()
         )
         db.session.add(new_log)
         db.session.commit()
@@ -76,6 +148,29 @@ def log_meal():
         return jsonify({"error": "Failed to log meal.", "details": str(e)}), 500
 
 
+@diet_bp.route('/log/bulk', methods=['POST'])
+@require_api_key # 2. PROTECT THE ROUTE
+def log_meals_bulk():
+    raw_data = request.get_json(silent=True)
+    items = raw_data.get('items') if isinstance(raw_data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Invalid input", "details": "Expected a non-empty 'items' list of meal logs."}), 400
+
+    max_items = current_app.config.get('BULK_LOG_MAX_ITEMS', 500)
+    if len(items) > max_items:
+        return jsonify({"error": "Invalid input", "details": f"At most {max_items} items can be logged per request."}), 400
+
+    # 3. EVERY ITEM'S USER IS CHECKED AGAINST THE AUTHENTICATED CLIENT IN ONE QUERY
+    service = BulkLoggingService(g.client.id)
+    try:
+        created, errors = service.log_meals(items)
+    except Exception as e:
+        return jsonify({"error": "Failed to log meals.", "details": str(e)}), 500
+
+    response = {"created_count": len(created), "error_count": len(errors), "logs": created, "errors": errors}
+    return jsonify(response), service.status_code(created, errors)
+
+
 @diet_bp.route('/<int:user_id>/logs', methods=['GET'])
 @require_api_key # 2. PROTECT THE ROUTE
 def get_diet_logs(user_id):
@@ -83,8 +178,13 @@ def get_diet_logs(user_id):
     user = User.query.filter_by(id=user_id, client_id=g.client.id).first_or_404(
         description="User not found or does not belong to this client."
     )
-    logs = DietLog.query.filter_by(user_id=user.id, client_id=g.client.id).order_by(DietLog.date.desc()).all()
-    return jsonify([log.to_dict() for log in logs]), 200
+    # 4. RETURN ONE PAGE AT A TIME, NEWEST FIRST
+    query = DietLog.query.filter_by(user_id=user.id, client_id=g.client.id)
+    try:
+        logs, next_cursor = paginate_by_date(query, DietLog, request.args, descending=True)
+    except PaginationError as e:
+        return jsonify({"error": "Invalid pagination parameters", "details": str(e)}), 400
+    return jsonify({"items": [log.to_dict() for log in logs], "next_cursor": next_cursor}), 200
 
 @diet_bp.route('/<int:user_id>/weekly-summary', methods=['GET'])
 @require_api_key # 2. PROTECT THE ROUTE
@@ -93,10 +193,20 @@ def get_diet_summary(user_id):
     User.query.filter_by(id=user_id, client_id=g.client.id).first_or_404(
         description="User not found or does not belong to this client."
     )
+    # 4. READ THE WINDOW: ?days=N (default 7) or ?from=YYYY-MM-DD&to=YYYY-MM-DD
+    try:
+        days = int(request.args.get('days', 7))
+        date_from = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+        ReportingService.resolve_summary_window(days, date_from, date_to)
+    except ValueError as e:
+        return jsonify({"error": "Invalid summary window", "details": str(e)}), 400
+
     try:
-        # Note: The ReportingService might also need to be made client-aware in the future
         reporter = ReportingService(user_id)
-        summary = reporter.get_weekly_diet_summary()
+        summary = reporter.get_weekly_diet_summary(days=days, date_from=date_from, date_to=date_to)
         return jsonify(summary), 200
+    except IncompleteProfileError as e:
+        return jsonify({"error": "Incomplete profile", "details": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Failed to generate diet summary", "details": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify, current_app, g, Response, stream_with_context
+from app.services.export_service import ExportService, EXPORT_TYPES
+from app.utils.decorators import require_api_key # 1. IMPORT THE DECORATOR
+
+export_bp = Blueprint('export_bp', __name__)
+
+
+@export_bp.route('', methods=['GET'])
+@require_api_key # 2. PROTECT THE ROUTE
+def export_client_data():
+    types = None
+    if request.args.get('types'):
+        types = {value.strip() for value in request.args['types'].split(',') if value.strip()}
+        unknown = types - set(EXPORT_TYPES)
+        if unknown:
+            return jsonify({"error": "Unknown export types", "details": f"{', '.join(sorted(unknown))}; expected any of: {', '.join(EXPORT_TYPES)}."}), 400
+
+    compress = request.accept_encodings['gzip'] > 0 or request.args.get('gzip') == 'true'
+
+    # 3. ONLY EXPORT ROWS THAT BELONG TO THE AUTHENTICATED CLIENT
+    service = ExportService(g.client.id, yield_per=current_app.config.get('EXPORT_YIELD_PER', 1000))
+    body = stream_with_context(service.iter_chunks(types, compress=compress))
+
+    filename = f"export-{g.client.id}-{datetime.now(timezone.utc):%Y%m%d}.ndjson"
+    response = Response(body, mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
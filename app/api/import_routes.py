@@ -0,0 +1,41 @@
+import io
+from flask import Blueprint, request, jsonify, current_app, g
+from app.services.import_service import ImportService, supported_log_types
+from app.utils.decorators import require_api_key # 1. IMPORT THE DECORATOR
+
+import_bp = Blueprint('import_bp', __name__)
+
+# Content types accepted for each import format
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines')
+CSV_MIMETYPES = ('text/csv',)
+
+
+@import_bp.route('/<log_type>', methods=['POST'])
+@require_api_key # 2. PROTECT THE ROUTE
+def import_logs(log_type):
+    if log_type not in supported_log_types():
+        return jsonify({"error": "Unknown log type", "details": f"Expected one of: {', '.join(supported_log_types())}."}), 404
+
+    if request.mimetype in NDJSON_MIMETYPES:
+        fmt = 'ndjson'
+    elif request.mimetype in CSV_MIMETYPES:
+        fmt = 'csv'
+    else:
+        return jsonify({"error": "Unsupported format", "details": "Send application/x-ndjson or text/csv."}), 415
+
+    # 3. EVERY RECORD'S USER IS CHECKED AGAINST THE AUTHENTICATED CLIENT, ONE QUERY PER BATCH
+    service = ImportService(
+        g.client.id,
+        batch_size=current_app.config.get('IMPORT_BATCH_SIZE', 1000),
+        max_errors=current_app.config.get('IMPORT_MAX_ERRORS', 100)
+    )
+    # Read the body as it arrives instead of loading the whole file into memory
+    text_stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    summary = service.run(log_type, fmt, text_stream)
+
+    if "failure" in summary:
+        return jsonify({"error": "Import stopped part way.", **summary}), 500
+    if summary["processed"] == 0:
+        return jsonify({"error": "Invalid input", "details": "The import body is empty."}), 400
+    status = 201 if not summary["error_count"] else (207 if summary["created_count"] else 400)
+    return jsonify(summary), status
@@ -5,6 +5,9 @@ from datetime import datetime
 from pydantic import ValidationError
 from app.schemas.progress_schemas import WeightLogSchema, MeasurementLogSchema
 from app.utils.decorators import require_api_key # 1. IMPORT THE DECORATOR
+from app.utils.pagination import paginate_by_date, PaginationError
+from app.utils.timestamps import utc_now
+from app.utils.energy import IncompleteProfileError
 
 progress_bp = Blueprint('progress_bp', __name__)
 
@@ -16,10 +19,11 @@ def get_weekly_report(user_id):
         description="User not found or does not belong to this client."
     )
     try:
-        # Note: The ReportingService might also need to be made client-aware
         reporting_service = ReportingService(user_id)
         report = reporting_service.get_weekly_report()
         return jsonify(report), 200
+    except IncompleteProfileError as e:
+        return jsonify({"error": "Incomplete profile", "details": str(e)}), 400
     except Exception as e:
         return jsonify({"error": "Failed to generate report", "details": str(e)}), 500
 
@@ -30,7 +34,7 @@ def log_weight():
     try:
         data = WeightLogSchema(**raw_data)
     except ValidationError as e:
-        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+        return jsonify({"error": "Invalid input", "details": e.errors(include_context=False)}), 400
 
     # 3. VERIFY USER BELONGS TO THE AUTHENTICATED CLIENT
     user = User.query.filter_by(id=data.user_id, client_id=g.client.id).first_or_404(
@@ -42,7 +46,8 @@ def log_weight():
         new_entry = WeightEntry(
             client_id=g.client.id,
             user_id=user.id,  #<-- Use user_id directly
-            weight_kg=data.weight_kg
+            weight_kg=data.weight_kg,
+            date=data.date or utc_now()
         )
         db.session.add(new_entry)
         db.session.commit()
@@ -58,7 +63,7 @@ def log_measurements():
     try:
         data = MeasurementLogSchema(**raw_data)
     except ValidationError as e:
-        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+        return jsonify({"error": "Invalid input", "details": e.errors(include_context=False)}), 400
 
     # 3. VERIFY USER BELONGS TO THE AUTHENTICATED CLIENT
     user = User.query.filter_by(id=data.user_id, client_id=g.client.id).first_or_404(
@@ -72,7 +77,8 @@ def log_measurements():
             waist_cm=data.waist_cm,
             chest_cm=data.chest_cm,
             arms_cm=data.arms_cm,
-            hips_cm=data.hips_cm
+            hips_cm=data.hips_cm,
+            date=data.date or utc_now()
         )
         db.session.add(new_log)
         db.session.commit()
@@ -89,6 +95,10 @@ def get_weight_history(user_id):
     user = User.query.filter_by(id=user_id, client_id=g.client.id).first_or_404(
         description="User not found or does not belong to this client."
     )
-    # 4. ENSURE WE ONLY QUERY LOGS FOR THIS CLIENT
-    history = WeightEntry.query.filter_by(user_id=user.id, client_id=g.client.id).order_by(WeightEntry.date.asc()).all()
-    return jsonify([entry.to_dict() for entry in history]), 200
\ No newline at end of file
+    # 4. ENSURE WE ONLY QUERY LOGS FOR THIS CLIENT, ONE PAGE AT A TIME (OLDEST FIRST)
+    query = WeightEntry.query.filter_by(user_id=user.id, client_id=g.client.id)
+    try:
+        history, next_cursor = paginate_by_date(query, WeightEntry, request.args, descending=False)
+    except PaginationError as e:
+        return jsonify({"error": "Invalid pagination parameters", "details": str(e)}), 400
+    return jsonify({"items": [entry.to_dict() for entry in history], "next_cursor": next_cursor}), 200
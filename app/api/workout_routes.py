@@ -1,11 +1,17 @@
-from flask import Blueprint, request, jsonify, current_app, g
-from app.models import db, User, WorkoutLog, ExerciseEntry, WorkoutPlan
+from flask import Blueprint, request, jsonify, current_app, g, url_for
+from app.models import db, User, WorkoutLog, ExerciseEntry, WorkoutPlan, PlanJob
 from app.services.workout_planner_service import WorkoutPlannerService
-import google.generativeai as genai
+from app.services.plan_job_service import plan_jobs
+from app.services.llm_client import llm_client
+from app.services.rule_based_planner import llm_required
+from app.services.bulk_logging_service import BulkLoggingService
 from datetime import datetime
 from pydantic import ValidationError
+from sqlalchemy.orm import selectinload
 from app.schemas.workout_schemas import GenerateWorkoutPlanSchema, WorkoutLogSchema
 from app.utils.decorators import require_api_key # 1. IMPORT THE DECORATOR
+from app.utils.pagination import paginate_by_date, PaginationError
+from app.utils.timestamps import utc_now
 
 workout_bp = Blueprint('workout_bp', __name__)
 
@@ -23,16 +29,12 @@ def generate_workout_plan():
         description="User not found or does not belong to this client."
     )
     
-    try:
-        gemini_api_key = current_app.config.get('GEMINI_API_KEY')
-        if not gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not configured.")
-        genai.configure(api_key=gemini_api_key)
-    except Exception as e:
-        return jsonify({"error": "API Key configuration error", "details": str(e)}), 500
+    # The shared LLM client is set up once at startup; just make sure it has a key
+    if llm_required() and not llm_client.is_configured:
+        return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured."}), 500
 
     planner = WorkoutPlannerService(user=user, form_data=data.dict())
-    result = planner.generate_plan()
+    result = planner.generate_plan(use_cache=not data.bypass_cache)
 
     if result.get("success"):
         new_plan = WorkoutPlan(
@@ -42,11 +44,63 @@ def generate_workout_plan():
         )
         db.session.add(new_plan)
         db.session.commit()
-        return jsonify(result['plan']), 200
+        response = jsonify(result['plan'])
+        response.headers['X-Plan-Cache'] = 'HIT' if result.get('cached') else 'MISS'
+        response.headers['X-Plan-Source'] = result.get('source', 'llm')
+        return response, 200
     else:
         return jsonify({"error": result.get("error")}), 500
 
 
+@workout_bp.route('/<int:user_id>/plan/latest', methods=['GET'])
+@require_api_key # 2. PROTECT THE ROUTE
+def get_latest_workout_plan(user_id):
+    """Returns the most recently saved workout plan without generating a new one."""
+    # 3. SCOPING BY CLIENT ALSO VERIFIES THE USER BELONGS TO IT (one indexed lookup)
+    plan = WorkoutPlan.query.filter_by(client_id=g.client.id, user_id=user_id).order_by(
+        WorkoutPlan.created_at.desc()
+    ).first_or_404(description="No workout plan found for this user.")
+    return jsonify(plan.to_dict()), 200
+
+
+@workout_bp.route('/plan-jobs', methods=['POST'])
+@require_api_key # 2. PROTECT THE ROUTE
+def create_workout_plan_job():
+    """
+    Queues workout plan generation in the background and returns immediately.
+    Poll the returned status_url for the result.
+    """
+    raw_data = request.get_json()
+    try:
+        data = GenerateWorkoutPlanSchema(**raw_data)
+    except ValidationError as e:
+        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+
+    # 3. VERIFY USER BELONGS TO THE AUTHENTICATED CLIENT
+    user = User.query.filter_by(id=data.user_id, client_id=g.client.id).first_or_404(
+        description="User not found or does not belong to this client."
+    )
+
+    if llm_required() and not llm_client.is_configured:
+        return jsonify({"error": "API Key configuration error", "details": "GEMINI_API_KEY not configured."}), 500
+
+    job = plan_jobs.submit('workout', user, g.client.id, data.model_dump())
+    status_url = url_for('workout_bp.get_workout_plan_job', job_id=job.id)
+    return jsonify({"job_id": job.id, "status": job.status, "status_url": status_url}), 202, {"Location": status_url}
+
+
+@workout_bp.route('/plan-jobs/<job_id>', methods=['GET'])
+@require_api_key # 2. PROTECT THE ROUTE
+def get_workout_plan_job(job_id):
+    # 3. ONLY RETURN JOBS THAT BELONG TO THE AUTHENTICATED CLIENT
+    job = PlanJob.query.filter_by(id=job_id, kind='workout', client_id=g.client.id).first_or_404(
+        description="Plan job not found or does not belong to this client."
+    )
+    # A job orphaned by a worker restart is reported as failed instead of pending forever
+    plan_jobs.fail_if_stale(job)
+    return jsonify(job.to_dict()), 200
+
+
 @workout_bp.route('/log', methods=['POST'])
 @require_api_key # 2. PROTECT THE ROUTE
 def log_workout():
@@ -54,7 +108,7 @@ def log_workout():
     try:
         data = WorkoutLogSchema(**raw_data)
     except ValidationError as e:
-        return jsonify({"error": "Invalid input", "details": e.errors()}), 400
+        return jsonify({"error": "Invalid input", "details": e.errors(include_context=False)}), 400
 
     # 3. VERIFY USER BELONGS TO THE AUTHENTICATED CLIENT
     user = User.query.filter_by(id=data.user_id, client_id=g.client.id).first_or_404(
@@ -65,7 +119,8 @@ def log_workout():
         new_workout_log = WorkoutLog(
             client_id=g.client.id,
             user_id=user.id,  #<-- Use user_id directly
-            name=data.name
+            name=data.name,
+            date=data.date or utc_now()
         )
         db.session.add(new_workout_log)
         db.session.flush() # <-- SOLUTION IMPLEMENTED HERE
@@ -92,6 +147,29 @@ def log_workout():
         return jsonify({"error": "Failed to log workout.", "details": str(e)}), 500
 
 
+@workout_bp.route('/log/bulk', methods=['POST'])
+@require_api_key # 2. PROTECT THE ROUTE
+def log_workouts_bulk():
+    raw_data = request.get_json(silent=True)
+    items = raw_data.get('items') if isinstance(raw_data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Invalid input", "details": "Expected a non-empty 'items' list of workout logs."}), 400
+
+    max_items = current_app.config.get('BULK_LOG_MAX_ITEMS', 500)
+    if len(items) > max_items:
+        return jsonify({"error": "Invalid input", "details": f"At most {max_items} items can be logged per request."}), 400
+
+    # 3. EVERY ITEM'S USER IS CHECKED AGAINST THE AUTHENTICATED CLIENT IN ONE QUERY
+    service = BulkLoggingService(g.client.id)
+    try:
+        created, errors = service.log_workouts(items)
+    except Exception as e:
+        return jsonify({"error": "Failed to log workouts.", "details": str(e)}), 500
+
+    response = {"created_count": len(created), "error_count": len(errors), "workouts": created, "errors": errors}
+    return jsonify(response), service.status_code(created, errors)
+
+
 @workout_bp.route('/<int:user_id>/history', methods=['GET'])
 @require_api_key # 2. PROTECT THE ROUTE
 def get_workout_history(user_id):
@@ -99,6 +177,13 @@ def get_workout_history(user_id):
     user = User.query.filter_by(id=user_id, client_id=g.client.id).first_or_404(
         description="User not found or does not belong to this client."
     )
-    # 4. ENSURE WE ONLY QUERY LOGS FOR THIS CLIENT
-    logs = WorkoutLog.query.filter_by(user_id=user.id, client_id=g.client.id).order_by(WorkoutLog.date.desc()).all()
-    return jsonify([log.to_dict() for log in logs]), 200
\ No newline at end of file
+    # 4. ENSURE WE ONLY QUERY LOGS FOR THIS CLIENT, ONE PAGE AT A TIME
+    # Load every page's exercises in one extra SELECT instead of one per workout
+    query = WorkoutLog.query.filter_by(user_id=user.id, client_id=g.client.id).options(
+        selectinload(WorkoutLog.exercises)
+    )
+    try:
+        logs, next_cursor = paginate_by_date(query, WorkoutLog, request.args, descending=True)
+    except PaginationError as e:
+        return jsonify({"error": "Invalid pagination parameters", "details": str(e)}), 400
+    return jsonify({"items": [log.to_dict() for log in logs], "next_cursor": next_cursor}), 200
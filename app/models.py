@@ -1,6 +1,9 @@
 from datetime import date, datetime, timezone
 import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from . import db
+from .utils.api_key_cache import client_cache
 
 # --- B2B CLIENT (TENANT) MODEL ---
 class Client(db.Model):
@@ -17,6 +20,35 @@ class Client(db.Model):
     def __repr__(self):
         return f'<Client {self.company_name}>'
 
+    def rotate_api_key(self):
+        """Issues a new API key for this client. The old key stops working on flush."""
+        self.api_key = str(uuid.uuid4())
+        return self.api_key
+
+
+@event.listens_for(Client, 'after_update')
+@event.listens_for(Client, 'after_delete')
+def _collect_changed_client(mapper, connection, target):
+    # Remember the client on its session; the cache is only cleared once the
+    # change commits, so a request that reads the old row in the meantime
+    # can't put the old key back until the TTL runs out.
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_client_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_clients(session):
+    # Drop cached lookups for the committed clients so a rotated or removed
+    # key is rejected by this process immediately instead of after the TTL.
+    for client_id in session.info.pop('changed_client_ids', ()):
+        client_cache.invalidate_client(client_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_clients(session):
+    session.info.pop('changed_client_ids', None)
+
 
 # --- USER MODEL WITH UPDATED CONSTRAINTS ---
 class User(db.Model):
@@ -46,10 +78,13 @@ class User(db.Model):
     membership = db.relationship('Membership', back_populates='user', uselist=False, cascade="all, delete-orphan")
     diet_logs = db.relationship('DietLog', backref='author', lazy=True, cascade="all, delete-orphan")
     workout_logs = db.relationship('WorkoutLog', backref='author', lazy=True, cascade="all, delete-orphan")
-    weight_history = db.relationship('WeightEntry', backref='author', lazy=True, cascade="all, delete-orphan")
+    weight_history = db.relationship('WeightEntry', backref='author', lazy=True, cascade="all, delete-orphan", order_by='WeightEntry.date')
     measurement_logs = db.relationship('MeasurementLog', backref='author', lazy=True, cascade="all, delete-orphan")
     workout_plans = db.relationship('WorkoutPlan', backref='author', lazy=True, cascade="all, delete-orphan")
+    diet_plans = db.relationship('DietPlan', backref='author', lazy=True, cascade="all, delete-orphan")
     achievements = db.relationship('Achievement', backref='author', lazy=True, cascade="all, delete-orphan")
+    plan_jobs = db.relationship('PlanJob', backref='author', lazy=True, cascade="all, delete-orphan")
+    daily_nutrition = db.relationship('DailyNutrition', backref='author', lazy=True, cascade="all, delete-orphan")
 
     __table_args__ = (
         db.UniqueConstraint('username', 'client_id', name='_username_client_uc'),
@@ -83,6 +118,10 @@ class DietLog(db.Model):
 
     client = db.relationship('Client', backref=db.backref('diet_logs', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_diet_log_client_user_date', 'client_id', 'user_id', 'date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -97,6 +136,37 @@ class DietLog(db.Model):
         }
 
 
+class DailyNutrition(db.Model):
+    """
+    Per-user, per-day totals of the diet logs, kept up to date as meals are
+    logged (see app/services/nutrition_rollup_service.py).
+    """
+    __tablename__ = 'daily_nutrition'
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    calories = db.Column(db.Integer, nullable=False, default=0)
+    protein_g = db.Column(db.Float, nullable=False, default=0)
+    carbs_g = db.Column(db.Float, nullable=False, default=0)
+    fat_g = db.Column(db.Float, nullable=False, default=0)
+    meal_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('client_id', 'user_id', 'day', name='uq_daily_nutrition_client_user_day'),
+    )
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'calories': self.calories,
+            'protein_g': self.protein_g,
+            'carbs_g': self.carbs_g,
+            'fat_g': self.fat_g,
+            'meal_count': self.meal_count
+        }
+
+
 class WorkoutLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
@@ -107,6 +177,10 @@ class WorkoutLog(db.Model):
     client = db.relationship('Client', backref=db.backref('workout_logs', lazy=True))
     exercises = db.relationship('ExerciseEntry', backref='workout_log', lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        db.Index('ix_workout_log_client_user_date', 'client_id', 'user_id', 'date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -124,7 +198,7 @@ class ExerciseEntry(db.Model):
     sets = db.Column(db.Integer, nullable=False)
     reps = db.Column(db.Integer, nullable=False)
     weight = db.Column(db.Float, nullable=False)
-    workout_log_id = db.Column(db.Integer, db.ForeignKey('workout_log.id'), nullable=False)
+    workout_log_id = db.Column(db.Integer, db.ForeignKey('workout_log.id'), nullable=False, index=True)
 
     client = db.relationship('Client', backref=db.backref('exercise_entries', lazy=True))
 
@@ -147,6 +221,10 @@ class WeightEntry(db.Model):
 
     client = db.relationship('Client', backref=db.backref('weight_entries', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_weight_entry_client_user_date', 'client_id', 'user_id', 'date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -168,6 +246,10 @@ class MeasurementLog(db.Model):
 
     client = db.relationship('Client', backref=db.backref('measurement_logs', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_measurement_log_client_user_date', 'client_id', 'user_id', 'date'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -189,6 +271,32 @@ class WorkoutPlan(db.Model):
 
     client = db.relationship('Client', backref=db.backref('workout_plans', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_workout_plan_client_user_created_at', 'client_id', 'user_id', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat(),
+            'generated_plan': self.generated_plan
+        }
+
+
+class DietPlan(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
+    generated_plan = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    client = db.relationship('Client', backref=db.backref('diet_plans', lazy=True))
+
+    __table_args__ = (
+        db.Index('ix_diet_plan_client_user_created_at', 'client_id', 'user_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -198,6 +306,83 @@ class WorkoutPlan(db.Model):
         }
 
 
+class PlanJob(db.Model):
+    """A queued or finished background plan generation request."""
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'diet' or 'workout'
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, succeeded, failed
+    request_data = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    client = db.relationship('Client', backref=db.backref('plan_jobs', lazy=True))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class PlanCacheEntry(db.Model):
+    """A generated plan stored under the hash of the prompt that produced it."""
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    kind = db.Column(db.String(20), nullable=False)
+    plan = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class SchedulerLease(db.Model):
+    """A time-limited lock that lets exactly one process run a scheduled job."""
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class JobRun(db.Model):
+    """One execution of a scheduled (or on-demand) background job."""
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    holder = db.Column(db.String(200), nullable=False)
+    trigger = db.Column(db.String(20), nullable=False, default='schedule')  # 'schedule' or 'manual'
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, succeeded, failed, abandoned
+    summary = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_run_job_name_started_at', 'job_name', 'started_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_name': self.job_name,
+            'holder': self.holder,
+            'trigger': self.trigger,
+            'status': self.status,
+            'summary': self.summary,
+            'error': self.error,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
@@ -208,6 +393,10 @@ class Achievement(db.Model):
 
     client = db.relationship('Client', backref=db.backref('achievements', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_achievement_client_user_unlocked_at', 'client_id', 'user_id', 'unlocked_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -2,6 +2,7 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Literal
 from datetime import datetime
+from app.utils.timestamps import to_utc
 
 class MacroSchema(BaseModel):
     protein_g: Optional[float] = Field(None, ge=0)
@@ -14,21 +15,16 @@ class DietLogSchema(BaseModel):
     calories: int = Field(..., gt=0)
     food_items: Optional[str] = None
     macros: Optional[MacroSchema] = None
-    date: Optional[str] = None
+    date: Optional[datetime] = None # Parsed and normalized to UTC; None means "now"
 
-    @field_validator('date')
+    @field_validator('date', mode='before')
     def validate_date_format(cls, value):
-        if value is None:
-            return value
-        try:
-            datetime.fromisoformat(value)
-        except ValueError:
-            raise ValueError("Incorrect date format, should be YYYY-MM-DDTHH:MM:SS")
-        return value
+        return to_utc(value)
 
 class GenerateDietPlanSchema(BaseModel):
     user_id: int
     activityLevel: Literal['sedentary', 'lightlyActive', 'moderatelyActive', 'veryActive', 'extraActive']
     diet_type: Literal['veg', 'non-veg']
     budget: Optional[str] = None
-    optional_cuisines: Optional[List[str]] = None
\ No newline at end of file
+    optional_cuisines: Optional[List[str]] = None
+    bypass_cache: bool = False # Set to True to force a freshly generated plan
\ No newline at end of file
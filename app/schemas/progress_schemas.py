@@ -1,16 +1,26 @@
 # app/schemas/progress_schemas.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
+from datetime import datetime
+from app.utils.timestamps import to_utc
 
 class WeightLogSchema(BaseModel):
     user_id: int
     weight_kg: float = Field(gt=0, description="Weight must be a positive number.")
-    date: Optional[str] = None
+    date: Optional[datetime] = None # Parsed and normalized to UTC; None means "now"
+
+    @field_validator('date', mode='before')
+    def validate_date_format(cls, value):
+        return to_utc(value)
 
 class MeasurementLogSchema(BaseModel):
     user_id: int
-    date: Optional[str] = None
+    date: Optional[datetime] = None # Parsed and normalized to UTC; None means "now"
     waist_cm: Optional[float] = Field(None, gt=0)
     chest_cm: Optional[float] = Field(None, gt=0)
     arms_cm: Optional[float] = Field(None, gt=0)
-    hips_cm: Optional[float] = Field(None, gt=0)
\ No newline at end of file
+    hips_cm: Optional[float] = Field(None, gt=0)
+
+    @field_validator('date', mode='before')
+    def validate_date_format(cls, value):
+        return to_utc(value)
@@ -1,6 +1,8 @@
 # app/schemas/workout_schemas.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Literal
+from datetime import datetime
+from app.utils.timestamps import to_utc
 
 # Schema for a single exercise entry within a workout log
 class ExerciseSchema(BaseModel):
@@ -13,11 +15,16 @@ class ExerciseSchema(BaseModel):
 class WorkoutLogSchema(BaseModel):
     user_id: int
     name: str = Field(min_length=3)
-    date: Optional[str] = None
+    date: Optional[datetime] = None # Parsed and normalized to UTC; None means "now"
     exercises: List[ExerciseSchema] = Field(min_length=1)
 
+    @field_validator('date', mode='before')
+    def validate_date_format(cls, value):
+        return to_utc(value)
+
 # Schema for the workout plan generation request
 class GenerateWorkoutPlanSchema(BaseModel):
     user_id: int
     fitnessLevel: Literal['beginner', 'intermediate', 'advanced']
-    equipment: Literal['bodyweight only', 'Home gym', 'Gym access']
\ No newline at end of file
+    equipment: Literal['bodyweight only', 'Home gym', 'Gym access']
+    bypass_cache: bool = False # Set to True to force a freshly generated plan
\ No newline at end of file
@@ -1,33 +1,74 @@
 # app/services/adaptive_planner_service.py
 
 from flask import current_app
-import google.generativeai as genai
-from app.models import db, User, WorkoutPlan
+from app.models import db, User, DietPlan, WorkoutPlan
+from .llm_client import llm_client
 from .reporting_service import ReportingService
 from .diet_planner import DietPlannerService
 from .workout_planner_service import WorkoutPlannerService
+from .rule_based_planner import rule_based_calorie_adjustment, planner_mode, llm_required, call_within_budget
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import time
 import json
 
+
+class ClientRateLimiter:
+    """
+    Spaces out work per client so one tenant's users can't burn through the
+    LLM quota in a burst. Each client gets at most `per_minute` starts per
+    minute; a value of 0 disables the limit. Only the coordinating thread
+    uses it, so a user whose client has no slot free waits in its queue
+    instead of holding a worker.
+    """
+    def __init__(self, per_minute=0):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_slot = {}
+
+    def delay(self, client_id):
+        """Seconds until the client may start another user (0 if it may now)."""
+        return max(0.0, self._next_slot.get(client_id, 0.0) - time.monotonic())
+
+    def acquire(self, client_id):
+        """Takes the client's slot if it is free now; returns whether it was."""
+        if not self.interval:
+            return True
+        now = time.monotonic()
+        if self._next_slot.get(client_id, now) > now:
+            return False
+        self._next_slot[client_id] = now + self.interval
+        return True
+
+
 class AdaptivePlannerService:
     """
     A service dedicated to the weekly adaptive planning loop.
     """
-    def __init__(self):
-        # Configure the Gemini API once for the job
-        try:
-            gemini_api_key = current_app.config.get('GEMINI_API_KEY')
-            if not gemini_api_key:
-                raise ValueError("GEMINI_API_KEY not configured.")
-            genai.configure(api_key=gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-pro')
-        except Exception as e:
-            print(f"A critical error occurred during API configuration: {e}")
-            self.model = None
+    def __init__(self, llm=None, max_workers=None, client_rate_per_minute=None, user_timeout=None, batch_size=None):
+        config = current_app.config
+        self.max_workers = max_workers or config.get('ADAPTIVE_PLANNER_MAX_WORKERS', 4)
+        self.batch_size = batch_size or config.get('ADAPTIVE_PLANNER_BATCH_SIZE', 500)
+        self.user_timeout = user_timeout or config.get('ADAPTIVE_PLANNER_USER_TIMEOUT', 300)
+        if client_rate_per_minute is None:
+            client_rate_per_minute = config.get('ADAPTIVE_PLANNER_CLIENT_RATE_PER_MINUTE', 0)
+        self.rate_limiter = ClientRateLimiter(client_rate_per_minute)
+        self.poll_interval = min(1.0, self.user_timeout / 4)
+        self._started_at = {}
+
+        # The process-wide LLM client is shared by every worker; a different
+        # one (e.g. backed by a FakeBackend) can be passed in for tests.
+        self.llm = llm or llm_client
 
     def _get_dynamic_adjustment(self, user, report):
         """
         Asks the AI for a calorie adjustment based on the weekly report.
         """
+        summary = report['summary']
+        mode = planner_mode()
+        if mode == 'rules':
+            return rule_based_calorie_adjustment(user.fitness_goals, summary['weight_change_kg'], summary['diet_adherence_score'])
+
         print("  - Asking AI for dynamic calorie adjustment...")
         prompt = f"""
         A user's primary fitness goal is '{user.fitness_goals}'.
@@ -44,55 +85,189 @@ class AdaptivePlannerService:
         """
 
         try:
-            response = self.model.generate_content(prompt)
+            if mode == 'fallback':
+                budget = current_app.config.get('PLANNER_LLM_BUDGET', 20)
+                response_text = call_within_budget(lambda timeout: self.llm.generate_text(prompt, timeout=timeout), budget)
+            else:
+                response_text = self.llm.generate_text(prompt)
             # Clean up the response and convert to integer
-            adjustment = int(response.text.strip())
+            adjustment = int(response_text.strip())
             return adjustment
         except Exception as e:
+            if mode == 'fallback':
+                print(f"    - Could not get dynamic adjustment from AI: {e!r}. Using the rule-based adjustment.")
+                return rule_based_calorie_adjustment(user.fitness_goals, summary['weight_change_kg'], summary['diet_adherence_score'])
             print(f"    - Could not get dynamic adjustment from AI: {e}. Defaulting to 0.")
             return 0 # Default to no adjustment if AI fails
 
-    def run_for_all_users(self):
+    def _process_user(self, app, user_id, client_id, report=None):
         """
-        Iterates through all users and generates new, adjusted plans.
+        Builds a new adjusted plan for one user from their weekly report.
+        Runs on a worker thread, so it pushes its own app context (and therefore
+        gets its own database session) and reloads the user by id. The report is
+        normally precomputed for the user's whole batch; it is built here only
+        if it wasn't.
         """
-        if not self.model:
-            print("Aborting job due to API configuration error.")
-            return
-
-        all_users = User.query.all()
-        for user in all_users:
+        with app.app_context():
             try:
+                self._started_at[user_id] = time.monotonic()
+                user = db.session.get(User, user_id)
                 print(f"Processing user: {user.name} (ID: {user.id})")
-                
-                reporter = ReportingService(user.id)
-                report = reporter.get_weekly_report()
-                
+
+                if report is None:
+                    report = ReportingService(user.id).get_weekly_report()
+
                 # Get the dynamic calorie adjustment from the AI
                 calorie_adjustment = self._get_dynamic_adjustment(user, report)
                 print(f"  - AI suggested calorie adjustment of: {calorie_adjustment} kcal")
 
                 # Generate new plans with the dynamic adjustment
-                diet_planner = DietPlannerService(user, form_data={})
+                diet_planner = DietPlannerService(user, form_data={}, llm=self.llm)
                 diet_result = diet_planner.generate_plan(calorie_adjustment=calorie_adjustment)
-                
-                if diet_result.get("success"):
-                    print(f"  - Successfully generated new diet plan for {user.name}.")
-                
+
+                if not diet_result.get("success"):
+                    raise RuntimeError(diet_result.get("error"))
+                print(f"  - Successfully generated new diet plan for {user.name}.")
+
                 # You could similarly add logic to adjust and regenerate workout plans
-                
-            except Exception as e:
-                print(f"  - An error occurred for user {user.id}: {e}")
-                continue
-        
-        # This part of the logic does not directly interact with the DB,
-        # so commit is not needed here. Plan saving happens in the planner services.
-
-# This is the function the scheduler will call
-def run_weekly_adaptive_planning():
+                # The plan row is written by the coordinating thread (see _save_plans)
+                return {"client_id": user.client_id, "user_id": user.id, "generated_plan": diet_result['plan']}
+            finally:
+                db.session.remove()
+
+    def _save_plans(self, rows):
+        """
+        Saves the diet plans finished since the last poll with one multi-row
+        INSERT in a short-lived session, so clients can fetch them from
+        GET /api/diet/<user_id>/plan/latest. Only the coordinating thread writes.
+        """
+        with Session(db.engine) as session:
+            session.execute(insert(DietPlan), rows)
+            session.commit()
+
+    def _iter_users(self, client_id=None):
+        """
+        Yields (user_id, client_id, report) for every user in id order, one
+        keyset-paginated chunk at a time. Each chunk, and the weekly reports for
+        all of its users, is read in its own short-lived session, so neither this
+        thread nor the caller's session accumulates rows across the run.
+        """
+        last_id = 0
+        while True:
+            with Session(db.engine) as session:
+                query = session.query(User.id, User.client_id).filter(User.id > last_id)
+                if client_id is not None:
+                    query = query.filter(User.client_id == client_id)
+                batch = query.order_by(User.id).limit(self.batch_size).all()
+                if not batch:
+                    return
+                reports = ReportingService.get_weekly_reports([row[0] for row in batch], session=session)
+            for user_id, user_client_id in batch:
+                yield user_id, user_client_id, reports.get(user_id)
+            if len(batch) < self.batch_size:
+                return
+            last_id = batch[-1][0]
+
+    def run_for_all_users(self, client_id=None):
+        """
+        Generates new, adjusted plans for every user (or every user of one
+        client) on a bounded worker pool.
+
+        Users are streamed in chunks of `batch_size` and only a few more users
+        than there are workers are read ahead at a time, so memory stays flat
+        however many users there are. A user is handed to a worker only when
+        one is free and their client is within `client_rate_per_minute` starts
+        per minute; until then they wait here, not on a worker. A user that
+        takes longer than `user_timeout` seconds is counted as timed out and
+        skipped. Returns a run summary dict.
+        """
+        if llm_required() and not self.llm.is_configured:
+            print("Aborting job due to API configuration error: GEMINI_API_KEY not configured.")
+            return None
+
+        app = current_app._get_current_object()
+        users = self._iter_users(client_id)
+        max_pending = self.max_workers * 2
+        summary = {"processed": 0, "succeeded": 0, "failed": 0, "timed_out": 0, "elapsed_seconds": 0.0}
+        start = time.monotonic()
+        self._started_at = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="adaptive-planner")
+        pending = {}
+        waiting = []
+        exhausted = False
+        try:
+            while True:
+                # Read ahead from the user stream.
+                while not exhausted and len(pending) + len(waiting) < max_pending:
+                    row = next(users, None)
+                    if row is None:
+                        exhausted = True
+                        break
+                    waiting.append(row)
+
+                # Start the waiting users whose client has a slot, in stream order, on free workers.
+                for row in list(waiting):
+                    if len(pending) >= self.max_workers:
+                        break
+                    if self.rate_limiter.acquire(row[1]):
+                        waiting.remove(row)
+                        pending[executor.submit(self._process_user, app, *row)] = row[0]
+                if not pending and not waiting:
+                    break
+
+                # Wake up for the first finished user, or when a waiting client's slot comes round.
+                timeout = self.poll_interval
+                if waiting and len(pending) < self.max_workers:
+                    timeout = min(timeout, min(self.rate_limiter.delay(row[1]) for row in waiting))
+                if not pending:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                plans = []
+                for future in done:
+                    user_id = pending.pop(future)
+                    self._started_at.pop(user_id, None)
+                    summary["processed"] += 1
+                    try:
+                        plans.append(future.result())
+                        summary["succeeded"] += 1
+                    except Exception as e:
+                        print(f"  - An error occurred for user {user_id}: {e}")
+                        summary["failed"] += 1
+                if plans:
+                    try:
+                        self._save_plans(plans)
+                    except Exception as e:
+                        print(f"  - Could not save {len(plans)} generated plans: {e}")
+                        summary["succeeded"] -= len(plans)
+                        summary["failed"] += len(plans)
+
+                # A worker thread can't be killed, so an overrunning user is abandoned:
+                # it is counted as timed out now and whatever it returns later is ignored.
+                now = time.monotonic()
+                for future, user_id in list(pending.items()):
+                    started = self._started_at.get(user_id)
+                    if started is not None and not future.done() and now - started > self.user_timeout:
+                        print(f"  - Timed out after {self.user_timeout}s for user {user_id}.")
+                        pending.pop(future)
+                        self._started_at.pop(user_id, None)
+                        summary["processed"] += 1
+                        summary["timed_out"] += 1
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        summary["elapsed_seconds"] = round(time.monotonic() - start, 2)
+        print(f"Weekly adaptive planning summary: {summary}")
+        return summary
+
+# This is the function the scheduler will call (through job_scheduler.run_job,
+# which takes the cluster-wide lease and pushes the app context first)
+def run_weekly_adaptive_planning(client_id=None):
     print("Starting weekly adaptive planning job...")
-    from run import app
-    with app.app_context():
-        planner = AdaptivePlannerService()
-        planner.run_for_all_users()
-    print("Weekly adaptive planning job finished.")
\ No newline at end of file
+    planner = AdaptivePlannerService()
+    summary = planner.run_for_all_users(client_id=client_id)
+    if summary is None:
+        raise RuntimeError("Weekly adaptive planning aborted: the LLM client is not configured.")
+    print("Weekly adaptive planning job finished.")
+    return summary
\ No newline at end of file
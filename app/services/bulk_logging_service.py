@@ -0,0 +1,237 @@
+# app/services/bulk_logging_service.py
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import selectinload
+from app.models import db, User, DietLog, WorkoutLog, ExerciseEntry, WeightEntry, MeasurementLog
+from app.schemas.diet_schemas import DietLogSchema
+from app.schemas.workout_schemas import WorkoutLogSchema
+from app.schemas.progress_schemas import WeightLogSchema, MeasurementLogSchema
+from app.utils.timestamps import utc_now
+from .nutrition_rollup_service import nutrition_rollup
+
+
+class BulkLoggingService:
+    """
+    Writes a batch of logs for one client in a single transaction.
+
+    Every item is validated on its own and the users it references are
+    checked against the client in one query. The valid items are then
+    inserted with one multi-row INSERT ... RETURNING, and the invalid ones
+    are reported back by their position in the request.
+    """
+    def __init__(self, client_id):
+        self.client_id = client_id
+
+    @staticmethod
+    def status_code(created, errors):
+        """201 when every item was logged, 207 for a partial success and 400 when nothing was."""
+        if not errors:
+            return 201
+        return 207 if created else 400
+
+    def _validate(self, items, schema):
+        """Returns ([(index, parsed item)], [error]) for a list of raw payloads."""
+        valid, errors = [], []
+        for index, raw_item in enumerate(items):
+            if not isinstance(raw_item, dict):
+                errors.append({"index": index, "error": "Invalid input", "details": "Each item must be a JSON object."})
+                continue
+            try:
+                valid.append((index, schema(**raw_item)))
+            except ValidationError as e:
+                errors.append({"index": index, "error": "Invalid input", "details": e.errors(include_url=False, include_context=False)})
+        return valid, errors
+
+    def _drop_foreign_users(self, valid, errors):
+        """Checks every referenced user in one query and moves items for other clients' users to the errors."""
+        user_ids = {data.user_id for _, data in valid}
+        owned = set()
+        if user_ids:
+            owned = {user_id for (user_id,) in db.session.query(User.id).filter(
+                User.client_id == self.client_id,
+                User.id.in_(user_ids)
+            )}
+
+        kept = []
+        for index, data in valid:
+            if data.user_id in owned:
+                kept.append((index, data))
+            else:
+                errors.append({"index": index, "error": "User not found or does not belong to this client.", "details": {"user_id": data.user_id}})
+        return kept
+
+    def _prepare(self, items, schema):
+        """Validates the items and checks their users; returns (valid, errors) with errors in request order."""
+        valid, errors = self._validate(items, schema)
+        valid = self._drop_foreign_users(valid, errors)
+        errors.sort(key=lambda error: error["index"])
+        return valid, errors
+
+    def _meal_rows(self, valid):
+        rows = []
+        for _, data in valid:
+            macros = data.macros.model_dump() if data.macros else {}
+            rows.append({
+                "client_id": self.client_id,
+                "user_id": data.user_id,
+                "meal_name": data.meal_name,
+                "food_items": data.food_items,
+                "calories": data.calories,
+                "protein_g": macros.get('protein_g'),
+                "carbs_g": macros.get('carbs_g'),
+                "fat_g": macros.get('fat_g'),
+                "date": data.date or utc_now()
+            })
+        return rows
+
+    def _weight_rows(self, valid):
+        return [
+            {"client_id": self.client_id, "user_id": data.user_id, "weight_kg": data.weight_kg, "date": data.date or utc_now()}
+            for _, data in valid
+        ]
+
+    def _measurement_rows(self, valid):
+        return [
+            {
+                "client_id": self.client_id,
+                "user_id": data.user_id,
+                "waist_cm": data.waist_cm,
+                "chest_cm": data.chest_cm,
+                "arms_cm": data.arms_cm,
+                "hips_cm": data.hips_cm,
+                "date": data.date or utc_now()
+            }
+            for _, data in valid
+        ]
+
+    def _insert_workouts(self, valid):
+        """Inserts the workouts, then all of their exercises in one executemany. Returns the workout ids."""
+        workout_rows = [
+            {"client_id": self.client_id, "user_id": data.user_id, "name": data.name, "date": data.date or utc_now()}
+            for _, data in valid
+        ]
+        # The ids have to line up with the request items to attach the exercises.
+        # On PostgreSQL this is still one batched statement; SQLite has no way to
+        # guarantee the order in a batch, so there it becomes one INSERT per workout.
+        workout_ids = db.session.scalars(
+            insert(WorkoutLog).returning(WorkoutLog.id, sort_by_parameter_order=True), workout_rows
+        ).all()
+
+        exercise_rows = [
+            {
+                "client_id": self.client_id,
+                "workout_log_id": workout_id,
+                "name": ex_data.name,
+                "sets": ex_data.sets,
+                "reps": ex_data.reps,
+                "weight": ex_data.weight
+            }
+            for workout_id, (_, data) in zip(workout_ids, valid)
+            for ex_data in data.exercises
+        ]
+        db.session.execute(insert(ExerciseEntry), exercise_rows)
+        return workout_ids
+
+    def _refresh_current_weights(self, user_ids):
+        """Sets each user's weight_kg to their most recent weight entry, as the single weight log does."""
+        latest_weight = select(WeightEntry.weight_kg).where(
+            WeightEntry.user_id == User.id
+        ).order_by(WeightEntry.date.desc(), WeightEntry.id.desc()).limit(1).scalar_subquery()
+        db.session.execute(
+            update(User).where(User.id.in_(user_ids)).values(weight_kg=latest_weight),
+            execution_options={"synchronize_session": False}
+        )
+
+    def log_meals(self, items):
+        """
+        Logs a list of DietLogSchema payloads. Returns (created, errors), where
+        created is the list of new logs in request order, each with the "index"
+        of the item it came from, and errors has one entry per rejected item.
+        Nothing is written if the insert itself fails.
+        """
+        valid, errors = self._prepare(items, DietLogSchema)
+        if not valid:
+            return [], errors
+
+        try:
+            # The logs have to line up with the request items to report their index.
+            # As with workouts this stays one batched statement on PostgreSQL, and
+            # becomes one INSERT per meal on SQLite.
+            rows = self._meal_rows(valid)
+            new_logs = db.session.scalars(
+                insert(DietLog).returning(DietLog, sort_by_parameter_order=True), rows
+            ).all()
+            nutrition_rollup.apply_meals(db.session.connection(), rows)
+            created = [dict(log.to_dict(), index=index) for log, (index, _) in zip(new_logs, valid)]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return created, errors
+
+    def log_workouts(self, items):
+        """
+        Logs a list of WorkoutLogSchema payloads. The workouts are inserted with
+        RETURNING to get their ids, then every exercise of every workout goes in
+        with one executemany. Returns (created, errors) like log_meals(): the
+        created workouts are in request order and carry their item's "index".
+        """
+        valid, errors = self._prepare(items, WorkoutLogSchema)
+        if not valid:
+            return [], errors
+
+        try:
+            workout_ids = self._insert_workouts(valid)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        workouts = WorkoutLog.query.options(selectinload(WorkoutLog.exercises)).filter(
+            WorkoutLog.id.in_(workout_ids)
+        ).all()
+        by_id = {workout.id: workout for workout in workouts}
+        created = [
+            dict(by_id[workout_id].to_dict(), index=index)
+            for workout_id, (index, _) in zip(workout_ids, valid)
+        ]
+        return created, errors
+
+    def import_batch(self, log_type, items):
+        """
+        Writes one batch of an import (see ImportService) and commits it.
+        Unlike the bulk endpoints nothing is read back, so the rows go in with
+        a plain executemany. Returns (created_count, errors).
+        """
+        schema = IMPORT_SCHEMAS[log_type]
+        valid, errors = self._prepare(items, schema)
+        if not valid:
+            return 0, errors
+
+        try:
+            if log_type == 'workouts':
+                self._insert_workouts(valid)
+            elif log_type == 'diet':
+                rows = self._meal_rows(valid)
+                db.session.execute(insert(DietLog), rows)
+                nutrition_rollup.apply_meals(db.session.connection(), rows)
+            elif log_type == 'weight':
+                db.session.execute(insert(WeightEntry), self._weight_rows(valid))
+                self._refresh_current_weights({data.user_id for _, data in valid})
+            else:
+                db.session.execute(insert(MeasurementLog), self._measurement_rows(valid))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(valid), errors
+
+
+# The payload schema for each log type that can be imported
+IMPORT_SCHEMAS = {
+    'diet': DietLogSchema,
+    'workouts': WorkoutLogSchema,
+    'weight': WeightLogSchema,
+    'measurements': MeasurementLogSchema
+}
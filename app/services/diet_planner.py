@@ -1,48 +1,26 @@
-import os
-import google.generativeai as genai
-import json
+from flask import current_app
+from .plan_cache_service import plan_cache
+from .llm_client import llm_client
+from app.utils.energy import target_calories_for_user
+from .rule_based_planner import build_diet_plan, planner_mode, call_within_budget
 
 class DietPlannerService:
-    def __init__(self, user, form_data):
+    def __init__(self, user, form_data, llm=None):
         self.user = user
         self.form_data = form_data # For data not stored in the user model like budget
-        self.bmr = 0
-        self.tdee = 0
+        self.llm = llm or llm_client # The shared LLM client unless one is passed in
 
-    def _calculate_bmr(self):
-        # Using data from the user database object
-        if self.user.gender.lower() == 'male':
-            self.bmr = 10 * self.user.weight_kg + 6.25 * self.user.height_cm - 5 * self.user.age + 5
-        else:
-            self.bmr = 10 * self.user.weight_kg + 6.25 * self.user.height_cm - 5 * self.user.age - 161
-
-    def _calculate_tdee(self):
-        activity_multipliers = {
-            'sedentary': 1.2,
-            'lightlyActive': 1.375,
-            'moderatelyActive': 1.55,
-            'veryActive': 1.725,
-            'extraActive': 1.9
-        }
-        # Using form_data for activity level which might be temporary
+    def _calculate_target_calories(self, adjustment=0):
+        # Activity level comes from the request (form_data), not the stored profile
         activity_level = self.form_data.get('activityLevel', 'sedentary')
-        multiplier = activity_multipliers.get(activity_level, 1.2)
-        self.tdee = self.bmr * multiplier
-
-    def _adjust_calories_for_goal(self):
-        goal = self.user.fitness_goals.lower()
-        if 'loss' in goal:
-            return self.tdee - 500
-        elif 'gain' in goal:
-            return self.tdee + 500
-        else:
-            return self.tdee
+        return target_calories_for_user(self.user, activity_level=activity_level, adjustment=adjustment)
 
     def _generate_llm_prompt(self, target_calories):
         # Get temporary data from the incoming request (Postman)
         diet_preference = self.form_data.get('diet_type', 'veg').capitalize()
-        monthly_budget = self.form_data.get('budget', '5000').replace(',', '')
-        optional_cuisines = self.form_data.get('optional_cuisines', [])
+        # Optional fields arrive as None when omitted from the request
+        monthly_budget = (self.form_data.get('budget') or '5000').replace(',', '')
+        optional_cuisines = self.form_data.get('optional_cuisines') or []
         activity_level = self.form_data.get('activityLevel', 'sedentary')
 
         cuisine_prompt = "The diet should be primarily Indian, using commonly available ingredients in India."
@@ -101,34 +79,51 @@ class DietPlannerService:
         """
         return prompt
 
-    def _call_llm_api(self, prompt):
-        model = genai.GenerativeModel('gemini-2.5-pro') # Or your preferred model
-        generation_config = genai.GenerationConfig(response_mime_type="application/json")
-        response = model.generate_content(prompt, generation_config=generation_config)
-        return json.loads(response.text)
-        
-    def _adjust_calories_for_goal(self, adjustment=0): # Add the adjustment parameter
-        goal = self.user.fitness_goals.lower()
-        base_calories = 0
-        if 'loss' in goal:
-            base_calories = self.tdee - 500
-        elif 'gain' in goal:
-            base_calories = self.tdee + 500
-        else:
-            base_calories = self.tdee
+    def _call_llm_api(self, prompt, budget=None):
+        if budget is None:
+            return self.llm.generate_json(prompt)
+        return call_within_budget(lambda timeout: self.llm.generate_json(prompt, timeout=timeout), budget)
+
+    def _rule_based_plan(self, target_calories):
+        return build_diet_plan(
+            target_calories,
+            diet_type=self.form_data.get('diet_type', 'veg'),
+            primary_goal=self.user.fitness_goals,
+            disliked_foods=self.user.disliked_foods,
+            allergies=self.user.allergies
+        )
         
-        # Apply the dynamic adjustment
-        return base_calories + adjustment
-    
-    def generate_plan(self, calorie_adjustment=0): # Add the calorie_adjustment parameter
+    def generate_plan(self, calorie_adjustment=0, use_cache=True): # Add the calorie_adjustment parameter
         try:
-            self._calculate_bmr()
-            self._calculate_tdee()
             # Pass the adjustment to the calculation
-            target_calories = self._adjust_calories_for_goal(adjustment=calorie_adjustment)
+            target_calories = self._calculate_target_calories(adjustment=calorie_adjustment)
+
+            # PLANNER_MODE=rules builds the plan locally without asking the LLM
+            mode = planner_mode()
+            if mode == 'rules':
+                return {"success": True, "plan": self._rule_based_plan(target_calories), "cached": False, "source": "rules"}
+
             prompt = self._generate_llm_prompt(target_calories)
-            final_plan = self._call_llm_api(prompt)
-            return {"success": True, "plan": final_plan}
+
+            # Identical prompts reuse the earlier plan; use_cache=False forces a fresh one
+            if use_cache:
+                cached_plan = plan_cache.get('diet', prompt, self.llm.model_name)
+                if cached_plan is not None:
+                    return {"success": True, "plan": cached_plan, "cached": True, "source": "llm"}
+            else:
+                plan_cache.record_bypass()
+
+            if mode == 'fallback':
+                # Answer from the rules if the LLM errors or overruns its latency budget
+                try:
+                    final_plan = self._call_llm_api(prompt, budget=current_app.config.get('PLANNER_LLM_BUDGET', 20))
+                except Exception as e:
+                    print(f"Diet plan LLM call failed or timed out ({e!r}); using the rule-based plan.")
+                    return {"success": True, "plan": self._rule_based_plan(target_calories), "cached": False, "source": "rules"}
+            else:
+                final_plan = self._call_llm_api(prompt)
+            plan_cache.set('diet', prompt, final_plan, self.llm.model_name)
+            return {"success": True, "plan": final_plan, "cached": False, "source": "llm"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
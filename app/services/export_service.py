@@ -0,0 +1,75 @@
+# app/services/export_service.py
+
+import json
+import zlib
+from datetime import date, datetime
+from sqlalchemy import select
+from app.models import db, User, DietLog, WorkoutLog, ExerciseEntry, WeightEntry, MeasurementLog, Achievement
+
+# Record type -> model, in the order they are written. Every table is scoped by its client_id column.
+EXPORT_TYPES = {
+    'user': User,
+    'diet_log': DietLog,
+    'workout_log': WorkoutLog,
+    'exercise_entry': ExerciseEntry,
+    'weight_entry': WeightEntry,
+    'measurement_log': MeasurementLog,
+    'achievement': Achievement
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ExportService:
+    """
+    Streams everything one client owns as newline-delimited JSON.
+
+    Each table is read through a server-side cursor (`yield_per`) as plain
+    Core rows, so neither the rows nor ORM objects pile up in memory, and the
+    output is handed out in chunks of roughly `chunk_size` bytes, optionally
+    gzip-compressed on the fly. Every line is one record: {"type": ..., <columns>}.
+    """
+    def __init__(self, client_id, yield_per=1000, chunk_size=64 * 1024):
+        self.client_id = client_id
+        self.yield_per = yield_per
+        self.chunk_size = chunk_size
+
+    def iter_records(self, types=None):
+        """Yields one dict per exported row, table by table."""
+        for record_type, model in EXPORT_TYPES.items():
+            if types and record_type not in types:
+                continue
+            table = model.__table__
+            statement = select(table).where(table.c.client_id == self.client_id).order_by(table.c.id)
+            result = db.session.execute(statement, execution_options={"yield_per": self.yield_per})
+            for row in result.mappings():
+                yield {"type": record_type, **row}
+
+    def iter_lines(self, types=None):
+        for record in self.iter_records(types):
+            yield json.dumps(record, default=_json_default) + "\n"
+
+    def iter_chunks(self, types=None, compress=False):
+        """Yields the NDJSON body as byte chunks, gzip-compressed if asked to."""
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+        buffer, size = [], 0
+        for line in self.iter_lines(types):
+            encoded = line.encode('utf-8')
+            buffer.append(encoded)
+            size += len(encoded)
+            if size >= self.chunk_size:
+                data = b"".join(buffer)
+                buffer, size = [], 0
+                data = compressor.compress(data) if compressor else data
+                if data:
+                    yield data
+
+        data = b"".join(buffer)
+        if compressor:
+            data = compressor.compress(data) + compressor.flush()
+        if data:
+            yield data
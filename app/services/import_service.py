@@ -0,0 +1,116 @@
+# app/services/import_service.py
+
+import csv
+import json
+from .bulk_logging_service import BulkLoggingService, IMPORT_SCHEMAS
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+# CSV columns that are folded into the nested 'macros' object of a meal
+MACRO_COLUMNS = ('protein_g', 'carbs_g', 'fat_g')
+# CSV columns that describe one exercise; every other column belongs to the workout
+EXERCISE_COLUMNS = {'exercise_name': 'name', 'sets': 'sets', 'reps': 'reps', 'weight': 'weight'}
+
+
+class ImportService:
+    """
+    Streams a historical import of one log type into the database.
+
+    The body is read line by line (NDJSON: one JSON object per line; CSV: a
+    header row, then one log per row, or one exercise per row for workouts)
+    and written in batches of `batch_size` through BulkLoggingService, so a
+    file of any size is imported in one pass with flat memory. Each batch is
+    its own transaction. Rejected lines are reported by line number, up to
+    `max_errors` of them.
+    """
+    def __init__(self, client_id, batch_size=1000, max_errors=100):
+        self.bulk = BulkLoggingService(client_id)
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def run(self, log_type, fmt, text_stream):
+        """Imports every record in the stream and returns a summary dict."""
+        summary = {"log_type": log_type, "processed": 0, "created_count": 0, "error_count": 0, "errors": []}
+        records = self._iter_ndjson(text_stream) if fmt == 'ndjson' else self._iter_csv(log_type, text_stream)
+
+        lines, items = [], []
+        for line_number, item, error in records:
+            summary["processed"] += 1
+            if error is not None:
+                self._record_error(summary, {"line": line_number, "error": "Invalid input", "details": error})
+                continue
+            lines.append(line_number)
+            items.append(item)
+            if len(items) >= self.batch_size:
+                if not self._write_batch(summary, log_type, lines, items):
+                    return summary
+                lines, items = [], []
+
+        if items:
+            self._write_batch(summary, log_type, lines, items)
+        return summary
+
+    def _write_batch(self, summary, log_type, lines, items):
+        try:
+            created_count, errors = self.bulk.import_batch(log_type, items)
+        except Exception as e:
+            # Earlier batches are already committed; stop here and say where.
+            summary["failed_at_line"] = lines[0]
+            summary["failure"] = str(e)
+            return False
+
+        summary["created_count"] += created_count
+        for error in errors:
+            self._record_error(summary, {"line": lines[error.pop("index")], **error})
+        return True
+
+    def _record_error(self, summary, error):
+        summary["error_count"] += 1
+        if len(summary["errors"]) < self.max_errors:
+            summary["errors"].append(error)
+
+    def _iter_ndjson(self, text_stream):
+        """Yields (line_number, item, error) for every non-blank line."""
+        for line_number, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError as e:
+                yield line_number, None, f"Line is not valid JSON: {e}"
+
+    def _iter_csv(self, log_type, text_stream):
+        """Yields (line_number, item, error) for every row, shaped like the JSON payloads."""
+        reader = csv.DictReader(text_stream)
+        if log_type == 'workouts':
+            yield from self._group_workout_rows(reader)
+            return
+        for row in reader:
+            item = {key: value for key, value in row.items() if key and value not in (None, '')}
+            if log_type == 'diet':
+                macros = {column: item.pop(column) for column in MACRO_COLUMNS if column in item}
+                if macros:
+                    item['macros'] = macros
+            yield reader.line_num, item, None
+
+    def _group_workout_rows(self, reader):
+        """
+        Workouts in CSV have one row per exercise; consecutive rows with the
+        same user_id, name and date make up one workout.
+        """
+        current, current_key, current_line = None, None, None
+        for row in reader:
+            row = {key: value for key, value in row.items() if key and value not in (None, '')}
+            exercise = {field: row.pop(column) for column, field in EXERCISE_COLUMNS.items() if column in row}
+            key = (row.get('user_id'), row.get('name'), row.get('date'))
+            if key != current_key:
+                if current is not None:
+                    yield current_line, current, None
+                current, current_key, current_line = dict(row, exercises=[]), key, reader.line_num
+            current['exercises'].append(exercise)
+        if current is not None:
+            yield current_line, current, None
+
+
+def supported_log_types():
+    return sorted(IMPORT_SCHEMAS)
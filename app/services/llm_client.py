@@ -0,0 +1,121 @@
+# app/services/llm_client.py
+
+import json
+import threading
+import time
+from app.utils.instrumentation import instrumentation
+
+
+class GeminiBackend:
+    """
+    Talks to Gemini. The SDK is configured and the model object is built once,
+    so every call in the process reuses the same underlying client and
+    connection instead of creating new ones per request.
+
+    The SDK (and the grpc/protobuf stack under it) is imported here rather than
+    at module level, so processes that never call Gemini don't pay for it.
+    """
+    def __init__(self, api_key, model_name):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.json_config = genai.GenerationConfig(response_mime_type="application/json")
+
+    def generate(self, prompt, json_output=False, timeout=None):
+        kwargs = {}
+        if json_output:
+            kwargs['generation_config'] = self.json_config
+        if timeout:
+            kwargs['request_options'] = {"timeout": timeout}
+        return self.model.generate_content(prompt, **kwargs).text
+
+
+class FakeBackend:
+    """
+    An offline stand-in for tests and benchmarks. `responder(prompt, json_output)`
+    returns the response text; by default JSON prompts get an empty plan and
+    text prompts get "0". `latency` simulates a slow model.
+    """
+    def __init__(self, responder=None, latency=0.0):
+        self.responder = responder or self._default_response
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _default_response(prompt, json_output):
+        return json.dumps({"weekly_plan": {}}) if json_output else "0"
+
+    def generate(self, prompt, json_output=False, timeout=None):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responder(prompt, json_output)
+
+
+class LLMClient:
+    """
+    The one LLM entry point shared by every service in the process.
+
+    The backend is built lazily on first use (so gunicorn workers forked after
+    --preload each open their own connection) and then reused. Tests and
+    benchmarks can swap it out with set_backend().
+    """
+    def __init__(self, backend=None, model_name='gemini-2.5-pro'):
+        self.app = None
+        self.model_name = model_name
+        self.request_timeout = None
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.model_name = app.config.get('GEMINI_MODEL_NAME', 'gemini-2.5-pro')
+        self.request_timeout = app.config.get('LLM_REQUEST_TIMEOUT', 120)
+        if app.config.get('LLM_BACKEND') == 'fake':
+            self._backend = FakeBackend()
+        app.extensions['llm_client'] = self
+
+    def set_backend(self, backend):
+        """Replaces the backend (e.g. with a FakeBackend) and returns the previous one."""
+        with self._lock:
+            previous, self._backend = self._backend, backend
+            return previous
+
+    @property
+    def is_configured(self):
+        return self._backend is not None or bool(self.app and self.app.config.get('GEMINI_API_KEY'))
+
+    def _get_backend(self):
+        with self._lock:
+            if self._backend is None:
+                gemini_api_key = self.app.config.get('GEMINI_API_KEY') if self.app else None
+                if not gemini_api_key:
+                    raise ValueError("GEMINI_API_KEY not configured.")
+                self._backend = GeminiBackend(gemini_api_key, self.model_name)
+            return self._backend
+
+    def _generate(self, prompt, json_output, timeout):
+        backend = self._get_backend()
+        started = time.perf_counter()
+        success = False
+        try:
+            text = backend.generate(prompt, json_output=json_output, timeout=timeout or self.request_timeout)
+            success = True
+            return text
+        finally:
+            instrumentation.record_llm_call('json' if json_output else 'text', time.perf_counter() - started, success)
+
+    def generate_text(self, prompt, timeout=None):
+        """Returns the model's plain-text response to a prompt."""
+        return self._generate(prompt, False, timeout)
+
+    def generate_json(self, prompt, timeout=None):
+        """Asks for a JSON response and returns it parsed."""
+        return json.loads(self._generate(prompt, True, timeout))
+
+
+# The single client shared by every request and background job in this process
+llm_client = LLMClient()
@@ -0,0 +1,202 @@
+# app/services/nutrition_rollup_service.py
+
+from datetime import datetime, timezone
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, select, update, delete, insert, text
+from sqlalchemy.exc import IntegrityError
+from app.models import db, DietLog, DailyNutrition
+
+ROLLUP_TOTALS = ('calories', 'protein_g', 'carbs_g', 'fat_g', 'meal_count')
+
+
+def _meal_day(value):
+    """The UTC calendar day a meal's timestamp falls on, matching func.date() over the stored UTC value."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+class NutritionRollup:
+    """
+    Maintains the daily_nutrition table: one row per user per day with that
+    day's calorie and macro totals and meal count.
+
+    Every meal write adds its amounts to the row for its day with a single
+    INSERT ... ON CONFLICT DO UPDATE, in the same transaction as the meal, so
+    reports can read a week of adherence from seven rows instead of summing
+    raw logs. Databases without that upsert (anything but PostgreSQL and
+    SQLite) get an UPDATE, then an INSERT for days that have no row yet.
+    `flask nutrition rebuild` recomputes the table from diet_log.
+    """
+    def init_app(self, app):
+        app.cli.add_command(nutrition_cli)
+        app.extensions['nutrition_rollup'] = self
+
+    def apply_meals(self, connection, rows, sign=1):
+        """
+        Adds (or, with sign=-1, subtracts) meal rows to their days' totals.
+        `rows` are dicts with client_id, user_id, date, calories and macros,
+        as written to diet_log; they are folded per day before one upsert.
+        """
+        totals = {}
+        for row in rows:
+            key = (row['client_id'], row['user_id'], _meal_day(row.get('date')))
+            day = totals.setdefault(key, dict.fromkeys(ROLLUP_TOTALS, 0))
+            day['calories'] += row.get('calories') or 0
+            day['protein_g'] += row.get('protein_g') or 0
+            day['carbs_g'] += row.get('carbs_g') or 0
+            day['fat_g'] += row.get('fat_g') or 0
+            day['meal_count'] += 1
+        if not totals:
+            return
+
+        table = DailyNutrition.__table__
+        if sign < 0:
+            # Removing meals never creates rows, it only lowers existing totals.
+            for (client_id, user_id, day), amounts in totals.items():
+                connection.execute(
+                    update(table)
+                    .where(table.c.client_id == client_id, table.c.user_id == user_id, table.c.day == day)
+                    .values({column: table.c[column] - amount for column, amount in amounts.items()})
+                )
+            return
+
+        values = [
+            {"client_id": client_id, "user_id": user_id, "day": day, **amounts}
+            for (client_id, user_id, day), amounts in totals.items()
+        ]
+        dialect_insert = self._dialect_insert(connection)
+        if dialect_insert is None:
+            self._update_then_insert(connection, values)
+            return
+        statement = dialect_insert(table).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=['client_id', 'user_id', 'day'],
+            set_={column: table.c[column] + statement.excluded[column] for column in ROLLUP_TOTALS}
+        )
+        connection.execute(statement)
+
+    @staticmethod
+    def _dialect_insert(connection):
+        dialect = connection.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return None
+        return insert
+
+    @staticmethod
+    def _update_then_insert(connection, values):
+        """The portable upsert: add to each day's row, and create the rows that don't exist yet."""
+        table = DailyNutrition.__table__
+        for row in values:
+            key = (table.c.client_id == row['client_id'], table.c.user_id == row['user_id'], table.c.day == row['day'])
+            add = {column: table.c[column] + row[column] for column in ROLLUP_TOTALS}
+            if connection.execute(update(table).where(*key).values(add)).rowcount:
+                continue
+            try:
+                # In a savepoint, so losing a race to a concurrent insert doesn't abort the meal's transaction
+                with connection.begin_nested():
+                    connection.execute(insert(table).values(row))
+            except IntegrityError:
+                connection.execute(update(table).where(*key).values(add))
+
+    def rebuild(self, client_id=None):
+        """
+        Recomputes the rollup from the raw diet logs (all clients, or just one)
+        with a single INSERT ... SELECT, and commits. Returns the number of rows written.
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # A full rebuild scans all of diet_log and can outlast DB_STATEMENT_TIMEOUT_MS;
+            # lift the timeout for this transaction only, which keeps the rebuild atomic.
+            db.session.execute(text("SET LOCAL statement_timeout = 0"))
+
+        table = DailyNutrition.__table__
+        clear = delete(table)
+        totals = select(
+            DietLog.client_id,
+            DietLog.user_id,
+            func.date(DietLog.date),
+            func.coalesce(func.sum(DietLog.calories), 0),
+            func.coalesce(func.sum(DietLog.protein_g), 0),
+            func.coalesce(func.sum(DietLog.carbs_g), 0),
+            func.coalesce(func.sum(DietLog.fat_g), 0),
+            func.count(DietLog.id)
+        ).group_by(DietLog.client_id, DietLog.user_id, func.date(DietLog.date))
+        if client_id is not None:
+            clear = clear.where(table.c.client_id == client_id)
+            totals = totals.where(DietLog.client_id == client_id)
+
+        db.session.execute(clear)
+        db.session.execute(table.insert().from_select(
+            ['client_id', 'user_id', 'day', *ROLLUP_TOTALS], totals
+        ))
+        db.session.commit()
+
+        count = select(func.count()).select_from(table)
+        if client_id is not None:
+            count = count.where(table.c.client_id == client_id)
+        return db.session.execute(count).scalar()
+
+
+# The single rollup maintainer shared by the whole process
+nutrition_rollup = NutritionRollup()
+
+
+# The diet_log columns a meal's rollup contribution depends on
+_LOG_COLUMNS = ('client_id', 'user_id', 'date', 'calories', 'protein_g', 'carbs_g', 'fat_g')
+
+
+def _log_row(target, before_update=False):
+    """The meal as a rollup row; with before_update=True, as it was before the pending update."""
+    state = inspect(target)
+    row = {}
+    for column in _LOG_COLUMNS:
+        history = state.attrs[column].history
+        row[column] = history.deleted[0] if before_update and history.deleted else getattr(target, column)
+    return row
+
+
+# Meals added, edited or removed one at a time through the ORM (e.g. POST /api/diet/log) update
+# the rollup in the same flush. Bulk inserts bypass these events and call apply_meals() directly.
+@event.listens_for(DietLog, 'after_insert')
+def _add_meal_to_rollup(mapper, connection, target):
+    nutrition_rollup.apply_meals(connection, [_log_row(target)])
+
+
+@event.listens_for(DietLog, 'after_update')
+def _move_meal_in_rollup(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[column].history.has_changes() for column in _LOG_COLUMNS):
+        return
+    # Take the old values off their day and add the new ones, which may be on another day
+    nutrition_rollup.apply_meals(connection, [_log_row(target, before_update=True)], sign=-1)
+    nutrition_rollup.apply_meals(connection, [_log_row(target)])
+
+
+@event.listens_for(DietLog, 'after_delete')
+def _remove_meal_from_rollup(mapper, connection, target):
+    nutrition_rollup.apply_meals(connection, [_log_row(target)], sign=-1)
+
+
+# after_update needs the replaced values, so load them when a column is set on a row whose
+# attributes were expired (e.g. after a commit) instead of only knowing the new value
+for _column in _LOG_COLUMNS:
+    event.listen(getattr(DietLog, _column), 'set', lambda target, value, oldvalue, initiator: value,
+                 active_history=True, retval=True)
+
+
+nutrition_cli = AppGroup('nutrition', help="Maintain the daily nutrition rollup.")
+
+
+@nutrition_cli.command('rebuild')
+@click.option('--client-id', type=int, default=None, help='Only rebuild the rows of this client.')
+def rebuild_command(client_id):
+    """Recomputes daily_nutrition from the raw diet logs."""
+    rows = nutrition_rollup.rebuild(client_id=client_id)
+    click.echo(f"Rebuilt daily nutrition: {rows} rows.")
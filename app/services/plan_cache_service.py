@@ -0,0 +1,169 @@
+# app/services/plan_cache_service.py
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models import db, PlanCacheEntry
+
+
+def normalize_prompt(prompt):
+    """
+    Strips the incidental whitespace that the planners' indented f-string
+    prompts carry, so only meaningful differences change the cache key.
+    """
+    lines = (" ".join(line.split()) for line in prompt.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(kind, prompt, model_name=''):
+    """Returns the content address (SHA-256 hex) of a prompt for a plan kind and model."""
+    payload = f"{kind}\n{model_name}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """
+    A database-backed cache of LLM-generated plans, keyed by the hash of the
+    normalized prompt. Because the prompt is built entirely from the plan
+    inputs, an identical prompt can safely reuse an earlier plan.
+
+    Entries expire after `ttl_seconds`, and once there are more than
+    `max_entries` the oldest are evicted. Eviction runs at most once every
+    `evict_interval` seconds per process rather than on every store, so the
+    table may briefly hold a few more than `max_entries` rows. Cache failures
+    are logged and treated as misses so they never break plan generation.
+
+    The cache reads and writes in its own short-lived sessions, so storing an
+    entry never commits (and a failure never rolls back) whatever the
+    caller's request session has pending.
+    """
+    # Most surplus rows one eviction deletes, so a single store never waits on a huge delete
+    EVICT_BATCH_SIZE = 1000
+
+    def __init__(self, ttl_seconds=7 * 24 * 3600, max_entries=10000, enabled=True, evict_interval=60):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.evict_interval = evict_interval
+        self._next_eviction = 0.0
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def init_app(self, app):
+        """Reads the cache settings from the app config and resets the counters."""
+        self.ttl_seconds = app.config.get('PLAN_CACHE_TTL', 7 * 24 * 3600)
+        self.max_entries = app.config.get('PLAN_CACHE_MAX_ENTRIES', 10000)
+        self.enabled = app.config.get('PLAN_CACHE_ENABLED', True)
+        self.evict_interval = app.config.get('PLAN_CACHE_EVICT_INTERVAL', 60)
+        self._next_eviction = 0.0
+        self._reset_counters()
+
+    def _reset_counters(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.bypasses = 0
+            self.evictions = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, kind, prompt, model_name=''):
+        """Returns the cached plan for this prompt, or None on a miss."""
+        if not self.enabled:
+            return None
+        try:
+            with Session(db.engine) as session:
+                plan = session.scalars(
+                    db.select(PlanCacheEntry.plan).where(
+                        PlanCacheEntry.cache_key == make_cache_key(kind, prompt, model_name),
+                        PlanCacheEntry.expires_at > datetime.now(timezone.utc)
+                    ).limit(1)
+                ).first()
+        except SQLAlchemyError as e:
+            print(f"Plan cache lookup failed: {e}")
+            plan = None
+
+        if plan is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return plan
+
+    def record_bypass(self):
+        """Counts a request that skipped the cache lookup on purpose."""
+        self._count('bypasses')
+
+    def set(self, kind, prompt, plan, model_name=''):
+        """
+        Stores (or refreshes) the plan for this prompt in its own session and
+        commits it, then evicts expired and surplus entries if the last
+        eviction was more than `evict_interval` seconds ago.
+        """
+        if not self.enabled:
+            return
+        now = datetime.now(timezone.utc)
+        cache_key = make_cache_key(kind, prompt, model_name)
+        try:
+            with Session(db.engine) as session:
+                entry = session.query(PlanCacheEntry).filter_by(cache_key=cache_key).first()
+                if entry is None:
+                    entry = PlanCacheEntry(cache_key=cache_key, kind=kind)
+                    session.add(entry)
+                entry.plan = plan
+                entry.created_at = now
+                entry.expires_at = now + timedelta(seconds=self.ttl_seconds)
+                session.commit()
+                if self._eviction_due():
+                    self._evict(session, now)
+        except SQLAlchemyError as e:
+            # Most likely a concurrent request stored the same prompt first.
+            print(f"Plan cache store failed: {e}")
+
+    def _eviction_due(self):
+        with self._lock:
+            if time.monotonic() < self._next_eviction:
+                return False
+            self._next_eviction = time.monotonic() + self.evict_interval
+            return True
+
+    def _evict(self, session, now):
+        evicted = session.query(PlanCacheEntry).filter(
+            PlanCacheEntry.expires_at <= now
+        ).delete(synchronize_session=False)
+
+        surplus = session.query(func.count(PlanCacheEntry.id)).scalar() - self.max_entries
+        if surplus > 0:
+            # Every entry has the same TTL, so the earliest expiry is the oldest entry;
+            # expires_at is indexed, which keeps this a short range scan
+            oldest = session.query(PlanCacheEntry.id).order_by(
+                PlanCacheEntry.expires_at.asc(), PlanCacheEntry.id.asc()
+            ).limit(min(surplus, self.EVICT_BATCH_SIZE)).subquery()
+            evicted += session.query(PlanCacheEntry).filter(
+                PlanCacheEntry.id.in_(db.select(oldest.c.id))
+            ).delete(synchronize_session=False)
+
+        if evicted:
+            session.commit()
+            self._count('evictions', evicted)
+
+    def stats(self):
+        """Returns the hit/miss/bypass/eviction counters for this process."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "evictions": self.evictions,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries
+            }
+
+
+# The single cache instance shared by every request in this process
+plan_cache = PlanCache()
@@ -0,0 +1,157 @@
+# app/services/plan_job_service.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import update, func
+from app.models import db, User, PlanJob, DietPlan, WorkoutPlan
+from .llm_client import llm_client
+from .diet_planner import DietPlannerService
+from .workout_planner_service import WorkoutPlannerService
+from .rule_based_planner import llm_required
+
+
+class PlanJobService:
+    """
+    Runs diet and workout plan generation in the background.
+
+    A job row is written to the database when the request comes in, and a small
+    thread pool in this process does the slow LLM work and records the outcome
+    on the same row. Because the state lives in the database, any gunicorn
+    worker can answer the status poll, not just the one that took the request.
+
+    The queue itself lives only in the process that took the request, so a
+    restart or crash strands its jobs. A poll for a job that has been pending
+    or running for more than `stale_after` seconds, and that this process
+    isn't working on, marks it failed so the client can resubmit.
+    """
+    def __init__(self, max_workers=2, stale_after=1800):
+        self.max_workers = max_workers
+        self.stale_after = stale_after
+        self.app = None
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('PLAN_JOBS_MAX_WORKERS', 2)
+        self.stale_after = app.config.get('PLAN_JOBS_STALE_AFTER', 1800)
+
+    def _get_executor(self):
+        # Created on first use so that forked gunicorn workers (--preload)
+        # each start their own threads instead of inheriting dead ones.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan-jobs")
+            return self._executor
+
+    def submit(self, kind, user, client_id, form_data):
+        """Records a pending job for this user and queues it. Returns the job."""
+        job = PlanJob(client_id=client_id, user_id=user.id, kind=kind, request_data=form_data)
+        db.session.add(job)
+        db.session.commit()
+
+        future = self._get_executor().submit(self._run, job.id)
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda _: self._forget(job.id))
+        return job
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def wait(self, job_id, timeout=None):
+        """Blocks until a job queued by this process has finished (used by tests)."""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+
+    def fail_if_stale(self, job):
+        """
+        Marks a pending or running job failed if it has sat there longer than
+        stale_after seconds and isn't queued in this process: the worker that
+        owned it most likely restarted. Called when the job is read; returns it.
+        """
+        if job.status not in ('pending', 'running'):
+            return job
+        with self._lock:
+            if job.id in self._futures:
+                return job
+
+        now = datetime.now(timezone.utc)
+        # Conditional, so a worker that finishes the job meanwhile wins
+        result = db.session.execute(
+            update(PlanJob)
+            .where(
+                PlanJob.id == job.id,
+                PlanJob.status.in_(('pending', 'running')),
+                func.coalesce(PlanJob.started_at, PlanJob.created_at) < now - timedelta(seconds=self.stale_after)
+            )
+            .values(status='failed', finished_at=now,
+                    error="The job was interrupted before it finished (its worker restarted). Please submit it again.")
+        )
+        db.session.commit()
+        if result.rowcount:
+            db.session.refresh(job)
+        return job
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            # Only claim a job that is still pending; one given up on as stale stays failed
+            claimed = db.session.execute(
+                update(PlanJob)
+                .where(PlanJob.id == job_id, PlanJob.status == 'pending')
+                .values(status='running', started_at=datetime.now(timezone.utc))
+            ).rowcount
+            db.session.commit()
+            if not claimed:
+                return
+            job = db.session.get(PlanJob, job_id)
+
+            try:
+                result = self._generate(job)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            if result.get("success"):
+                outcome = {"status": 'succeeded', "result": result['plan']}
+            else:
+                db.session.rollback()
+                outcome = {"status": 'failed', "error": result.get("error")}
+            # Only finish a job that is still ours; one failed as stale meanwhile keeps that
+            # outcome, and the plan saved for it is rolled back so it can't appear twice
+            finished = db.session.execute(
+                update(PlanJob)
+                .where(PlanJob.id == job_id, PlanJob.status == 'running')
+                .values(finished_at=datetime.now(timezone.utc), **outcome)
+            ).rowcount
+            if finished:
+                db.session.commit()
+            else:
+                db.session.rollback()
+
+    def _generate(self, job):
+        if llm_required() and not llm_client.is_configured:
+            raise ValueError("GEMINI_API_KEY not configured.")
+
+        user = db.session.get(User, job.user_id)
+        form_data = job.request_data or {}
+        use_cache = not form_data.get('bypass_cache', False)
+
+        if job.kind == 'diet':
+            result = DietPlannerService(user=user, form_data=form_data).generate_plan(use_cache=use_cache)
+            plan_model = DietPlan
+        else:
+            result = WorkoutPlannerService(user=user, form_data=form_data).generate_plan(use_cache=use_cache)
+            plan_model = WorkoutPlan
+        if result.get("success"):
+            # Keep the same history the synchronous routes keep
+            db.session.add(plan_model(client_id=job.client_id, author=user, generated_plan=result['plan']))
+        return result
+
+
+# The single job runner shared by every request in this process
+plan_jobs = PlanJobService()
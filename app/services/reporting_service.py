@@ -1,75 +1,148 @@
 # app/services/reporting_service.py
-from app.models import User, DietLog, WorkoutLog, WeightEntry, db
+import math
+from functools import cached_property
+from app.models import User, DailyNutrition, WorkoutLog, WeightEntry, db
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, or_
+from app.utils.energy import target_calories_for_user, target_calories_for_users, missing_measurements
 from flask import abort
 
+# Longest window the diet summary accepts, in days
+MAX_SUMMARY_DAYS = 366
+
 class ReportingService:
     def __init__(self, user_id):
         # FIX 1: Replaced deprecated get_or_404 with db.session.get
         self.user = db.session.get(User, user_id)
         if not self.user:
             abort(404, description=f"User with id {user_id} not found.")
-        self.target_calories = self._calculate_target_calories()
 
-    def _calculate_target_calories(self):
+    @cached_property
+    def target_calories(self):
+        """The user's daily calorie target; raises IncompleteProfileError without weight, height or age."""
+        return self._calculate_target_calories()
+
+    @staticmethod
+    def calculate_target_calories(user):
         """
         Calculates a robust TDEE based on the user's stored profile data.
         """
-        # 1. Calculate BMR (no change here)
-        if self.user.gender.lower() == 'male':
-            bmr = 10 * self.user.weight_kg + 6.25 * self.user.height_cm - 5 * self.user.age + 5
-        else:
-            bmr = 10 * self.user.weight_kg + 6.25 * self.user.height_cm - 5 * self.user.age - 161
-        
-        # 2. Get the correct TDEE multiplier based on the user's activity level
-        activity_multipliers = {
-            'sedentary': 1.2,
-            'lightlyactive': 1.375,
-            'moderatelyactive': 1.55,
-            'veryactive': 1.725,
-            'extraactive': 1.9
+        return target_calories_for_user(user)
+
+    def _calculate_target_calories(self):
+        return self.calculate_target_calories(self.user)
+
+    @staticmethod
+    def _score_adherence(daily_calories, target_calories):
+        """
+        Averages the per-day adherence for a list of daily calorie totals.
+        Each day scores 100 when on target and loses points as it moves away.
+        """
+        if not daily_calories:
+            return 0
+
+        total_adherence = 0
+        for actual_calories in daily_calories:
+            day_adherence = max(0, 100 - abs(actual_calories - target_calories) / target_calories * 100)
+            total_adherence += day_adherence
+
+        return round(total_adherence / len(daily_calories), 2)
+
+    @staticmethod
+    def _build_report(user, start_date, end_date, weight_change_kg, workouts_completed, adherence_score, target_calories):
+        """Assembles the weekly report dict shared by the single and batch paths."""
+        return {
+            "user_name": user.name,
+            "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
+            "summary": {
+                "weight_change_kg": weight_change_kg, # Use the numeric value
+                "workouts_completed": workouts_completed,
+                "diet_adherence_score": adherence_score,
+                "target_daily_calories": round(target_calories)
+            }
         }
-        
-        # Use the user's stored activity_level, defaulting to sedentary if not set
-        user_activity_level = (self.user.activity_level or 'sedentary').lower().replace(" ", "")
-        multiplier = activity_multipliers.get(user_activity_level, 1.2)
-        tdee = bmr * multiplier
-
-        # 3. Adjust for fitness goal (no change here)
-        goal = self.user.fitness_goals.lower()
-        if 'loss' in goal:
-            return tdee - 500
-        elif 'gain' in goal:
-            return tdee + 500
-        else: # maintainWeight
-            return tdee
 
     def get_diet_adherence_score(self, days=7):
         """Calculates the diet adherence score over a given period."""
         end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=days)
 
-        daily_logs = db.session.query(
-            func.date(DietLog.date),
-            func.sum(DietLog.calories)
-        ).filter(
-            DietLog.user_id == self.user.id,
-            DietLog.date >= start_date
-        ).group_by(func.date(DietLog.date)).all()
+        # One pre-aggregated row per logged day (see NutritionRollup). Whole days only: the
+        # last `days` UTC days including today. The day start_date falls on is left out, as
+        # the rollup can't split it at start_date and a part-day total reads as under-eating.
+        daily_calories = db.session.query(DailyNutrition.calories).filter(
+            DailyNutrition.client_id == self.user.client_id,
+            DailyNutrition.user_id == self.user.id,
+            DailyNutrition.day > start_date.date(),
+            DailyNutrition.meal_count > 0
+        ).all()
 
-        if not daily_logs:
-            return 0
+        return self._score_adherence([calories for (calories,) in daily_calories], self.target_calories)
 
-        total_adherence = 0
-        for day_log in daily_logs:
-            actual_calories = day_log[1]
-            # Calculate adherence for the day (max score 100)
-            # Score decreases as you move away from the target
-            day_adherence = max(0, 100 - abs(actual_calories - self.target_calories) / self.target_calories * 100)
-            total_adherence += day_adherence
-        
-        return round(total_adherence / len(daily_logs), 2)
+    @staticmethod
+    def resolve_summary_window(days=7, date_from=None, date_to=None):
+        """
+        Turns the summary window arguments into an inclusive (first_day, last_day)
+        pair of dates. `date_from`/`date_to` win over `days`; a missing `date_to`
+        means today and a missing `date_from` means `days` days before it.
+        Raises ValueError for an empty, inverted or too long window.
+        """
+        if days < 1:
+            raise ValueError("'days' must be at least 1.")
+        last_day = date_to or datetime.now(timezone.utc).date()
+        first_day = date_from or last_day - timedelta(days=days - 1)
+        if first_day > last_day:
+            raise ValueError("'from' must not be after 'to'.")
+        if (last_day - first_day).days + 1 > MAX_SUMMARY_DAYS:
+            raise ValueError(f"The summary window can be at most {MAX_SUMMARY_DAYS} days.")
+        return first_day, last_day
+
+    def get_weekly_diet_summary(self, days=7, date_from=None, date_to=None):
+        """
+        Summarizes calories and macros per day over a window (the last seven
+        days by default). Only the pre-aggregated daily_nutrition rows are read,
+        one per logged day, so the cost doesn't depend on how many meals were logged.
+        """
+        first_day, last_day = self.resolve_summary_window(days, date_from, date_to)
+
+        day_rows = DailyNutrition.query.filter(
+            DailyNutrition.client_id == self.user.client_id,
+            DailyNutrition.user_id == self.user.id,
+            DailyNutrition.day >= first_day,
+            DailyNutrition.day <= last_day,
+            DailyNutrition.meal_count > 0
+        ).order_by(DailyNutrition.day.asc()).all()
+
+        totals = {
+            "calories": sum(row.calories for row in day_rows),
+            "protein_g": round(sum(row.protein_g for row in day_rows), 1),
+            "carbs_g": round(sum(row.carbs_g for row in day_rows), 1),
+            "fat_g": round(sum(row.fat_g for row in day_rows), 1),
+            "meal_count": sum(row.meal_count for row in day_rows)
+        }
+        days_logged = len(day_rows)
+        daily_averages = {
+            key: round(totals[key] / days_logged, 1) if days_logged else 0
+            for key in ("calories", "protein_g", "carbs_g", "fat_g")
+        }
+
+        return {
+            "user_id": self.user.id,
+            "period": {
+                "from": first_day.isoformat(),
+                "to": last_day.isoformat(),
+                "days": (last_day - first_day).days + 1
+            },
+            "target_daily_calories": round(self.target_calories),
+            "days_logged": days_logged,
+            "adherence_score": self._score_adherence([row.calories for row in day_rows], self.target_calories),
+            "totals": totals,
+            "daily_averages": daily_averages,
+            "days": [
+                dict(row.to_dict(), adherence_score=self._score_adherence([row.calories], self.target_calories))
+                for row in day_rows
+            ]
+        }
 
     def get_weekly_report(self):
         """Gathers all data needed for a weekly summary report."""
@@ -79,10 +152,11 @@ class ReportingService:
 
         # 1. Weight Trend (now as a number)
         weight_history = WeightEntry.query.filter(
+            WeightEntry.client_id == self.user.client_id,
             WeightEntry.user_id == self.user.id,
             WeightEntry.date >= start_date
-        ).order_by(WeightEntry.date.asc()).all()
-        
+        ).order_by(WeightEntry.date.asc(), WeightEntry.id.asc()).all()
+
         weight_change_kg = 0.0 # Default to a number
         if len(weight_history) >= 2:
             start_weight = weight_history[0].weight_kg
@@ -91,6 +165,7 @@ class ReportingService:
 
         # 2. Workout Performance
         workouts_completed = WorkoutLog.query.filter(
+            WorkoutLog.client_id == self.user.client_id,
             WorkoutLog.user_id == self.user.id,
             WorkoutLog.date >= start_date
         ).count()
@@ -99,14 +174,114 @@ class ReportingService:
         adherence_score = self.get_diet_adherence_score(days=7)
 
         # 4. Assemble the report with raw numbers
-        report = {
-            "user_name": self.user.name,
-            "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
-            "summary": {
-                "weight_change_kg": weight_change_kg, # Use the numeric value
-                "workouts_completed": workouts_completed,
-                "diet_adherence_score": adherence_score,
-                "target_daily_calories": round(self.target_calories)
-            }
-        }
-        return report
\ No newline at end of file
+        return self._build_report(
+            self.user, start_date, end_date, weight_change_kg,
+            workouts_completed, adherence_score, self.target_calories
+        )
+
+    @classmethod
+    def get_weekly_reports(cls, user_ids, session=None):
+        """
+        Builds weekly reports for many users at once.
+
+        Instead of three or four queries per user, this runs one grouped query
+        per metric for the whole set: the users, the first/last weight entry in
+        the window, the workout counts and the per-day calorie sums. Returns a
+        dict of {user_id: report}, where each report is identical to what
+        get_weekly_report() returns for that user. Unknown ids are skipped, and
+        a user whose report can't be built (e.g. an incomplete profile) maps to
+        None, so one bad profile doesn't fail the rest of the batch.
+        """
+        session = session or db.session
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+
+        end_date = datetime.now(timezone.utc)
+        start_date = end_date - timedelta(days=7)
+
+        # 1. The users themselves
+        users = session.query(User).filter(User.id.in_(user_ids)).all()
+        if not users:
+            return {}
+        ids = [user.id for user in users]
+        client_ids = {user.client_id for user in users}
+
+        # 2. Weight Trend: rank each user's entries in the window from both ends
+        # and keep only the first and last one.
+        ranked = session.query(
+            WeightEntry.user_id.label('user_id'),
+            WeightEntry.weight_kg.label('weight_kg'),
+            func.row_number().over(
+                partition_by=WeightEntry.user_id,
+                order_by=(WeightEntry.date.asc(), WeightEntry.id.asc())
+            ).label('first_rank'),
+            func.row_number().over(
+                partition_by=WeightEntry.user_id,
+                order_by=(WeightEntry.date.desc(), WeightEntry.id.desc())
+            ).label('last_rank')
+        ).filter(
+            WeightEntry.client_id.in_(client_ids),
+            WeightEntry.user_id.in_(ids),
+            WeightEntry.date >= start_date
+        ).subquery()
+
+        first_weight, last_weight = {}, {}
+        weight_rows = session.query(
+            ranked.c.user_id, ranked.c.weight_kg, ranked.c.first_rank, ranked.c.last_rank
+        ).filter(or_(ranked.c.first_rank == 1, ranked.c.last_rank == 1)).all()
+        for user_id, weight_kg, first_rank, last_rank in weight_rows:
+            if first_rank == 1:
+                first_weight[user_id] = weight_kg
+            if last_rank == 1:
+                last_weight[user_id] = weight_kg
+
+        # 3. Workout Performance
+        workout_counts = dict(session.query(
+            WorkoutLog.user_id, func.count(WorkoutLog.id)
+        ).filter(
+            WorkoutLog.client_id.in_(client_ids),
+            WorkoutLog.user_id.in_(ids),
+            WorkoutLog.date >= start_date
+        ).group_by(WorkoutLog.user_id).all())
+
+        # 4. Diet Adherence: per-user, per-day calorie totals from the rollup, over the
+        # same whole days as get_diet_adherence_score
+        daily_calories = {}
+        diet_rows = session.query(
+            DailyNutrition.user_id,
+            DailyNutrition.calories
+        ).filter(
+            DailyNutrition.client_id.in_(client_ids),
+            DailyNutrition.user_id.in_(ids),
+            DailyNutrition.day > start_date.date(),
+            DailyNutrition.meal_count > 0
+        ).all()
+        for user_id, calories in diet_rows:
+            daily_calories.setdefault(user_id, []).append(calories)
+
+        # 5. Assemble one report per user, with every target computed in one vectorized call
+        targets = target_calories_for_users(users)
+        reports = {}
+        for user, target_calories in zip(users, targets.tolist()):
+            if math.isnan(target_calories):
+                # Without weight, height or age there is no target to score against
+                print(f"No weekly report for user {user.id}: the profile has no {', '.join(missing_measurements(user))}.")
+                reports[user.id] = None
+                continue
+            try:
+                weight_change_kg = 0.0
+                if user.id in first_weight:
+                    # A single entry is both first and last, which gives 0.0 as before
+                    weight_change_kg = round(last_weight[user.id] - first_weight[user.id], 2)
+                reports[user.id] = cls._build_report(
+                    user, start_date, end_date, weight_change_kg,
+                    workout_counts.get(user.id, 0),
+                    cls._score_adherence(daily_calories.get(user.id, []), target_calories),
+                    target_calories
+                )
+            except Exception as e:
+                # Bad data for one user fails only that user's report
+                print(f"Could not build the weekly report for user {user.id}: {e!r}")
+                reports[user.id] = None
+        return reports
@@ -1,6 +1,7 @@
 # app/services/reward_service.py
-from app.models import User, Achievement, db
+from app.models import User, Achievement, WeightEntry, db
 from app.services.reporting_service import ReportingService
+from app.utils.energy import missing_measurements
 from flask import abort
 
 class RewardService:
@@ -10,6 +11,27 @@ class RewardService:
         if not self.user:
             abort(404, description="User not found.")
         self.reporting_service = ReportingService(user_id)
+        self._unlocked = None
+
+    def unlocked_achievement_names(self):
+        """The names of the achievements this user already has, read once per evaluation."""
+        if self._unlocked is None:
+            self._unlocked = set(db.session.scalars(
+                db.select(Achievement.name).where(
+                    Achievement.client_id == self.user.client_id,
+                    Achievement.user_id == self.user.id
+                )
+            ))
+        return self._unlocked
+
+    def get_initial_weight(self):
+        """The user's earliest logged weight, or None, without loading the rest of the history."""
+        return db.session.scalars(
+            db.select(WeightEntry.weight_kg)
+            .where(WeightEntry.client_id == self.user.client_id, WeightEntry.user_id == self.user.id)
+            .order_by(WeightEntry.date, WeightEntry.id)
+            .limit(1)
+        ).first()
 
     def check_and_grant_rewards(self):
         """
@@ -35,10 +57,13 @@ class RewardService:
         """
         Checks for and ADDS (but does not commit) the cheat meal achievement.
         """
-        # Check if this achievement already exists in the database
-        if Achievement.query.filter_by(user_id=self.user.id, name="Cheat Meal Unlocked").first():
+        # Check if this achievement was already unlocked
+        if "Cheat Meal Unlocked" in self.unlocked_achievement_names():
             return False # Already has this reward, do nothing.
 
+        if missing_measurements(self.user):
+            return False # No calorie target to adhere to until the profile has weight, height and age
+
         adherence_score = self.reporting_service.get_diet_adherence_score(days=7)
         
         if adherence_score >= required_score:
@@ -50,6 +75,7 @@ class RewardService:
                 description=f"Unlocked for maintaining a {adherence_score}% diet adherence for 7 days."
             )
             db.session.add(achievement) # Add to session, but don't commit yet
+            self.unlocked_achievement_names().add(achievement.name)
             return True # Signal that a new reward was added
         return False
 
@@ -57,17 +83,14 @@ class RewardService:
         """
         Checks for and ADDS (but does not commit) the weight loss milestone.
         """
-        if Achievement.query.filter_by(user_id=self.user.id, name="5% Weight Loss Milestone").first():
+        if "5% Weight Loss Milestone" in self.unlocked_achievement_names():
             return False # Already has this reward
 
-        if not self.user.weight_history:
-            return False
-            
-        initial_weight = self.user.weight_history[0].weight_kg
+        initial_weight = self.get_initial_weight()
         current_weight = self.user.weight_kg
 
-        # Ensure initial_weight is not zero to avoid division by zero error
-        if initial_weight == 0:
+        # Ensure there is a starting weight, and that it is not zero to avoid division by zero error
+        if not initial_weight or current_weight is None:
             return False
 
         weight_loss_percentage = ((initial_weight - current_weight) / initial_weight) * 100
@@ -81,5 +104,6 @@ class RewardService:
                 description=f"Congratulations on losing {weight_loss_percentage:.1f}% of your starting body weight!"
             )
             db.session.add(achievement) # Add to session, but don't commit yet
+            self.unlocked_achievement_names().add(achievement.name)
             return True # Signal that a new reward was added
         return False
\ No newline at end of file
@@ -0,0 +1,327 @@
+# app/services/rule_based_planner.py
+
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app
+
+# 'llm' always asks the model, 'rules' never does, and 'fallback' asks the model
+# but answers from the rules below when it errors or overruns PLANNER_LLM_BUDGET.
+PLANNER_MODES = ('llm', 'rules', 'fallback')
+
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Share of the day's calories per meal, in the order the LLM prompt asks for
+MEAL_SPLIT = (('Breakfast', 0.25), ('Lunch', 0.30), ('Snack1', 0.10), ('Dinner', 0.25), ('Snack2', 0.10))
+
+# The bundled food table: (meal slot, diet, items, portion of one serving, kcal per serving, allergens).
+# 'veg' dishes include dairy but no eggs; 'non-veg' users are offered both kinds.
+# Allergens cover every ingredient, including ones the name leaves out (ghee in a tadka, curd in a marinade).
+FOODS = (
+    ('Breakfast', 'veg', "Vegetable poha with peanuts", "1 plate", 300, ('peanut',)),
+    ('Breakfast', 'veg', "Moong dal chilla with mint chutney", "2 chillas", 280, ()),
+    ('Breakfast', 'veg', "Vegetable upma", "1 bowl", 290, ('gluten',)),
+    ('Breakfast', 'veg', "Idli with sambar", "3 idlis + 1 bowl sambar", 320, ()),
+    ('Breakfast', 'veg', "Oats porridge with milk and banana", "1 bowl", 310, ('dairy',)),
+    ('Breakfast', 'veg', "Paneer paratha with curd", "1 paratha + 1/2 cup curd", 380, ('dairy', 'gluten')),
+    ('Breakfast', 'veg', "Besan chilla with curd", "2 chillas + 1/2 cup curd", 300, ('dairy',)),
+    ('Breakfast', 'non-veg', "Masala omelette with whole-wheat toast", "2 eggs + 2 slices", 350, ('egg', 'gluten')),
+    ('Breakfast', 'non-veg', "Egg bhurji with roti", "2 eggs + 2 rotis", 360, ('egg', 'gluten')),
+    ('Lunch', 'veg', "Rajma chawal with salad", "1 cup rajma + 1 cup rice", 480, ()),
+    ('Lunch', 'veg', "Dal tadka, rotis and mixed vegetable sabzi", "1 bowl dal + 2 rotis + 1 bowl sabzi", 450, ('dairy', 'gluten')),
+    ('Lunch', 'veg', "Chole with brown rice and cucumber raita", "1 cup chole + 1 cup rice + 1/2 cup raita", 500, ('dairy',)),
+    ('Lunch', 'veg', "Palak paneer with rotis", "1 bowl + 2 rotis", 470, ('dairy', 'gluten')),
+    ('Lunch', 'veg', "Vegetable khichdi with curd", "1.5 cups + 1/2 cup curd", 420, ('dairy',)),
+    ('Lunch', 'veg', "Sambar rice with beans poriyal", "1.5 cups + 1 bowl poriyal", 440, ()),
+    ('Lunch', 'non-veg', "Chicken curry with rice and salad", "150 g chicken + 1 cup rice", 550, ()),
+    ('Lunch', 'non-veg', "Fish curry with rice", "150 g fish + 1 cup rice", 520, ('fish',)),
+    ('Lunch', 'non-veg', "Egg curry with rotis", "2 eggs + 2 rotis", 460, ('egg', 'gluten')),
+    ('Dinner', 'veg', "Moong dal with rotis and lauki sabzi", "1 bowl dal + 2 rotis + 1 bowl sabzi", 400, ('gluten',)),
+    ('Dinner', 'veg', "Paneer bhurji with rotis", "100 g paneer + 2 rotis", 430, ('dairy', 'gluten')),
+    ('Dinner', 'veg', "Vegetable dalia with curd", "1.5 cups + 1/2 cup curd", 350, ('dairy', 'gluten')),
+    ('Dinner', 'veg', "Mixed dal with jeera rice and salad", "1 bowl dal + 3/4 cup rice", 420, ()),
+    ('Dinner', 'veg', "Soya chunk curry with rotis", "1 bowl + 2 rotis", 410, ('soy', 'gluten')),
+    ('Dinner', 'veg', "Tofu and vegetable stir-fry with rice", "150 g tofu + 3/4 cup rice", 390, ('soy',)),
+    ('Dinner', 'non-veg', "Grilled chicken with sauteed vegetables and roti", "150 g chicken + 1 roti", 420, ('gluten',)),
+    ('Dinner', 'non-veg', "Tandoori fish with salad and roti", "150 g fish + 1 roti", 400, ('fish', 'dairy', 'gluten')),
+    ('Snack', 'veg', "Roasted chana", "30 g", 120, ()),
+    ('Snack', 'veg', "Fruit bowl (apple, papaya, banana)", "1 bowl", 130, ()),
+    ('Snack', 'veg', "Buttermilk with almonds", "1 glass + 10 almonds", 140, ('dairy', 'tree nut')),
+    ('Snack', 'veg', "Sprouts chaat", "1 bowl", 150, ()),
+    ('Snack', 'veg', "Roasted makhana", "1 cup", 110, ()),
+    ('Snack', 'veg', "Curd with fruit", "1 cup", 150, ('dairy',)),
+    ('Snack', 'non-veg', "Boiled eggs", "2 eggs", 140, ('egg',)),
+)
+
+# Words in a user's allergies that rule out dishes carrying each allergen tag (matched as whole words,
+# plurals included, so "peanuts" is a peanut allergy but not a tree nut one)
+ALLERGEN_KEYWORDS = {
+    'dairy': ('dairy', 'milk', 'lactose', 'casein', 'paneer', 'curd', 'yogurt', 'ghee', 'butter', 'cheese'),
+    'peanut': ('peanut', 'groundnut', 'nut'),
+    'tree nut': ('tree nut', 'nut', 'almond', 'cashew', 'walnut', 'pistachio'),
+    'egg': ('egg',),
+    'fish': ('fish', 'seafood'),
+    'soy': ('soy', 'soya', 'tofu'),
+    'gluten': ('gluten', 'wheat', 'celiac', 'coeliac'),
+}
+
+# The exercise library: form tip per exercise, then the exercises available per equipment and muscle group
+EXERCISE_TIPS = {
+    "Push-ups": "Keep a straight line from head to heels and lower your chest to a fist's height from the floor.",
+    "Incline push-ups": "Hands on a sturdy bench or table; brace your core so the hips don't sag.",
+    "Pike push-ups": "Hips high, lower the top of your head towards the floor between your hands.",
+    "Chair dips": "Keep your back close to the chair and stop when the upper arms are parallel to the floor.",
+    "Plank shoulder taps": "Feet wide and hips still while you alternate taps.",
+    "Inverted rows": "Under a sturdy table, pull your chest to the edge and squeeze the shoulder blades.",
+    "Superman hold": "Lift arms and legs together and hold without straining the neck.",
+    "Reverse snow angels": "Lying face down, sweep the arms from hips to overhead with thumbs up.",
+    "Towel rows": "Loop a towel round a door handle, lean back and row with elbows close to the body.",
+    "Bodyweight squats": "Sit back and down, knees tracking over the toes, chest up.",
+    "Walking lunges": "Long steps; the back knee almost touches the floor.",
+    "Glute bridges": "Drive through the heels and squeeze the glutes at the top.",
+    "Step-ups": "Push through the front heel and control the way down.",
+    "Wall sit": "Thighs parallel to the floor, back flat against the wall.",
+    "Calf raises": "Pause at the top and lower slowly.",
+    "Plank": "Elbows under shoulders, squeeze glutes and abs, breathe steadily.",
+    "Mountain climbers": "Keep the hips level while driving the knees in.",
+    "Dead bugs": "Press the lower back into the floor as you extend opposite arm and leg.",
+    "Bicycle crunches": "Rotate from the ribs, not the neck; move slowly.",
+    "Side plank": "Stack the feet and keep the hips lifted in a straight line.",
+    "Dumbbell floor press": "Lower until the elbows touch the floor, then press straight up.",
+    "Dumbbell shoulder press": "Brace the core and press overhead without arching the lower back.",
+    "Dumbbell lateral raise": "Lead with the elbows and stop at shoulder height.",
+    "Overhead triceps extension": "Keep the elbows pointing forward and close to the head.",
+    "Dumbbell bent-over row": "Hinge at the hips with a flat back and pull towards the hip.",
+    "One-arm dumbbell row": "Support yourself on a bench and avoid twisting the torso.",
+    "Band pull-aparts": "Arms straight at chest height; squeeze the shoulder blades together.",
+    "Dumbbell hammer curl": "Elbows pinned to your sides, no swinging.",
+    "Goblet squat": "Hold the dumbbell at the chest and keep the elbows inside the knees.",
+    "Dumbbell Romanian deadlift": "Soft knees, push the hips back and keep the weights close to the legs.",
+    "Dumbbell reverse lunge": "Step back and keep the front knee over the ankle.",
+    "Bench press": "Feet planted, shoulder blades retracted, bar to mid-chest.",
+    "Overhead press": "Squeeze the glutes and press the bar in a straight line over the head.",
+    "Incline dumbbell press": "Bench at 30 degrees; lower the dumbbells to the upper chest.",
+    "Cable fly": "Slight bend in the elbows, bring the hands together in an arc.",
+    "Triceps pushdown": "Elbows fixed at your sides, extend fully at the bottom.",
+    "Lat pulldown": "Pull the bar to the upper chest, leading with the elbows.",
+    "Seated cable row": "Sit tall and pull the handle to the stomach without leaning back.",
+    "Barbell row": "Flat back at about 45 degrees, pull the bar to the lower ribs.",
+    "Pull-ups": "Start from a dead hang and pull until the chin clears the bar.",
+    "Face pulls": "Pull the rope towards the eyes with elbows high.",
+    "Barbell curl": "Keep the elbows still and avoid swinging the hips.",
+    "Back squat": "Brace, break at hips and knees together, reach at least parallel.",
+    "Romanian deadlift": "Push the hips back with a neutral spine until you feel the hamstrings stretch.",
+    "Leg press": "Feet shoulder-width; don't let the lower back lift off the pad.",
+    "Leg curl": "Curl smoothly and lower under control.",
+}
+
+EXERCISE_LIBRARY = {
+    'bodyweight only': {
+        'Push': ("Push-ups", "Incline push-ups", "Pike push-ups", "Chair dips", "Plank shoulder taps"),
+        'Pull': ("Inverted rows", "Towel rows", "Superman hold", "Reverse snow angels"),
+        'Legs': ("Bodyweight squats", "Walking lunges", "Glute bridges", "Step-ups", "Wall sit", "Calf raises"),
+    },
+    'Home gym': {
+        'Push': ("Dumbbell floor press", "Dumbbell shoulder press", "Push-ups", "Dumbbell lateral raise", "Overhead triceps extension"),
+        'Pull': ("Dumbbell bent-over row", "One-arm dumbbell row", "Band pull-aparts", "Dumbbell hammer curl"),
+        'Legs': ("Goblet squat", "Dumbbell Romanian deadlift", "Dumbbell reverse lunge", "Glute bridges", "Step-ups", "Calf raises"),
+    },
+    'Gym access': {
+        'Push': ("Bench press", "Overhead press", "Incline dumbbell press", "Cable fly", "Dumbbell lateral raise", "Triceps pushdown"),
+        'Pull': ("Lat pulldown", "Seated cable row", "Barbell row", "Pull-ups", "Face pulls", "Barbell curl"),
+        'Legs': ("Back squat", "Romanian deadlift", "Leg press", "Walking lunges", "Leg curl", "Calf raises"),
+    },
+}
+CORE_EXERCISES = ("Plank", "Mountain climbers", "Dead bugs", "Bicycle crunches", "Side plank")
+
+# Exercises per session and the (sets, reps, rest_seconds) prescription for each fitness level
+LEVEL_PRESCRIPTIONS = {
+    'beginner': (5, 3, 10, 90),
+    'intermediate': (6, 4, 10, 75),
+    'advanced': (7, 4, 8, 60),
+}
+
+# Which weekdays are training days, and what each session trains, for 1-6 workouts a week
+WEEKLY_SPLITS = {
+    1: ((0, 'Full Body'),),
+    2: ((0, 'Full Body'), (3, 'Full Body')),
+    3: ((0, 'Push'), (2, 'Pull'), (4, 'Legs')),
+    4: ((0, 'Push'), (1, 'Pull'), (3, 'Legs'), (4, 'Full Body')),
+    5: ((0, 'Push'), (1, 'Pull'), (2, 'Legs'), (4, 'Full Body'), (5, 'Core & Conditioning')),
+    6: ((0, 'Push'), (1, 'Pull'), (2, 'Legs'), (3, 'Push'), (4, 'Pull'), (5, 'Legs')),
+}
+
+
+def _excluded_terms(*texts):
+    """Lower-cased words and phrases from free-text dislikes/allergies, e.g. "Paneer, fish"."""
+    terms = set()
+    for text in texts:
+        if text and text.strip().lower() not in ('none', 'no', 'n/a'):
+            terms.update(term.strip().lower() for term in re.split(r'[,;/\n]| and ', text) if term.strip())
+    return terms
+
+
+def _allergen_tags(terms):
+    """The FOODS allergen tags named by any of the given allergy terms."""
+    return {
+        tag for tag, keywords in ALLERGEN_KEYWORDS.items()
+        if any(re.search(rf'\b{keyword}s?\b', term) for keyword in keywords for term in terms)
+    }
+
+
+def _servings(meal_calories, serving_calories):
+    """Servings (in quarters, between 0.5 and 2.5) that get closest to the meal's calorie share."""
+    return min(2.5, max(0.5, round(meal_calories / serving_calories * 4) / 4))
+
+
+def build_diet_plan(target_calories, diet_type='veg', primary_goal='', disliked_foods=None, allergies=None):
+    """
+    Builds a 7-day plan with the same JSON shape the diet prompt asks the LLM
+    for, by rotating through the food table and scaling each dish's portion to
+    its meal's share of `target_calories`. Dishes that mention a disliked food
+    or an allergen, or carry an allergen tag, are left out; raises ValueError
+    when that leaves a meal with nothing to serve.
+    """
+    diet_type = (diet_type or 'veg').lower()
+    excluded = _excluded_terms(disliked_foods, allergies)
+    excluded_tags = _allergen_tags(_excluded_terms(allergies))
+    weekly_plan = {}
+    for day_index, day in enumerate(DAYS):
+        meals = {}
+        for meal_index, (meal, share) in enumerate(MEAL_SPLIT):
+            slot = 'Snack' if meal.startswith('Snack') else meal
+            options = [
+                food for food in FOODS
+                if food[0] == slot and (diet_type == 'non-veg' or food[1] == 'veg')
+                and not any(term in food[2].lower() for term in excluded)
+                and not excluded_tags.intersection(food[5])
+            ]
+            if not options:
+                raise ValueError(f"No {slot.lower()} in the food table fits the user's dislikes and allergies.")
+            _, _, items, portion, serving_calories, _ = options[(day_index + meal_index * 2) % len(options)]
+            servings = _servings(target_calories * share, serving_calories)
+            meals[meal] = {
+                "items": items,
+                "portion": portion if servings == 1 else f"{servings:g} x ({portion})",
+                "calories": round(serving_calories * servings)
+            }
+        weekly_plan[day] = meals
+
+    return {
+        "weekly_plan": weekly_plan,
+        "summary": {
+            "primary_goal": primary_goal,
+            "target_daily_calories": f"{target_calories:.0f}",
+            "cuisine_focus": "Indian, using commonly available ingredients",
+            "dietary_preference": diet_type.capitalize()
+        }
+    }
+
+
+def _workouts_per_week(value):
+    """Parses the profile's free-text workouts per week ("4", "3-4", "5 days") into 1-6."""
+    match = re.search(r'\d+', str(value or ''))
+    return min(6, max(1, int(match.group()))) if match else 3
+
+
+def build_workout_plan(fitness_level='beginner', equipment='bodyweight only', workouts_per_week=3, primary_goal=''):
+    """
+    Builds a 7-day schedule with the same JSON shape the workout prompt asks
+    the LLM for, from the exercise library for the available equipment. Sets,
+    reps, rest and the number of exercises come from the fitness level.
+    """
+    library = EXERCISE_LIBRARY.get(equipment, EXERCISE_LIBRARY['bodyweight only'])
+    count, sets, reps, rest = LEVEL_PRESCRIPTIONS.get(fitness_level, LEVEL_PRESCRIPTIONS['beginner'])
+    sessions = dict(WEEKLY_SPLITS[_workouts_per_week(workouts_per_week)])
+
+    schedule = {}
+    for day_index, day in enumerate(DAYS):
+        day_type = sessions.get(day_index)
+        if day_type is None:
+            schedule[day] = {"day_type": "Rest"}
+            continue
+
+        if day_type == 'Full Body':
+            # Alternate legs, push, pull and core, moving one exercise along per lap
+            groups = (library['Legs'], library['Push'], library['Pull'], CORE_EXERCISES)
+            names = [groups[i % 4][(day_index + i // 4) % len(groups[i % 4])] for i in range(count)]
+        elif day_type == 'Core & Conditioning':
+            names = list(CORE_EXERCISES)
+        else:
+            group = library[day_type]
+            names = [group[(day_index + i) % len(group)] for i in range(min(count - 1, len(group)))]
+            names.append(CORE_EXERCISES[day_index % len(CORE_EXERCISES)])
+
+        schedule[day] = {
+            "day_type": f"{day_type} Day" if day_type in ('Push', 'Pull', 'Legs') else day_type,
+            "exercises": [
+                {"name": name, "sets": sets, "reps": reps, "rest_seconds": rest, "form_guidance": EXERCISE_TIPS[name]}
+                for name in names
+            ]
+        }
+
+    return {"plan_name": f"Weekly Plan for {primary_goal}", "weekly_schedule": schedule}
+
+
+def rule_based_calorie_adjustment(fitness_goals, weight_change_kg, adherence_score):
+    """
+    The weekly job's calorie adjustment without the LLM: nudge the target by
+    150 kcal when a user who followed the plan isn't moving towards their goal.
+    """
+    goal = (fitness_goals or '').lower()
+    if adherence_score < 70:
+        return 0 # The plan wasn't followed, so changing the target won't help
+    if 'loss' in goal:
+        return -150 if weight_change_kg > -0.25 else 0
+    if 'gain' in goal:
+        return 150 if weight_change_kg < 0.25 else 0
+    if abs(weight_change_kg) > 0.5:
+        return -100 if weight_change_kg > 0 else 100
+    return 0
+
+
+# --- Mode selection ---
+
+def planner_mode():
+    """The configured PLANNER_MODE of the current app."""
+    mode = current_app.config.get('PLANNER_MODE', 'llm')
+    if mode not in PLANNER_MODES:
+        raise ValueError(f"PLANNER_MODE must be one of {', '.join(PLANNER_MODES)}, not '{mode}'.")
+    return mode
+
+
+def llm_required():
+    """True when plans can only come from the LLM, so it must be configured."""
+    return planner_mode() == 'llm'
+
+
+# Threads that run LLM calls under a latency budget. A call that overruns keeps
+# its thread until the backend's own request timeout ends it, and that timeout is
+# the budget left when the call starts, so stragglers don't outlive their budget.
+_budget_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-budget")
+
+
+def call_within_budget(func, budget):
+    """
+    Runs func(timeout) and returns its result, raising concurrent.futures.TimeoutError
+    if it takes longer than `budget` seconds. `timeout` is what is left of the
+    budget once a budget thread picks the call up; pass it on as the LLM request
+    timeout. The call runs in the caller's context (app context, request metrics),
+    and one still queued when the budget runs out is cancelled rather than started.
+    """
+    context = contextvars.copy_context()
+    deadline = time.monotonic() + budget
+
+    def _run():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise FutureTimeoutError(f"LLM budget of {budget}s ran out before the call started.")
+        return context.run(func, remaining)
+
+    future = _budget_executor.submit(_run)
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
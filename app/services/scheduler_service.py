@@ -0,0 +1,230 @@
+# app/services/scheduler_service.py
+
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timezone, timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import db, SchedulerLease, JobRun
+
+
+class JobScheduler:
+    """
+    Runs the app's periodic jobs once per cluster rather than once per process.
+
+    Every gunicorn worker (and every container) still starts an APScheduler,
+    but when a job fires each of them first tries to take a lease row in the
+    database. Only the process that wins the lease runs the job; the others
+    skip it. While the job runs, a heartbeat thread renews the lease every
+    `heartbeat_interval` seconds; if the holder dies the renewals stop and the
+    lease expires after `lease_ttl` seconds, so a crashed holder can't block
+    the job forever. A job that already succeeded within
+    `dedupe_window` seconds is not run again by a process whose clock fired
+    late. Each run is recorded in the job_run table.
+    """
+    def __init__(self, lease_ttl=6 * 3600, dedupe_window=3600, heartbeat_interval=300):
+        self.app = None
+        self.lease_ttl = lease_ttl
+        self.dedupe_window = dedupe_window
+        self.heartbeat_interval = heartbeat_interval
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs = {}
+        self._scheduler = None
+        # Jobs running in this process; the lease alone can't tell, since it is re-entrant for its holder
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.lease_ttl = app.config.get('SCHEDULER_LEASE_TTL', 6 * 3600)
+        self.dedupe_window = app.config.get('SCHEDULER_DEDUPE_WINDOW', 3600)
+        # Renew well before expiry, so one slow or failed renewal doesn't lose the lease
+        self.heartbeat_interval = min(app.config.get('SCHEDULER_HEARTBEAT_INTERVAL', 300), self.lease_ttl / 3)
+        app.cli.add_command(jobs_cli)
+        app.extensions['job_scheduler'] = self
+
+    def register(self, name, func, **trigger):
+        """Registers a job under a name with its cron trigger, e.g. day_of_week='sun', hour=2."""
+        self.jobs[name] = (func, trigger)
+
+    def start(self):
+        """Starts an APScheduler in this process that fires every registered job through run_job()."""
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        # Refreshed here too, since a --preload'ed master forks workers with its own pid
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._scheduler = BackgroundScheduler(daemon=True)
+        for name, (_, trigger) in self.jobs.items():
+            self._scheduler.add_job(self.run_job, 'cron', args=[name], id=name, **trigger)
+        self._scheduler.start()
+
+    def acquire_lease(self, name):
+        """Takes the lease for a job if it is free, expired or already ours. Returns True on success."""
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.lease_ttl)
+        result = db.session.execute(
+            update(SchedulerLease)
+            .where(
+                SchedulerLease.name == name,
+                or_(SchedulerLease.expires_at <= now, SchedulerLease.holder == self.holder)
+            )
+            .values(holder=self.holder, acquired_at=now, expires_at=expires_at)
+        )
+        if result.rowcount == 1:
+            db.session.commit()
+            return True
+
+        # No row was updated: either nobody has held this lease yet, or someone else holds it.
+        try:
+            db.session.add(SchedulerLease(name=name, holder=self.holder, acquired_at=now, expires_at=expires_at))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    def renew_lease(self, name):
+        """
+        Pushes the lease's expiry another lease_ttl seconds out, if this process
+        still holds it. Uses its own session so it never commits the job's work.
+        Returns True if the lease was renewed.
+        """
+        with Session(db.engine) as session:
+            result = session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == name, SchedulerLease.holder == self.holder)
+                .values(expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.lease_ttl))
+            )
+            session.commit()
+        return result.rowcount == 1
+
+    def _heartbeat(self, name, stop):
+        """Renews the lease until `stop` is set (runs on its own thread for the length of a job)."""
+        with self.app.app_context():
+            while not stop.wait(self.heartbeat_interval):
+                try:
+                    if not self.renew_lease(name):
+                        print(f"Job '{name}' lost its lease; another process may take it over.")
+                except Exception as e:
+                    print(f"Could not renew the lease for job '{name}': {e!r}")
+
+    def release_lease(self, name):
+        """Gives the lease back early, but only if this process still holds it."""
+        db.session.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == name, SchedulerLease.holder == self.holder)
+            .values(expires_at=datetime.now(timezone.utc))
+        )
+        db.session.commit()
+
+    def _ran_recently(self, name):
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.dedupe_window)
+        return db.session.query(JobRun.id).filter(
+            JobRun.job_name == name,
+            JobRun.status == 'succeeded',
+            JobRun.started_at >= since
+        ).first() is not None
+
+    def run_job(self, name, force=False, **kwargs):
+        """
+        Runs a registered job if this process can take its lease.
+
+        Scheduled runs skip a job that already succeeded within the dedupe
+        window; `force=True` (used by the CLI) runs it anyway, but still only
+        when no other process holds the lease. Returns the recorded run as a
+        dict, or None when the run was skipped.
+        """
+        func, _ = self.jobs[name]
+        with self._running_lock:
+            if name in self._running:
+                print(f"Skipping job '{name}': it is already running in this process.")
+                return None
+            self._running.add(name)
+
+        try:
+            return self._run_with_lease(name, func, force, kwargs)
+        finally:
+            with self._running_lock:
+                self._running.discard(name)
+
+    def _run_with_lease(self, name, func, force, kwargs):
+        with self.app.app_context():
+            if not self.acquire_lease(name):
+                print(f"Skipping job '{name}': another process holds the lease.")
+                return None
+
+            try:
+                if not force and self._ran_recently(name):
+                    print(f"Skipping job '{name}': it already ran within the last {self.dedupe_window}s.")
+                    return None
+
+                # We hold the lease, which only expires once its holder stops renewing it,
+                # so any run still marked as running belongs to a holder that died.
+                JobRun.query.filter_by(job_name=name, status='running').update(
+                    {"status": "abandoned", "finished_at": datetime.now(timezone.utc)}
+                )
+                run = JobRun(job_name=name, holder=self.holder, trigger='manual' if force else 'schedule')
+                db.session.add(run)
+                db.session.commit()
+                run_id = run.id
+
+                # Keep renewing the lease for as long as the job itself runs
+                stop_heartbeat = threading.Event()
+                heartbeat = threading.Thread(
+                    target=self._heartbeat, args=(name, stop_heartbeat), daemon=True, name=f"lease-heartbeat-{name}"
+                )
+                heartbeat.start()
+                try:
+                    summary = func(**kwargs)
+                    status, error = 'succeeded', None
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Job '{name}' failed: {e}")
+                    summary, status, error = None, 'failed', str(e)
+                finally:
+                    stop_heartbeat.set()
+                    heartbeat.join()
+
+                run = db.session.get(JobRun, run_id)
+                run.status = status
+                run.summary = summary
+                run.error = error
+                run.finished_at = datetime.now(timezone.utc)
+                db.session.commit()
+                return run.to_dict()
+            finally:
+                self.release_lease(name)
+
+
+# The single scheduler shared by the whole process
+job_scheduler = JobScheduler()
+
+
+jobs_cli = AppGroup('jobs', help="Run and inspect scheduled background jobs.")
+
+
+@jobs_cli.command('run')
+@click.argument('name')
+@click.option('--client-id', type=int, default=None, help='Only process the users of this client.')
+def run_job_command(name, client_id):
+    """Runs a scheduled job now, e.g. `flask jobs run weekly_adaptive_planning`."""
+    if name not in job_scheduler.jobs:
+        raise click.BadParameter(f"Unknown job '{name}'. Known jobs: {', '.join(sorted(job_scheduler.jobs))}")
+    kwargs = {'client_id': client_id} if client_id is not None else {}
+    run = job_scheduler.run_job(name, force=True, **kwargs)
+    if run is None:
+        raise click.ClickException(f"Job '{name}' is already running in another process.")
+    click.echo(f"Job '{name}' {run['status']}: {run['summary'] or run['error']}")
+
+
+@jobs_cli.command('history')
+@click.option('--limit', type=int, default=10, show_default=True)
+def job_history_command(limit):
+    """Lists the most recent job runs."""
+    for run in JobRun.query.order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit):
+        click.echo(f"{run.started_at:%Y-%m-%d %H:%M:%S}  {run.job_name}  {run.trigger}  {run.status}  {run.holder}")
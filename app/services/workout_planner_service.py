@@ -1,11 +1,14 @@
 # app/services/workout_planner_service.py
-import google.generativeai as genai
-import json
+from flask import current_app
+from .plan_cache_service import plan_cache
+from .llm_client import llm_client
+from .rule_based_planner import build_workout_plan, planner_mode, call_within_budget
 
 class WorkoutPlannerService:
-    def __init__(self, user, form_data):
+    def __init__(self, user, form_data, llm=None):
         self.user = user
         self.form_data = form_data
+        self.llm = llm or llm_client # The shared LLM client unless one is passed in
 
     def _generate_llm_prompt(self):
         # Using details from the user's profile and the request form
@@ -48,16 +51,46 @@ class WorkoutPlannerService:
         """
         return prompt
 
-    def _call_llm_api(self, prompt):
-        model = genai.GenerativeModel('gemini-2.5-pro')
-        generation_config = genai.GenerationConfig(response_mime_type="application/json")
-        response = model.generate_content(prompt, generation_config=generation_config)
-        return json.loads(response.text)
+    def _call_llm_api(self, prompt, budget=None):
+        if budget is None:
+            return self.llm.generate_json(prompt)
+        return call_within_budget(lambda timeout: self.llm.generate_json(prompt, timeout=timeout), budget)
 
-    def generate_plan(self):
+    def _rule_based_plan(self):
+        return build_workout_plan(
+            fitness_level=self.form_data.get('fitnessLevel', 'beginner'),
+            equipment=self.form_data.get('equipment', 'bodyweight only'),
+            workouts_per_week=self.user.workouts_per_week,
+            primary_goal=self.user.fitness_goals
+        )
+
+    def generate_plan(self, use_cache=True):
         try:
+            # PLANNER_MODE=rules builds the plan locally without asking the LLM
+            mode = planner_mode()
+            if mode == 'rules':
+                return {"success": True, "plan": self._rule_based_plan(), "cached": False, "source": "rules"}
+
             prompt = self._generate_llm_prompt()
-            final_plan = self._call_llm_api(prompt)
-            return {"success": True, "plan": final_plan}
+
+            # Identical prompts reuse the earlier plan; use_cache=False forces a fresh one
+            if use_cache:
+                cached_plan = plan_cache.get('workout', prompt, self.llm.model_name)
+                if cached_plan is not None:
+                    return {"success": True, "plan": cached_plan, "cached": True, "source": "llm"}
+            else:
+                plan_cache.record_bypass()
+
+            if mode == 'fallback':
+                # Answer from the rules if the LLM errors or overruns its latency budget
+                try:
+                    final_plan = self._call_llm_api(prompt, budget=current_app.config.get('PLANNER_LLM_BUDGET', 20))
+                except Exception as e:
+                    print(f"Workout plan LLM call failed or timed out ({e!r}); using the rule-based plan.")
+                    return {"success": True, "plan": self._rule_based_plan(), "cached": False, "source": "rules"}
+            else:
+                final_plan = self._call_llm_api(prompt)
+            plan_cache.set('workout', prompt, final_plan, self.llm.model_name)
+            return {"success": True, "plan": final_plan, "cached": False, "source": "llm"}
         except Exception as e:
             return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,101 @@
+# app/utils/api_key_cache.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# The only client fields the routes need. Caching these instead of the ORM
+# object means a cached entry is never bound to (or expired by) a DB session.
+CachedClient = namedtuple('CachedClient', ['id', 'company_name'])
+
+
+def hash_api_key(api_key):
+    """Returns the SHA-256 hex digest used as the cache key for an API key."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+class ClientCache:
+    """
+    A bounded, thread-safe, in-process TTL cache of API key -> client lookups.
+
+    Entries are keyed by a hash of the API key so raw keys never sit in memory
+    longer than the request that carried them. When the cache is full the least
+    recently used entry is evicted. Each gunicorn worker has its own cache, so
+    the TTL bounds how long a rotated or deleted key can stay valid in workers
+    that did not see the change.
+    """
+    def __init__(self, ttl_seconds=60, max_size=1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Reads the cache settings from the app config and starts empty."""
+        self.ttl_seconds = app.config.get('API_KEY_CACHE_TTL', 60)
+        self.max_size = app.config.get('API_KEY_CACHE_MAX_SIZE', 1024)
+        self.clear()
+
+    def get(self, api_key):
+        """Returns the cached client for this key, or None on a miss."""
+        key = hash_api_key(api_key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, api_key, client):
+        """Stores the id and company name of a resolved client and returns them."""
+        cached = CachedClient(id=client.id, company_name=client.company_name)
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return cached
+        key = hash_api_key(api_key)
+        with self._lock:
+            self._entries[key] = (cached, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, api_key):
+        """Drops the entry for a single API key, if present."""
+        with self._lock:
+            self._entries.pop(hash_api_key(api_key), None)
+
+    def invalidate_client(self, client_id):
+        """Drops every entry that resolves to the given client."""
+        with self._lock:
+            stale = [key for key, (cached, _) in self._entries.items() if cached.id == client_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Returns the hit/miss counters and current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+# The single cache instance shared by every request in this process
+client_cache = ClientCache()
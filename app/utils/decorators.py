@@ -3,6 +3,7 @@
 from functools import wraps
 from flask import request, g, jsonify
 from app.models import Client
+from app.utils.api_key_cache import client_cache
 
 def require_api_key(f):
     """
@@ -14,6 +15,8 @@ def require_api_key(f):
 
     If the key is valid, it finds the corresponding client and attaches it
     to Flask's global 'g' object, making it accessible within the route.
+    Resolved keys are kept in an in-process TTL cache, so repeat requests with
+    the same key skip the database lookup entirely.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -24,17 +27,22 @@ def require_api_key(f):
         if not api_key:
             return jsonify({"error": "API key is missing"}), 401
 
-        # 3. Look for a client in the database with a matching API key.
-        client = Client.query.filter_by(api_key=api_key).first()
+        # 3. Check the cache first, then fall back to the database.
+        client = client_cache.get(api_key)
+        if client is None:
+            db_client = Client.query.filter_by(api_key=api_key).first()
 
-        # 4. If the key doesn't match any client, block with a 403 Forbidden error.
-        if not client:
-            return jsonify({"error": "API key is invalid or unauthorized"}), 403
+            # 4. If the key doesn't match any client, block with a 403 Forbidden error.
+            # Unknown keys are deliberately not cached.
+            if not db_client:
+                return jsonify({"error": "API key is invalid or unauthorized"}), 403
 
-        # 5. If the key is valid, attach the client object to the request context.
+            client = client_cache.set(api_key, db_client)
+
+        # 5. If the key is valid, attach the client (id, company_name) to the request context.
         # This allows you to use `g.client` inside your route.
         g.client = client
         
         # 6. Finally, call the original route function (e.g., register_user).
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
@@ -0,0 +1,138 @@
+# app/utils/energy.py
+
+# numpy is imported inside the functions that need it, so importing this module
+# (every planner and report service does) doesn't load it at app startup.
+
+# TDEE multiplier per activity level, keyed by the lower-cased name without spaces,
+# so 'lightlyActive', 'lightly active' and 'lightlyactive' all match.
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'lightlyactive': 1.375,
+    'moderatelyactive': 1.55,
+    'veryactive': 1.725,
+    'extraactive': 1.9
+}
+DEFAULT_ACTIVITY_MULTIPLIER = 1.2
+
+# Daily calorie change for a goal that mentions losing or gaining weight
+WEIGHT_LOSS_ADJUSTMENT = -500
+WEIGHT_GAIN_ADJUSTMENT = 500
+
+# The profile fields the BMR can't be estimated without (gender, activity and goal have defaults)
+REQUIRED_MEASUREMENTS = ('weight_kg', 'height_cm', 'age')
+
+
+class IncompleteProfileError(ValueError):
+    """Raised when a calorie target is asked for a user without weight, height or age."""
+
+
+def _is_scalar(value):
+    import numpy as np
+    return value is None or isinstance(value, str) or np.ndim(value) == 0
+
+
+def _per_user(func, values):
+    """Applies func to one value, or to each value of a sequence (returning an array)."""
+    if _is_scalar(values):
+        return func(values)
+    import numpy as np
+    return np.fromiter((func(value) for value in values), dtype=float, count=len(values))
+
+
+def _is_missing(value):
+    return value is None or value != value  # None, or NaN
+
+
+def missing_measurements(user):
+    """The REQUIRED_MEASUREMENTS a user's profile lacks (None or NaN), in that order."""
+    return [name for name in REQUIRED_MEASUREMENTS if _is_missing(getattr(user, name))]
+
+
+def _activity_multiplier(level):
+    return ACTIVITY_MULTIPLIERS.get((level or 'sedentary').lower().replace(" ", ""), DEFAULT_ACTIVITY_MULTIPLIER)
+
+
+def _goal_adjustment(goal):
+    goal = (goal or '').lower()
+    if 'loss' in goal:
+        return WEIGHT_LOSS_ADJUSTMENT
+    if 'gain' in goal:
+        return WEIGHT_GAIN_ADJUSTMENT
+    return 0
+
+
+def _sex_constant(gender):
+    return 5.0 if (gender or '').lower() == 'male' else -161.0
+
+
+def activity_multipliers(levels):
+    """The TDEE multiplier of one activity level, or an array of them (unknown levels count as sedentary)."""
+    return _per_user(_activity_multiplier, levels)
+
+
+def goal_adjustments(goals):
+    """The goal's daily calorie change (-500 for loss, +500 for gain, else 0), for one goal or an array of them."""
+    return _per_user(_goal_adjustment, goals)
+
+
+def bmr(weight_kg, height_cm, age, gender):
+    """
+    Mifflin-St Jeor basal metabolic rate. Takes scalars for one user or
+    equal-length sequences/arrays for many; anything but 'male' uses the
+    female constant. One user missing a measurement (None or NaN) raises
+    IncompleteProfileError; in a batch, those users get NaN instead so the
+    rest still get their values.
+    """
+    import numpy as np
+    if _is_scalar(weight_kg):
+        missing = [
+            name for name, value in zip(REQUIRED_MEASUREMENTS, (weight_kg, height_cm, age)) if _is_missing(value)
+        ]
+        if missing:
+            raise IncompleteProfileError(f"Calorie targets need weight_kg, height_cm and age; missing: {', '.join(missing)}.")
+    result = (
+        10 * np.asarray(weight_kg, dtype=float)
+        + 6.25 * np.asarray(height_cm, dtype=float)
+        - 5 * np.asarray(age, dtype=float)
+        + _per_user(_sex_constant, gender)
+    )
+    return float(result) if np.ndim(result) == 0 else result
+
+
+def target_calories(weight_kg, height_cm, age, gender, activity_level, fitness_goals, adjustment=0):
+    """
+    Daily calorie target: BMR x activity multiplier, moved by the goal
+    adjustment and any extra `adjustment` (e.g. the weekly job's). Returns a
+    float for one user, or an array with one target per user. Missing
+    measurements are handled as in bmr().
+    """
+    import numpy as np
+    tdee = bmr(weight_kg, height_cm, age, gender) * activity_multipliers(activity_level)
+    result = tdee + goal_adjustments(fitness_goals) + np.asarray(adjustment, dtype=float)
+    return float(result) if np.ndim(result) == 0 else result
+
+
+def target_calories_for_user(user, activity_level=None, adjustment=0):
+    """The target of one User; `activity_level` overrides the one stored on the profile."""
+    return target_calories(
+        user.weight_kg, user.height_cm, user.age, user.gender,
+        activity_level or user.activity_level, user.fitness_goals, adjustment
+    )
+
+
+def target_calories_for_users(users, adjustments=0):
+    """
+    The targets of many User rows (or any objects with the same attributes) in
+    one vectorized call. Users missing a measurement get NaN; missing_measurements()
+    says which.
+    """
+    users = list(users)
+    return target_calories(
+        [user.weight_kg for user in users],
+        [user.height_cm for user in users],
+        [user.age for user in users],
+        [user.gender for user in users],
+        [user.activity_level for user in users],
+        [user.fitness_goals for user in users],
+        adjustments
+    )
@@ -0,0 +1,302 @@
+# app/utils/instrumentation.py
+
+import threading
+import time
+import weakref
+from flask import g, request, has_app_context, Response, abort
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (in seconds / statements) of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {self.count}")
+        lines.append(f"{name}_sum{_labels(**labels)} {self.sum}")
+        lines.append(f"{name}_count{_labels(**labels)} {self.count}")
+        return lines
+
+
+class Instrumentation:
+    """
+    Opt-in per-request instrumentation (INSTRUMENTATION_ENABLED).
+
+    SQLAlchemy cursor events count the statements and time spent in the
+    database while a request is being handled, the shared LLM client reports
+    the time spent waiting on the model, and Flask request hooks record the
+    total latency. Each response gets a Server-Timing header with those
+    numbers, and the per-endpoint totals are served in the Prometheus text
+    format at /metrics (one set per process, so scrape every worker), along
+    with the connection pool's checkout waits and in-use connections.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.metrics_token = None
+        self._lock = threading.Lock()
+        self._listening = False
+        self._pools = weakref.WeakSet()
+        self.reset()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('INSTRUMENTATION_ENABLED', False)
+        self.metrics_token = app.config.get('METRICS_TOKEN')
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.extensions['instrumentation'] = self
+
+        # Engine events are global, so they are only registered once per process.
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+            self._listening = True
+
+    def reset(self):
+        """Clears every recorded metric (used by tests)."""
+        with self._lock:
+            self._requests = {}
+            self._latency = {}
+            self._statements = {}
+            self._db_seconds = {}
+            self._llm_seconds = {}
+            self._llm_requests = {}
+            self._llm_request_seconds = {}
+            self._pool_wait = _Histogram(POOL_WAIT_BUCKETS)
+            self._pool_timeouts = 0
+            self._pool_peak_checked_out = 0
+
+    # --- Collection ---
+
+    def _current(self):
+        if not self.enabled or not has_app_context():
+            return None
+        return g.get('_request_metrics')
+
+    def _before_request(self):
+        if self.enabled:
+            g._request_metrics = {"start": time.perf_counter(), "db_statements": 0, "db_seconds": 0.0, "llm_seconds": 0.0}
+
+    # The start time lives on the statement's execution context, not the connection,
+    # so a statement that fails (and never reaches after_cursor_execute) leaves nothing behind.
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and self._current() is not None:
+            context._instrumentation_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._record_statement(context)
+
+    def _handle_error(self, exception_context):
+        # Failed statements still took the database's time
+        self._record_statement(exception_context.execution_context)
+
+    def _record_statement(self, context):
+        metrics = self._current()
+        started = getattr(context, '_instrumentation_start', None)
+        if metrics is None or started is None:
+            return
+        del context._instrumentation_start
+        metrics["db_statements"] += 1
+        metrics["db_seconds"] += time.perf_counter() - started
+
+    def record_llm_call(self, kind, seconds, success=True):
+        """Called by the LLM client after every model call, in requests and background jobs alike."""
+        if not self.enabled:
+            return
+        key = (kind, 'success' if success else 'error')
+        with self._lock:
+            self._llm_requests[key] = self._llm_requests.get(key, 0) + 1
+            self._llm_request_seconds[key] = self._llm_request_seconds.get(key, 0.0) + seconds
+        metrics = self._current()
+        if metrics is not None:
+            metrics["llm_seconds"] += seconds
+
+    def track_pool(self, pool):
+        """Registers a connection pool whose size and in-use connections /metrics should report."""
+        self._pools.add(pool)
+
+    def record_pool_checkout(self, seconds, checked_out=0, timed_out=False):
+        """Called by TimedQueuePool after every checkout, in requests and background jobs alike."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if timed_out:
+                self._pool_timeouts += 1
+            else:
+                self._pool_wait.observe(seconds)
+                self._pool_peak_checked_out = max(self._pool_peak_checked_out, checked_out)
+
+    def _after_request(self, response):
+        metrics = self._current()
+        if metrics is None:
+            return response
+        total = time.perf_counter() - metrics["start"]
+        # Label by route pattern, not URL, so user ids don't blow up the series count
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        key = (request.method, endpoint)
+
+        with self._lock:
+            status_key = key + (str(response.status_code),)
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+            self._latency.setdefault(key, _Histogram(LATENCY_BUCKETS)).observe(total)
+            self._statements.setdefault(key, _Histogram(STATEMENT_BUCKETS)).observe(metrics["db_statements"])
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + metrics["db_seconds"]
+            self._llm_seconds[key] = self._llm_seconds.get(key, 0.0) + metrics["llm_seconds"]
+
+        timings = [f'db;dur={metrics["db_seconds"] * 1000:.1f};desc="{metrics["db_statements"]} statements"']
+        if metrics["llm_seconds"]:
+            timings.append(f'llm;dur={metrics["llm_seconds"] * 1000:.1f}')
+        timings.append(f'total;dur={total * 1000:.1f}')
+        response.headers.add('Server-Timing', ", ".join(timings))
+        return response
+
+    def _teardown_request(self, exc):
+        # Requests in tests can share one app context, so never let a request's counters outlive it
+        if has_app_context():
+            g.pop('_request_metrics', None)
+
+    # --- Exposition ---
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        from app.utils.api_key_cache import client_cache
+        from app.services.plan_cache_service import plan_cache
+
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("http_requests_total", "counter", "Requests handled, by route and status.")
+            for (method, endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, endpoint=endpoint, status=status)} {count}")
+
+            family("http_request_duration_seconds", "histogram", "Total request latency.")
+            for (method, endpoint), histogram in sorted(self._latency.items()):
+                lines.extend(histogram.render("http_request_duration_seconds", {"method": method, "endpoint": endpoint}))
+
+            family("http_request_db_statements", "histogram", "SQL statements executed per request.")
+            for (method, endpoint), histogram in sorted(self._statements.items()):
+                lines.extend(histogram.render("http_request_db_statements", {"method": method, "endpoint": endpoint}))
+
+            family("http_request_db_seconds_total", "counter", "Time spent executing SQL statements in requests.")
+            for (method, endpoint), seconds in sorted(self._db_seconds.items()):
+                lines.append(f"http_request_db_seconds_total{_labels(method=method, endpoint=endpoint)} {seconds}")
+
+            family("http_request_llm_seconds_total", "counter", "Time spent waiting on the LLM in requests.")
+            for (method, endpoint), seconds in sorted(self._llm_seconds.items()):
+                lines.append(f"http_request_llm_seconds_total{_labels(method=method, endpoint=endpoint)} {seconds}")
+
+            family("llm_requests_total", "counter", "LLM calls made by this process, including background jobs.")
+            for (kind, outcome), count in sorted(self._llm_requests.items()):
+                lines.append(f"llm_requests_total{_labels(kind=kind, outcome=outcome)} {count}")
+
+            family("llm_request_seconds_total", "counter", "Time spent in LLM calls, including background jobs.")
+            for (kind, outcome), seconds in sorted(self._llm_request_seconds.items()):
+                lines.append(f"llm_request_seconds_total{_labels(kind=kind, outcome=outcome)} {seconds}")
+
+            family("db_pool_checkout_seconds", "histogram", "Time taken to get a connection from the pool, including waiting for a free one.")
+            lines.extend(self._pool_wait.render("db_pool_checkout_seconds", {}))
+            family("db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up after the pool timeout.")
+            lines.append(f"db_pool_checkout_timeouts_total {self._pool_timeouts}")
+            family("db_pool_checked_out_peak", "gauge", "Most connections checked out at once since the process started.")
+            lines.append(f"db_pool_checked_out_peak {self._pool_peak_checked_out}")
+
+        # Summed over the process's pools (one per engine), read at scrape time
+        pools = list(self._pools)
+        family("db_pool_size", "gauge", "Connections the pool keeps open, not counting overflow.")
+        lines.append(f"db_pool_size {sum(pool.size() for pool in pools)}")
+        family("db_pool_checked_out", "gauge", "Connections currently in use.")
+        lines.append(f"db_pool_checked_out {sum(pool.checkedout() for pool in pools)}")
+        family("db_pool_checked_in", "gauge", "Idle connections waiting in the pool.")
+        lines.append(f"db_pool_checked_in {sum(pool.checkedin() for pool in pools)}")
+
+        api_key_stats = client_cache.stats()
+        family("api_key_cache_requests_total", "counter", "API key cache lookups.")
+        lines.append(f'api_key_cache_requests_total{_labels(result="hit")} {api_key_stats["hits"]}')
+        lines.append(f'api_key_cache_requests_total{_labels(result="miss")} {api_key_stats["misses"]}')
+        family("api_key_cache_size", "gauge", "API keys currently cached.")
+        lines.append(f"api_key_cache_size {api_key_stats['size']}")
+
+        plan_stats = plan_cache.stats()
+        family("plan_cache_requests_total", "counter", "Plan cache lookups and bypasses.")
+        for result, key in (("hit", "hits"), ("miss", "misses"), ("bypass", "bypasses")):
+            lines.append(f"plan_cache_requests_total{_labels(result=result)} {plan_stats[key]}")
+        family("plan_cache_evictions_total", "counter", "Plan cache entries evicted.")
+        lines.append(f"plan_cache_evictions_total {plan_stats['evictions']}")
+
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        if not self.enabled:
+            abort(404)
+        if self.metrics_token and request.headers.get('Authorization') != f"Bearer {self.metrics_token}":
+            abort(401)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+class TimedQueuePool(QueuePool):
+    """
+    A QueuePool that reports how long every checkout took (waiting for a free
+    connection, opening a new one and the pre-ping) and registers itself so
+    /metrics can show its size and in-use connections.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        instrumentation.track_pool(self)
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            instrumentation.record_pool_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        instrumentation.record_pool_checkout(time.perf_counter() - start, checked_out=self.checkedout())
+        return connection
+
+
+def instrumented_engine_options(options):
+    """Uses TimedQueuePool for engine options that size a pool without choosing a pool class."""
+    if 'pool_size' in options and 'poolclass' not in options:
+        return dict(options, poolclass=TimedQueuePool)
+    return options
+
+
+# The single instrumentation layer shared by the whole process
+instrumentation = Instrumentation()
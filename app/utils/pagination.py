@@ -0,0 +1,103 @@
+# app/utils/pagination.py
+
+import base64
+import json
+from datetime import timedelta, timezone
+from sqlalchemy import and_, or_
+from .timestamps import parse_isoformat
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Raised when limit, cursor, from or to query parameters are malformed."""
+
+
+def encode_cursor(date_value, row_id):
+    """Packs the (date, id) of the last row on a page into an opaque string."""
+    payload = json.dumps([date_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Unpacks a cursor produced by encode_cursor back into (date, id)."""
+    try:
+        date_str, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return parse_isoformat(date_str), int(row_id)
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor.")
+
+
+def _parse_bound(value, name, end_of_range=False):
+    """
+    Parses a 'from'/'to' filter. Plain dates (YYYY-MM-DD) cover the whole day,
+    so a date-only 'to' is treated as the start of the following day.
+    """
+    try:
+        parsed = parse_isoformat(value)
+    except ValueError:
+        raise PaginationError(f"Invalid '{name}' value, should be YYYY-MM-DD or an ISO 8601 datetime.")
+    if end_of_range and len(value) == 10:
+        parsed += timedelta(days=1)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_pagination_args(args):
+    """Reads and validates limit, cursor, from and to from the request args."""
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise PaginationError("'limit' must be an integer.")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise PaginationError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+
+    cursor = args.get('cursor')
+    date_from = args.get('from')
+    date_to = args.get('to')
+    return {
+        "limit": limit,
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "date_from": _parse_bound(date_from, 'from') if date_from else None,
+        "date_to": _parse_bound(date_to, 'to', end_of_range=True) if date_to else None
+    }
+
+
+def paginate_by_date(query, model, args, descending=True):
+    """
+    Applies keyset pagination over (model.date, model.id) to a query.
+
+    Instead of OFFSET, each page continues strictly after the (date, id) of the
+    last row of the previous page, so the cost of fetching a page does not grow
+    with how deep into a user's history it is.
+
+    Returns a tuple of (rows, next_cursor); next_cursor is None on the last page.
+    """
+    params = parse_pagination_args(args)
+
+    if params["date_from"] is not None:
+        query = query.filter(model.date >= params["date_from"])
+    if params["date_to"] is not None:
+        query = query.filter(model.date < params["date_to"])
+
+    if params["cursor"] is not None:
+        cursor_date, cursor_id = params["cursor"]
+        if descending:
+            query = query.filter(or_(model.date < cursor_date, and_(model.date == cursor_date, model.id < cursor_id)))
+        else:
+            query = query.filter(or_(model.date > cursor_date, and_(model.date == cursor_date, model.id > cursor_id)))
+
+    if descending:
+        query = query.order_by(model.date.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.date.asc(), model.id.asc())
+
+    # Fetch one extra row to find out whether another page exists.
+    rows = query.limit(params["limit"] + 1).all()
+    next_cursor = None
+    if len(rows) > params["limit"]:
+        rows = rows[:params["limit"]]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id)
+    return rows, next_cursor
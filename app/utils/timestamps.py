@@ -0,0 +1,43 @@
+# app/utils/timestamps.py
+
+from datetime import datetime, timezone
+
+TIMESTAMP_FORMAT_ERROR = "Incorrect date format, should be YYYY-MM-DD or an ISO 8601 datetime such as YYYY-MM-DDTHH:MM:SS+00:00"
+
+
+def utc_now():
+    """The current time as an aware UTC datetime, like the models' column defaults."""
+    return datetime.now(timezone.utc)
+
+
+def parse_isoformat(value):
+    """
+    datetime.fromisoformat that also accepts a trailing 'Z' for UTC, which
+    Python before 3.11 rejects. Raises ValueError like fromisoformat.
+    """
+    if value[-1:] in ('Z', 'z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+
+def to_utc(value):
+    """
+    Parses a client-supplied timestamp into an aware UTC datetime.
+
+    Accepts ISO 8601 strings (with or without an offset, a trailing 'Z', or a
+    plain YYYY-MM-DD date) and datetime objects. Values without an offset are
+    taken to already be in UTC. Returns None for None or an empty string and
+    raises ValueError for anything else that can't be parsed.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        try:
+            value = parse_isoformat(value.strip())
+        except ValueError:
+            raise ValueError(TIMESTAMP_FORMAT_ERROR)
+    if not isinstance(value, datetime):
+        raise ValueError(TIMESTAMP_FORMAT_ERROR)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
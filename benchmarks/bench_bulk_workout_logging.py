@@ -0,0 +1,103 @@
+# benchmarks/bench_bulk_workout_logging.py
+"""
+Compares syncing a batch of workouts one request at a time (POST /api/workout/log)
+with a single POST /api/workout/log/bulk request.
+
+Runs against an in-memory SQLite database by default; set BENCH_DATABASE_URL to
+point it at a scratch PostgreSQL database instead (the tables are created and
+dropped by the script, so never use a real database).
+
+    python benchmarks/bench_bulk_workout_logging.py --workouts 200 --exercises 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app
+from app.models import db, Client, User
+
+
+def _make_app():
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('BENCH_DATABASE_URL', 'sqlite:///:memory:'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SECRET_KEY': 'bench-secret-key',
+        'BULK_LOG_MAX_ITEMS': 100000
+    })
+
+
+def _workouts(user_id, count, exercises):
+    return [
+        {"user_id": user_id, "name": f"Bench workout {i}",
+         "exercises": [{"name": f"Exercise {j}", "sets": 3, "reps": 10, "weight": 40.0} for j in range(exercises)]}
+        for i in range(count)
+    ]
+
+
+def _timed(func):
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    start = time.perf_counter()
+    try:
+        func()
+    finally:
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, 'before_cursor_execute', _record)
+    return elapsed, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=200)
+    parser.add_argument('--exercises', type=int, default=5)
+    args = parser.parse_args()
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        tenant = Client(company_name="Bench Corp")
+        db.session.add(tenant)
+        db.session.flush()
+        user = User(client_id=tenant.id, username="bench_user", name="Bench User",
+                    contact_info="bench@example.com", age=30, gender="Male",
+                    weight_kg=80, height_cm=180, fitness_goals="Build muscle")
+        db.session.add(user)
+        db.session.commit()
+
+        http = app.test_client()
+        headers = {'Content-Type': 'application/json', 'X-API-Key': tenant.api_key}
+        items = _workouts(user.id, args.workouts, args.exercises)
+
+        def per_request():
+            for item in items:
+                response = http.post('/api/workout/log', headers=headers, data=json.dumps(item))
+                assert response.status_code == 201, response.get_data(as_text=True)
+
+        def bulk():
+            response = http.post('/api/workout/log/bulk', headers=headers, data=json.dumps({"items": items}))
+            assert response.status_code == 201, response.get_data(as_text=True)
+
+        results = [("per-request", *_timed(per_request)), ("bulk", *_timed(bulk))]
+
+        print(f"{args.workouts} workouts x {args.exercises} exercises on {db.engine.dialect.name}")
+        print(f"{'path':<12} {'seconds':>9} {'statements':>11} {'workouts/s':>11}")
+        for name, elapsed, statements in results:
+            print(f"{name:<12} {elapsed:>9.3f} {statements:>11} {args.workouts / elapsed:>11.0f}")
+        print(f"speedup: {results[0][1] / results[1][1]:.1f}x")
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_weekly_diet_summary.py
+"""
+Times GET /api/diet/<user_id>/weekly-summary for a user with a long meal history,
+against summing the raw diet_log rows of the same window in Python.
+
+Runs against an in-memory SQLite database by default; set BENCH_DATABASE_URL to
+point it at a scratch PostgreSQL database instead (the tables are created and
+dropped by the script, so never use a real database).
+
+    python benchmarks/bench_weekly_diet_summary.py --logs 12000 --span-days 365 --window 30
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from app import create_app
+from app.models import db, Client, User, DietLog
+from app.services.bulk_logging_service import BulkLoggingService
+
+
+def _make_app():
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('BENCH_DATABASE_URL', 'sqlite:///:memory:'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SECRET_KEY': 'bench-secret-key'
+    })
+
+
+def _seed(client_id, user_id, logs, span_days):
+    """Writes `logs` meals spread over the last `span_days` days through the bulk path (which maintains the rollup)."""
+    now = datetime.now(timezone.utc)
+    rng = random.Random(42)
+    service = BulkLoggingService(client_id)
+    for start in range(0, logs, 1000):
+        items = [
+            {
+                "user_id": user_id, "meal_name": "Bench meal", "calories": rng.randint(200, 900),
+                "macros": {"protein_g": rng.randint(5, 50), "carbs_g": rng.randint(10, 100), "fat_g": rng.randint(2, 40)},
+                "date": (now - timedelta(minutes=rng.randint(0, span_days * 24 * 60))).isoformat()
+            }
+            for _ in range(min(1000, logs - start))
+        ]
+        service.import_batch('diet', items)
+
+
+def _raw_summary(client_id, user_id, first_day):
+    """The naive alternative: load every diet_log row in the window and total it per day in Python."""
+    per_day = {}
+    for log in DietLog.query.filter(
+        DietLog.client_id == client_id, DietLog.user_id == user_id,
+        DietLog.date >= datetime.combine(first_day, datetime.min.time())
+    ):
+        day = per_day.setdefault(log.date.date(), [0, 0.0, 0.0, 0.0, 0])
+        day[0] += log.calories
+        day[1] += log.protein_g or 0
+        day[2] += log.carbs_g or 0
+        day[3] += log.fat_g or 0
+        day[4] += 1
+    return per_day
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', type=int, default=12000, help='Meals logged for the user')
+    parser.add_argument('--span-days', type=int, default=365, help='Days the meals are spread over')
+    parser.add_argument('--window', type=int, default=30, help='Summary window in days')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = _make_app()
+    with app.app_context():
+        db.create_all()
+        tenant = Client(company_name="Bench Corp")
+        db.session.add(tenant)
+        db.session.flush()
+        user = User(client_id=tenant.id, username="bench_user", name="Bench User",
+                    contact_info="bench@example.com", age=30, gender="Male",
+                    weight_kg=80, height_cm=180, fitness_goals="Weight loss")
+        db.session.add(user)
+        db.session.commit()
+        _seed(tenant.id, user.id, args.logs, args.span_days)
+
+        http = app.test_client()
+        headers = {'X-API-Key': tenant.api_key}
+        url = f'/api/diet/{user.id}/weekly-summary?days={args.window}'
+        first_day = datetime.now(timezone.utc).date() - timedelta(days=args.window - 1)
+
+        endpoint, raw = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = http.get(url, headers=headers)
+            endpoint.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+            start = time.perf_counter()
+            _raw_summary(tenant.id, user.id, first_day)
+            raw.append(time.perf_counter() - start)
+            db.session.expunge_all()
+
+        raw_rows = db.session.query(func.count(DietLog.id)).filter(
+            DietLog.user_id == user.id, DietLog.date >= datetime.combine(first_day, datetime.min.time())
+        ).scalar()
+        print(f"{args.logs} meals over {args.span_days} days, {args.window}-day window on {db.engine.dialect.name}")
+        print(f"rows read: summary endpoint <= {args.window} rollup rows, raw path {raw_rows} diet_log rows")
+        print(f"{'path':<18} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, samples in (("summary endpoint", endpoint), ("raw diet_log sum", raw)):
+            p50, p95 = _percentiles(samples)
+            print(f"{name:<18} {p50:>8.2f} {p95:>8.2f}")
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
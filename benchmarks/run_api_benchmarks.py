@@ -0,0 +1,275 @@
+# benchmarks/run_api_benchmarks.py
+"""
+Drives the main API endpoints through the real blueprints (Flask test client,
+fake LLM) against a seeded tenant and reports p50/p95/p99 latency and SQL
+statements per request for each one, optionally comparing the numbers with a
+stored baseline.
+
+Runs against an in-memory SQLite database by default; set BENCH_DATABASE_URL to
+point it at a scratch PostgreSQL database instead (the tables are created and
+dropped by the script, so never use a real database).
+
+    python benchmarks/run_api_benchmarks.py                                   # quick run
+    python benchmarks/run_api_benchmarks.py --users 2000 --days 730           # realistic volumes
+    python benchmarks/run_api_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_api_benchmarks.py --baseline benchmarks/baseline.json
+
+Statement counts come from the Server-Timing header added by the instrumentation
+layer, so they are exact and compared strictly; latencies are compared with
+--tolerance, since they depend on the machine. The script exits with status 1
+when a scenario regresses against the baseline.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+from app import create_app
+from app.models import db, Client, User
+from app.services.bulk_logging_service import BulkLoggingService
+from app.services.llm_client import llm_client, FakeBackend
+
+SEED_BATCH_SIZE = 1000
+STATEMENTS_PATTERN = re.compile(r'desc="(\d+) statements"')
+
+
+def _make_app():
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('BENCH_DATABASE_URL', 'sqlite:///:memory:'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SECRET_KEY': 'bench-secret-key',
+        'INSTRUMENTATION_ENABLED': True
+    })
+
+
+def _fake_response(prompt, json_output):
+    if not json_output:
+        return "0"
+    day = {"day_type": "Workout", "exercises": [{"name": "Squat", "sets": 3, "reps": 10}]}
+    return json.dumps({
+        "weekly_plan": {"Monday": {"breakfast": "Oats", "lunch": "Rice and dal", "dinner": "Salad"}},
+        "weekly_schedule": {"Monday": day}
+    })
+
+
+# --- Seeding ---
+
+def _seed_users(client_id, count, rng):
+    rows = [
+        {
+            "client_id": client_id, "username": f"bench_user_{i}", "name": f"Bench User {i}",
+            "contact_info": f"bench{i}@example.com", "age": rng.randint(18, 65),
+            "gender": rng.choice(["Male", "Female"]), "weight_kg": rng.uniform(55, 110),
+            "height_cm": rng.uniform(150, 200), "fitness_goals": "Weight loss",
+            "workouts_per_week": "3", "workout_duration": 45, "sleep_hours": "7",
+            "stress_level": "medium", "activity_level": "moderatelyActive"
+        }
+        for i in range(count)
+    ]
+    for start in range(0, count, SEED_BATCH_SIZE):
+        db.session.execute(insert(User), rows[start:start + SEED_BATCH_SIZE])
+    db.session.commit()
+    return list(db.session.scalars(select(User.id).where(User.client_id == client_id).order_by(User.id)))
+
+
+def _seed_history(client_id, user_ids, days, meals_per_day, workouts_per_week, rng):
+    """Writes `days` of meals, workouts and weekly weigh-ins per user through the bulk path."""
+    service = BulkLoggingService(client_id)
+    now = datetime.now(timezone.utc)
+    batches = {"diet": [], "workouts": [], "weight": []}
+
+    def _add(log_type, item):
+        batch = batches[log_type]
+        batch.append(item)
+        if len(batch) >= SEED_BATCH_SIZE:
+            service.import_batch(log_type, batch)
+            batches[log_type] = []
+
+    for user_id in user_ids:
+        weight = rng.uniform(60, 100)
+        for day in range(days):
+            moment = now - timedelta(days=day, hours=rng.randint(0, 12))
+            for meal in range(meals_per_day):
+                _add("diet", {
+                    "user_id": user_id, "meal_name": f"Meal {meal}", "calories": rng.randint(250, 900),
+                    "macros": {"protein_g": rng.randint(5, 50), "carbs_g": rng.randint(10, 100), "fat_g": rng.randint(2, 40)},
+                    "date": (moment - timedelta(hours=meal * 4)).isoformat()
+                })
+            if rng.random() < workouts_per_week / 7:
+                _add("workouts", {
+                    "user_id": user_id, "name": "Full body", "date": moment.isoformat(),
+                    "exercises": [{"name": name, "sets": 3, "reps": 10, "weight": rng.uniform(20, 100)}
+                                  for name in ("Squat", "Bench press", "Row")]
+                })
+            if day % 7 == 0:
+                weight += rng.uniform(-0.5, 0.5)
+                _add("weight", {"user_id": user_id, "weight_kg": round(weight, 1), "date": moment.isoformat()})
+
+    for log_type, batch in batches.items():
+        if batch:
+            service.import_batch(log_type, batch)
+
+
+# --- Scenarios ---
+
+def _scenarios():
+    """name -> (method, url(user_id), body(user_id, rng) or None)"""
+    return {
+        "log_meal": ("POST", lambda u: "/api/diet/log", lambda u, rng: {
+            "user_id": u, "meal_name": "Bench lunch", "calories": rng.randint(300, 800),
+            "macros": {"protein_g": 30, "carbs_g": 60, "fat_g": 15}}),
+        "diet_logs": ("GET", lambda u: f"/api/diet/{u}/logs", None),
+        "weekly_diet_summary": ("GET", lambda u: f"/api/diet/{u}/weekly-summary?days=30", None),
+        "log_workout": ("POST", lambda u: "/api/workout/log", lambda u, rng: {
+            "user_id": u, "name": "Bench session",
+            "exercises": [{"name": "Deadlift", "sets": 3, "reps": 5, "weight": 100}]}),
+        "workout_history": ("GET", lambda u: f"/api/workout/{u}/history", None),
+        "weekly_report": ("GET", lambda u: f"/api/progress/{u}/weekly-report", None),
+        "weight_history": ("GET", lambda u: f"/api/progress/{u}/weight", None),
+        "reward_status": ("GET", lambda u: f"/api/reward/{u}/status", None),
+        "diet_plan": ("POST", lambda u: "/api/diet/generate-plan", lambda u, rng: {
+            "user_id": u, "activityLevel": "moderatelyActive", "diet_type": "veg", "bypass_cache": True}),
+        "workout_plan": ("POST", lambda u: "/api/workout/generate-plan", lambda u, rng: {
+            "user_id": u, "fitnessLevel": "intermediate", "equipment": "Gym access", "bypass_cache": True}),
+    }
+
+
+def _percentile(samples, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    return samples[max(0, math.ceil(percent / 100 * len(samples)) - 1)]
+
+
+def _run_scenario(http, headers, method, url, body, user_ids, requests, warmup, rng):
+    latencies, statements = [], []
+    for i in range(warmup + requests):
+        user_id = rng.choice(user_ids)
+        payload = json.dumps(body(user_id, rng)) if body else None
+        start = time.perf_counter()
+        response = http.open(url(user_id), method=method, headers=headers, data=payload)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url(user_id)} returned {response.status_code}: {response.get_data(as_text=True)}")
+        if i < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        match = STATEMENTS_PATTERN.search(response.headers.get('Server-Timing', ''))
+        statements.append(int(match.group(1)) if match else 0)
+
+    latencies.sort()
+    return {
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "queries_per_request": round(sum(statements) / len(statements), 2),
+        "max_queries": max(statements)
+    }
+
+
+# --- Baseline comparison ---
+
+def _compare(results, baseline, tolerance):
+    """Prints the change against the baseline per scenario and returns the names that regressed."""
+    regressions = []
+    print(f"\n{'scenario':<22} {'p95 ms':>9} {'baseline':>9} {'change':>8} {'queries':>8} {'baseline':>9}")
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<22} {result['p95_ms']:>9.2f} {'-':>9} {'new':>8} {result['queries_per_request']:>8} {'-':>9}")
+            continue
+        change = (result['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0.0
+        slower = change > tolerance
+        more_queries = result['queries_per_request'] > previous['queries_per_request']
+        flag = "  <-- REGRESSION" if slower or more_queries else ""
+        print(f"{name:<22} {result['p95_ms']:>9.2f} {previous['p95_ms']:>9.2f} {change:>+8.0%} "
+              f"{result['queries_per_request']:>8} {previous['queries_per_request']:>9}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200, help='Users in the seeded tenant')
+    parser.add_argument('--days', type=int, default=365, help='Days of history per user')
+    parser.add_argument('--meals-per-day', type=int, default=3)
+    parser.add_argument('--workouts-per-week', type=float, default=3)
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per scenario')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Seconds the fake LLM sleeps per call')
+    parser.add_argument('--only', nargs='*', help='Scenarios to run (default: all)')
+    parser.add_argument('--baseline', help='Compare against this baseline JSON file')
+    parser.add_argument('--save-baseline', help='Write the results to this baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown against the baseline')
+    args = parser.parse_args()
+
+    scenarios = _scenarios()
+    unknown = set(args.only or []) - set(scenarios)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))} (choose from {', '.join(scenarios)})")
+
+    app = _make_app()
+    rng = random.Random(42)
+    previous_backend = llm_client.set_backend(FakeBackend(_fake_response, latency=args.llm_latency))
+    with app.app_context():
+        db.create_all()
+        try:
+            tenant = Client(company_name="Bench Corp")
+            db.session.add(tenant)
+            db.session.commit()
+
+            start = time.perf_counter()
+            user_ids = _seed_users(tenant.id, args.users, rng)
+            _seed_history(tenant.id, user_ids, args.days, args.meals_per_day, args.workouts_per_week, rng)
+            dialect = db.engine.dialect.name
+            print(f"Seeded {args.users} users with {args.days} days of history on {dialect} "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+            http = app.test_client()
+            headers = {'Content-Type': 'application/json', 'X-API-Key': tenant.api_key}
+            results = {}
+            print(f"\n{'scenario':<22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'max':>5}")
+            for name, (method, url, body) in scenarios.items():
+                if args.only and name not in args.only:
+                    continue
+                result = _run_scenario(http, headers, method, url, body, user_ids, args.requests, args.warmup, rng)
+                db.session.remove()
+                results[name] = result
+                print(f"{name:<22} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                      f"{result['queries_per_request']:>8} {result['max_queries']:>5}")
+        finally:
+            llm_client.set_backend(previous_backend)
+            db.session.remove()
+            db.drop_all()
+
+    settings = {"dialect": dialect, "users": args.users, "days": args.days, "meals_per_day": args.meals_per_day,
+                "workouts_per_week": args.workouts_per_week, "requests": args.requests}
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print(f"\nWarning: the baseline was recorded with different settings: {baseline.get('settings')}")
+        regressions = _compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
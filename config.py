@@ -1,32 +1,96 @@
 # config.py
 import os
 
-class Config:
-    """
-    Set Flask configuration variables from environment variables.
-    """
-    # Get the secret key from the environment
-    SECRET_KEY = os.environ.get('SECRET_KEY')
-
-    # Get the database URL from the environment
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-    "connect_args": {
-        "options": "-c search_path=neondb"  # or "public"
-    }
-}
-
-    
-    # Suppress a warning
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 class Config:
     """Set Flask configuration variables from environment variables."""
 
+    @staticmethod
+    def engine_options(database_url):
+        """
+        SQLAlchemy engine options for the configured database, from environment
+        variables. The pool settings apply to any server database; the search path
+        and statement timeout are PostgreSQL session settings, so SQLite gets
+        neither.
+        """
+        if not database_url or database_url.startswith('sqlite'):
+            return {}
+
+        options = {
+            # Connections kept open per process, plus how many more may be opened under load
+            "pool_size": int(os.environ.get('DB_POOL_SIZE', 5)),
+            "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+            # Seconds a request waits for a free connection before failing
+            "pool_timeout": float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            # Serverless Postgres drops idle connections, so test them on checkout and
+            # replace them before the server's idle timeout does it for us
+            "pool_pre_ping": os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+            "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE', 300)),
+        }
+        if database_url.startswith('postgres'):
+            session_options = f"-c search_path={os.environ.get('DB_SEARCH_PATH', 'neondb')}"
+            statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))  # 0 disables it
+            if statement_timeout:
+                session_options += f" -c statement_timeout={statement_timeout}"
+            options["connect_args"] = {"options": session_options}
+        return options
+
     SECRET_KEY = os.environ.get('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # --- ADD THIS LINE ---
-    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
\ No newline at end of file
+    # Connection pool and session settings (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    # DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_STATEMENT_TIMEOUT_MS, DB_SEARCH_PATH)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+
+    # Shared LLM client (see app/services/llm_client.py)
+    GEMINI_MODEL_NAME = os.environ.get('GEMINI_MODEL_NAME', 'gemini-2.5-pro')
+    LLM_REQUEST_TIMEOUT = int(os.environ.get('LLM_REQUEST_TIMEOUT', 120))
+    LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')  # 'fake' returns canned responses offline
+
+    # Plan source (see app/services/rule_based_planner.py): 'llm', 'rules', or 'fallback'
+    # (ask the LLM, but answer from the rules if it errors or takes longer than PLANNER_LLM_BUDGET seconds)
+    PLANNER_MODE = os.environ.get('PLANNER_MODE', 'llm')
+    PLANNER_LLM_BUDGET = float(os.environ.get('PLANNER_LLM_BUDGET', 20))
+
+    # In-process cache of API key -> client lookups (see app/utils/api_key_cache.py)
+    API_KEY_CACHE_TTL = int(os.environ.get('API_KEY_CACHE_TTL', 60))
+    API_KEY_CACHE_MAX_SIZE = int(os.environ.get('API_KEY_CACHE_MAX_SIZE', 1024))
+
+    # Weekly adaptive planning job (see app/services/adaptive_planner_service.py)
+    ADAPTIVE_PLANNER_MAX_WORKERS = int(os.environ.get('ADAPTIVE_PLANNER_MAX_WORKERS', 4))
+    ADAPTIVE_PLANNER_CLIENT_RATE_PER_MINUTE = int(os.environ.get('ADAPTIVE_PLANNER_CLIENT_RATE_PER_MINUTE', 0))
+    ADAPTIVE_PLANNER_USER_TIMEOUT = int(os.environ.get('ADAPTIVE_PLANNER_USER_TIMEOUT', 300))
+    ADAPTIVE_PLANNER_BATCH_SIZE = int(os.environ.get('ADAPTIVE_PLANNER_BATCH_SIZE', 500))
+
+    # Content-addressed cache of generated plans (see app/services/plan_cache_service.py)
+    PLAN_CACHE_ENABLED = os.environ.get('PLAN_CACHE_ENABLED', 'true').lower() == 'true'
+    PLAN_CACHE_TTL = int(os.environ.get('PLAN_CACHE_TTL', 7 * 24 * 3600))
+    PLAN_CACHE_MAX_ENTRIES = int(os.environ.get('PLAN_CACHE_MAX_ENTRIES', 10000))
+    PLAN_CACHE_EVICT_INTERVAL = int(os.environ.get('PLAN_CACHE_EVICT_INTERVAL', 60))
+
+    # Background plan generation jobs (see app/services/plan_job_service.py)
+    PLAN_JOBS_MAX_WORKERS = int(os.environ.get('PLAN_JOBS_MAX_WORKERS', 2))
+    PLAN_JOBS_STALE_AFTER = int(os.environ.get('PLAN_JOBS_STALE_AFTER', 1800))  # seconds before an orphaned job is failed
+
+    # Largest number of items accepted by the bulk logging endpoints
+    BULK_LOG_MAX_ITEMS = int(os.environ.get('BULK_LOG_MAX_ITEMS', 500))
+
+    # Streaming NDJSON/CSV imports (see app/services/import_service.py)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+    IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 100))
+
+    # Rows fetched per round trip by the streaming export (see app/services/export_service.py)
+    EXPORT_YIELD_PER = int(os.environ.get('EXPORT_YIELD_PER', 1000))
+
+    # Leader-elected scheduled jobs (see app/services/scheduler_service.py)
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_LEASE_TTL = int(os.environ.get('SCHEDULER_LEASE_TTL', 6 * 3600))
+    SCHEDULER_DEDUPE_WINDOW = int(os.environ.get('SCHEDULER_DEDUPE_WINDOW', 3600))
+    SCHEDULER_HEARTBEAT_INTERVAL = int(os.environ.get('SCHEDULER_HEARTBEAT_INTERVAL', 300))  # lease renewal while a job runs
+
+    # Per-request query/latency instrumentation, /metrics and Server-Timing (see app/utils/instrumentation.py)
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'false').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # if set, /metrics requires "Authorization: Bearer <token>"
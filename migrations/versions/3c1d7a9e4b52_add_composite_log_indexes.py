@@ -0,0 +1,38 @@
+"""add composite client/user/date indexes to log tables
+
+Revision ID: 3c1d7a9e4b52
+Revises: 9f2317cc27ee
+Create Date: 2026-10-18 09:12:41.204113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d7a9e4b52'
+down_revision = '9f2317cc27ee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.create_index('ix_diet_log_client_user_date', 'diet_log', ['client_id', 'user_id', 'date'], unique=False)
+    op.create_index('ix_workout_log_client_user_date', 'workout_log', ['client_id', 'user_id', 'date'], unique=False)
+    op.create_index('ix_weight_entry_client_user_date', 'weight_entry', ['client_id', 'user_id', 'date'], unique=False)
+    op.create_index('ix_measurement_log_client_user_date', 'measurement_log', ['client_id', 'user_id', 'date'], unique=False)
+    op.create_index('ix_workout_plan_client_user_created_at', 'workout_plan', ['client_id', 'user_id', 'created_at'], unique=False)
+    op.create_index('ix_achievement_client_user_unlocked_at', 'achievement', ['client_id', 'user_id', 'unlocked_at'], unique=False)
+    op.create_index(op.f('ix_exercise_entry_workout_log_id'), 'exercise_entry', ['workout_log_id'], unique=False)
+
+
+def downgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.drop_index(op.f('ix_exercise_entry_workout_log_id'), table_name='exercise_entry')
+    op.drop_index('ix_achievement_client_user_unlocked_at', table_name='achievement')
+    op.drop_index('ix_workout_plan_client_user_created_at', table_name='workout_plan')
+    op.drop_index('ix_measurement_log_client_user_date', table_name='measurement_log')
+    op.drop_index('ix_weight_entry_client_user_date', table_name='weight_entry')
+    op.drop_index('ix_workout_log_client_user_date', table_name='workout_log')
+    op.drop_index('ix_diet_log_client_user_date', table_name='diet_log')
@@ -0,0 +1,38 @@
+"""add plan cache entry table
+
+Revision ID: 7b4e2f0c9d13
+Revises: 3c1d7a9e4b52
+Create Date: 2026-10-18 11:40:05.318672
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4e2f0c9d13'
+down_revision = '3c1d7a9e4b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.create_table('plan_cache_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('plan', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_plan_cache_entry_cache_key'), 'plan_cache_entry', ['cache_key'], unique=True)
+    op.create_index(op.f('ix_plan_cache_entry_expires_at'), 'plan_cache_entry', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.drop_index(op.f('ix_plan_cache_entry_expires_at'), table_name='plan_cache_entry')
+    op.drop_index(op.f('ix_plan_cache_entry_cache_key'), table_name='plan_cache_entry')
+    op.drop_table('plan_cache_entry')
@@ -0,0 +1,41 @@
+"""add plan job table
+
+Revision ID: a41f6c83e2d7
+Revises: 7b4e2f0c9d13
+Create Date: 2026-10-18 13:02:47.915530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f6c83e2d7'
+down_revision = '7b4e2f0c9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.create_table('plan_job',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('request_data', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.drop_table('plan_job')
@@ -0,0 +1,47 @@
+"""add scheduler lease and job run tables
+
+Revision ID: c58d2e1f7a90
+Revises: a41f6c83e2d7
+Create Date: 2026-10-18 14:21:09.402113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c58d2e1f7a90'
+down_revision = 'a41f6c83e2d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.create_table('scheduler_lease',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('holder', sa.String(length=200), nullable=False),
+    sa.Column('acquired_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('job_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('holder', sa.String(length=200), nullable=False),
+    sa.Column('trigger', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('summary', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_run_job_name_started_at', 'job_run', ['job_name', 'started_at'], unique=False)
+
+
+def downgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.drop_index('ix_job_run_job_name_started_at', table_name='job_run')
+    op.drop_table('job_run')
+    op.drop_table('scheduler_lease')
@@ -0,0 +1,50 @@
+"""add daily nutrition rollup table
+
+Revision ID: d2b7e94a1c36
+Revises: c58d2e1f7a90
+Create Date: 2026-10-18 15:40:12.228731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7e94a1c36'
+down_revision = 'c58d2e1f7a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.create_table('daily_nutrition',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('calories', sa.Integer(), nullable=False),
+    sa.Column('protein_g', sa.Float(), nullable=False),
+    sa.Column('carbs_g', sa.Float(), nullable=False),
+    sa.Column('fat_g', sa.Float(), nullable=False),
+    sa.Column('meal_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('client_id', 'user_id', 'day', name='uq_daily_nutrition_client_user_day')
+    )
+
+    # Backfill from the existing diet logs (same query as `flask nutrition rebuild`)
+    op.execute("""
+        INSERT INTO daily_nutrition (client_id, user_id, day, calories, protein_g, carbs_g, fat_g, meal_count)
+        SELECT client_id, user_id, date(date),
+               COALESCE(SUM(calories), 0), COALESCE(SUM(protein_g), 0),
+               COALESCE(SUM(carbs_g), 0), COALESCE(SUM(fat_g), 0), COUNT(id)
+        FROM diet_log
+        GROUP BY client_id, user_id, date(date)
+    """)
+
+
+def downgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.drop_table('daily_nutrition')
@@ -0,0 +1,37 @@
+"""add diet plan table
+
+Revision ID: e6a0c3f58b21
+Revises: d2b7e94a1c36
+Create Date: 2026-10-18 17:05:31.402916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a0c3f58b21'
+down_revision = 'd2b7e94a1c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.create_table('diet_plan',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('generated_plan', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_diet_plan_client_user_created_at', 'diet_plan', ['client_id', 'user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.execute("SET search_path TO 'neondb'")  # Set schema context
+    op.drop_index('ix_diet_plan_client_user_created_at', table_name='diet_plan')
+    op.drop_table('diet_plan')
@@ -10,7 +10,7 @@ from app import create_app
 # Create an instance of your application
 app = create_app()
 print("DB URI:", app.config['SQLALCHEMY_DATABASE_URI'])
-print("DB Options:", app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+print("DB Options:", app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
 
 
 if __name__ == '__main__':
@@ -3,15 +3,21 @@
 import pytest
 import json
 import uuid
+from contextlib import contextmanager
+from sqlalchemy import event
 from app import create_app
 from app.models import db, Client
 
 @pytest.fixture(scope='session')
-def app():
+def app(tmp_path_factory):
     """Create and configure a new app instance for the entire test session."""
+    # A file database, not :memory:, so that worker threads (plan jobs, the adaptive
+    # planner, scheduler heartbeats) each get their own connection as they would on
+    # PostgreSQL instead of sharing the single in-memory one.
+    database = tmp_path_factory.mktemp("db") / "test.sqlite"
     app = create_app({
         'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
         'WTF_CSRF_ENABLED': False,
         'SECRET_KEY': 'test-secret-key',
@@ -72,4 +78,24 @@ def test_user(seeded_client):
     # Ensure the user was actually created before the test runs.
     assert response.status_code == 201, f"Failed to create test user: {response.get_data(as_text=True)}"
     
-    return response.get_json()['user_id']
\ No newline at end of file
+    return response.get_json()['user_id']
+
+@pytest.fixture()
+def query_counter(app):
+    """
+    Returns a context manager that records every SQL statement executed inside it.
+    Usage: `with query_counter() as statements: ...` then assert on len(statements).
+    """
+    @contextmanager
+    def _count():
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', _record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _record)
+    return _count
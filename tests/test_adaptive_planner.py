@@ -0,0 +1,193 @@
+# tests/test_adaptive_planner.py
+import json
+import threading
+import time
+import pytest
+from app.models import db, User, Client, DietPlan
+from app.services.adaptive_planner_service import AdaptivePlannerService, ClientRateLimiter
+from app.services.plan_cache_service import plan_cache
+from app.services.reporting_service import ReportingService
+from app.services.llm_client import LLMClient
+
+# Note: This file relies on the fixtures (app, test_user) from conftest.py
+
+@pytest.fixture(autouse=True)
+def no_plan_cache(monkeypatch):
+    # Users here share profiles, so cached plans would hide LLM calls from the counts.
+    monkeypatch.setattr(plan_cache, 'enabled', False)
+
+class FakeModel:
+    """An LLM client backend that lets the job run without the network."""
+    def __init__(self, delay=0.0, slow_user_name=None, slow_delay=0.0, fail_user_name=None):
+        self.delay = delay
+        self.slow_user_name = slow_user_name
+        self.slow_delay = slow_delay
+        self.fail_user_name = fail_user_name
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, json_output=False, timeout=None):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.slow_user_name and self.slow_user_name in prompt:
+                time.sleep(self.slow_delay)
+            if self.fail_user_name and self.fail_user_name in prompt:
+                raise RuntimeError("LLM unavailable")
+            if "calorie adjustment" in prompt:
+                return "-100"
+            return json.dumps({"weekly_plan": {}, "summary": {}})
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def _add_users(client_id, count):
+    for i in range(count):
+        suffix = f"{client_id}-{User.query.count()}-{i}"
+        db.session.add(User(
+            client_id=client_id, username=f"planner_user_{suffix}", name=f"Planner User {suffix}",
+            contact_info=f"planner.{suffix}@example.com", age=35, gender="Female",
+            weight_kg=68, height_cm=165, fitness_goals="Weight loss"
+        ))
+    db.session.commit()
+
+def test_job_processes_every_user_with_bounded_concurrency(app, test_user):
+    _add_users(db.session.get(User, test_user).client_id, 6)
+    model = FakeModel(delay=0.02)
+    planner = AdaptivePlannerService(llm=LLMClient(model), max_workers=3)
+    summary = planner.run_for_all_users()
+
+    user_count = User.query.count()
+    assert summary["processed"] == user_count
+    assert summary["succeeded"] == user_count
+    assert summary["failed"] == 0
+    assert model.calls == 2 * user_count  # one adjustment + one diet plan per user
+    assert 1 < model.max_active <= 3
+
+def test_job_reports_failures_and_timeouts(app, test_user):
+    # Both prompts include the user's fitness goal, so the stub keys off that text.
+    fail_user = db.session.get(User, test_user)
+    fail_user.fitness_goals = "Fail this user please"
+    db.session.commit()
+
+    model = FakeModel(fail_user_name="Fail this user please")
+    planner = AdaptivePlannerService(llm=LLMClient(model), max_workers=2)
+    summary = planner.run_for_all_users()
+
+    assert summary["failed"] == 1
+    assert summary["succeeded"] == summary["processed"] - 1
+    assert summary["elapsed_seconds"] >= 0
+
+    slow_model = FakeModel(slow_user_name="Fail this user please", slow_delay=0.5)
+    planner = AdaptivePlannerService(llm=LLMClient(slow_model), max_workers=2, user_timeout=0.2)
+    summary = planner.run_for_all_users()
+    assert summary["timed_out"] == 1
+    assert summary["processed"] == User.query.count()
+
+    # Let the abandoned worker finish so it doesn't touch the database during later tests.
+    for thread in threading.enumerate():
+        if thread.name.startswith("adaptive-planner"):
+            thread.join(timeout=5)
+
+    fail_user.fitness_goals = "Build muscle"
+    db.session.commit()
+
+def test_client_rate_limiter_spaces_out_starts():
+    limiter = ClientRateLimiter(per_minute=600)  # one start every 0.1s per client
+    assert limiter.acquire(client_id=1)
+    assert not limiter.acquire(client_id=1)
+    assert 0.05 < limiter.delay(client_id=1) <= 0.1
+    assert limiter.acquire(client_id=2)  # a different client is not held back
+    time.sleep(0.1)
+    assert limiter.delay(client_id=1) == 0 and limiter.acquire(client_id=1)
+
+def test_job_spaces_out_each_clients_users(app, test_user):
+    tenant = Client(company_name=f"Planner Tenant {User.query.count()}")
+    db.session.add(tenant)
+    db.session.commit()
+    _add_users(tenant.id, 3)
+    planner = AdaptivePlannerService(llm=LLMClient(FakeModel()), max_workers=3, client_rate_per_minute=600)
+    started = []
+    acquire = planner.rate_limiter.acquire
+
+    def _record_start(client_id):
+        if acquire(client_id):
+            started.append(time.monotonic())
+            return True
+        return False
+
+    planner.rate_limiter.acquire = _record_start
+    summary = planner.run_for_all_users(client_id=tenant.id)
+
+    assert summary["succeeded"] == 3
+    assert len(started) == 3
+    assert all(later - earlier >= 0.1 for earlier, later in zip(started, started[1:]))
+
+def test_users_are_streamed_in_keyset_batches(app, test_user, query_counter):
+    _add_users(db.session.get(User, test_user).client_id, 5)
+    planner = AdaptivePlannerService(llm=LLMClient(FakeModel()), batch_size=2)
+
+    with query_counter() as statements:
+        rows = list(planner._iter_users())
+
+    assert [user_id for user_id, _, _ in rows] == [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+    assert all(report is not None for _, _, report in rows)
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    id_batches = len([s for s in selects if 'user.id > ?' in s])
+    report_batches = -(-len(rows) // 2)  # every non-empty batch gets its reports in one go
+    assert id_batches == len(rows) // 2 + 1  # a short (or empty) batch ends the stream
+    assert len(selects) == id_batches + 4 * report_batches
+
+def test_job_can_be_restricted_to_one_client(app, test_user):
+    other_tenant = Client(company_name=f"Planner Tenant {User.query.count()}")
+    db.session.add(other_tenant)
+    db.session.commit()
+    _add_users(other_tenant.id, 3)
+
+    model = FakeModel()
+    summary = AdaptivePlannerService(llm=LLMClient(model), batch_size=2).run_for_all_users(client_id=other_tenant.id)
+
+    assert summary["processed"] == 3
+    assert summary["succeeded"] == 3
+    assert model.calls == 6
+
+def test_job_saves_each_generated_diet_plan(app, test_user):
+    other_tenant = Client(company_name=f"Planner Tenant {User.query.count()}")
+    db.session.add(other_tenant)
+    db.session.commit()
+    _add_users(other_tenant.id, 2)
+
+    AdaptivePlannerService(llm=LLMClient(FakeModel())).run_for_all_users(client_id=other_tenant.id)
+
+    db.session.expire_all()
+    plans = DietPlan.query.filter_by(client_id=other_tenant.id).all()
+    assert len(plans) == 2
+    assert all(plan.generated_plan == {"weekly_plan": {}, "summary": {}} for plan in plans)
+
+def test_an_incomplete_profile_fails_only_that_user(app, test_user):
+    other_tenant = Client(company_name=f"Planner Tenant {User.query.count()}")
+    db.session.add(other_tenant)
+    db.session.commit()
+    _add_users(other_tenant.id, 2)
+    incomplete = User(
+        client_id=other_tenant.id, username=f"empty_profile_{other_tenant.id}", name="Empty Profile",
+        contact_info=f"empty.{other_tenant.id}@example.com"
+    )
+    db.session.add(incomplete)
+    db.session.commit()
+
+    ids = [user.id for user in User.query.filter_by(client_id=other_tenant.id)]
+    reports = ReportingService.get_weekly_reports(ids)
+    assert reports[incomplete.id] is None
+    assert sum(report is not None for report in reports.values()) == 2
+
+    summary = AdaptivePlannerService(llm=LLMClient(FakeModel())).run_for_all_users(client_id=other_tenant.id)
+    assert (summary["processed"], summary["succeeded"], summary["failed"]) == (3, 2, 1)
+    db.session.expire_all()
+    assert DietPlan.query.filter_by(client_id=other_tenant.id).count() == 2
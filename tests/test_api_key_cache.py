@@ -0,0 +1,85 @@
+# tests/test_api_key_cache.py
+import time
+from app.models import db, Client
+from app.utils.api_key_cache import ClientCache, client_cache
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+def _make_tenant(name):
+    tenant = Client(company_name=name)
+    db.session.add(tenant)
+    db.session.commit()
+    return tenant
+
+def test_repeat_requests_are_served_from_cache(app, seeded_client, test_user):
+    """The second request with the same key should be a cache hit, not a DB lookup."""
+    headers = {'X-API-Key': seeded_client.api_key}
+    client_cache.clear()
+
+    seeded_client.get(f'/api/reward/{test_user}/status', headers=headers)
+    seeded_client.get(f'/api/reward/{test_user}/status', headers=headers)
+
+    stats = client_cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+def test_unknown_key_is_rejected_and_not_cached(app, client):
+    client_cache.clear()
+    response = client.get('/api/reward/1/status', headers={'X-API-Key': 'not-a-real-key'})
+    assert response.status_code == 403
+    assert client_cache.stats()['size'] == 0
+
+def test_rotated_key_is_invalidated(app, client):
+    """Rotating a key must stop the old key working straight away in this process."""
+    tenant = _make_tenant("Rotation Corp")
+    old_key = tenant.api_key
+
+    response = client.get('/api/diet/99999/logs', headers={'X-API-Key': old_key})
+    assert response.status_code == 404  # authenticated, user simply doesn't exist
+
+    new_key = tenant.rotate_api_key()
+    db.session.commit()
+
+    assert client.get('/api/diet/99999/logs', headers={'X-API-Key': old_key}).status_code == 403
+    assert client.get('/api/diet/99999/logs', headers={'X-API-Key': new_key}).status_code == 404
+
+def test_deleted_client_is_invalidated(app, client):
+    tenant = _make_tenant("Deletion Corp")
+    key = tenant.api_key
+    assert client.get('/api/diet/99999/logs', headers={'X-API-Key': key}).status_code == 404
+
+    db.session.delete(tenant)
+    db.session.commit()
+
+    assert client.get('/api/diet/99999/logs', headers={'X-API-Key': key}).status_code == 403
+
+def test_key_change_invalidates_only_once_committed(app, client):
+    tenant = _make_tenant("Uncommitted Corp")
+    old_key = tenant.api_key
+    assert client.get('/api/diet/99999/logs', headers={'X-API-Key': old_key}).status_code == 404
+
+    tenant.rotate_api_key()
+    db.session.flush()
+    assert client_cache.get(old_key) is not None  # the old key is still the committed one
+
+    db.session.rollback()
+    assert 'changed_client_ids' not in db.session.info
+    assert client_cache.get(old_key) is not None
+
+    tenant.rotate_api_key()
+    db.session.commit()
+    assert client_cache.get(old_key) is None
+
+def test_cache_entries_expire_after_ttl():
+    cache = ClientCache(ttl_seconds=0.05, max_size=10)
+    cache.set('key-1', Client(company_name="Expiring Corp"))
+    assert cache.get('key-1') is not None
+    time.sleep(0.06)
+    assert cache.get('key-1') is None
+
+def test_cache_is_bounded():
+    cache = ClientCache(ttl_seconds=60, max_size=2)
+    for i in range(3):
+        cache.set(f'key-{i}', Client(company_name=f"Bounded Corp {i}"))
+    assert cache.stats()['size'] == 2
+    assert cache.get('key-0') is None  # the least recently used entry was evicted
@@ -0,0 +1,113 @@
+# tests/test_bulk_logging.py
+import json
+from app.models import db, Client, User, DietLog, WorkoutLog, ExerciseEntry
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user, query_counter) from conftest.py
+
+def _post(seeded_client, url, payload):
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    return seeded_client.post(url, headers=headers, data=json.dumps(payload))
+
+def _meal(user_id, i):
+    return {"user_id": user_id, "meal_name": f"Synced meal {i}", "calories": 300 + i,
+            "macros": {"protein_g": 20, "carbs_g": 30, "fat_g": 10}}
+
+def test_bulk_meal_log_inserts_every_item(seeded_client, test_user):
+    response = _post(seeded_client, '/api/diet/log/bulk', {"items": [_meal(test_user, i) for i in range(25)]})
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['created_count'] == 25 and body['error_count'] == 0
+    assert [log['meal_name'] for log in body['logs']] == [f"Synced meal {i}" for i in range(25)]
+    assert body['logs'][0]['protein_g'] == 20
+    assert DietLog.query.filter_by(user_id=test_user).count() == 25
+
+def test_bulk_meal_log_reports_errors_per_item(seeded_client, test_user):
+    other_tenant = Client(company_name="Bulk Other Corp")
+    db.session.add(other_tenant)
+    db.session.flush()
+    stranger = User(client_id=other_tenant.id, username="bulk_stranger", name="Bulk Stranger",
+                    contact_info="bulk.stranger@example.com", age=30, gender="Male",
+                    weight_kg=70, height_cm=175, fitness_goals="Maintain")
+    db.session.add(stranger)
+    db.session.commit()
+
+    items = [
+        _meal(test_user, 0),
+        {"user_id": test_user, "meal_name": "x", "calories": -5},  # fails validation
+        _meal(stranger.id, 2),  # another client's user
+        "not an object",
+        _meal(test_user, 4),
+    ]
+    response = _post(seeded_client, '/api/diet/log/bulk', {"items": items})
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['created_count'] == 2
+    assert [error['index'] for error in body['errors']] == [1, 2, 3]
+    assert [(log['index'], log['meal_name']) for log in body['logs']] == [(0, "Synced meal 0"), (4, "Synced meal 4")]
+    assert body['errors'][1]['error'] == "User not found or does not belong to this client."
+    assert DietLog.query.filter_by(user_id=stranger.id).count() == 0
+
+def test_bulk_meal_log_with_no_valid_items_is_rejected(seeded_client, test_user):
+    response = _post(seeded_client, '/api/diet/log/bulk', {"items": [{"user_id": test_user}]})
+    assert response.status_code == 400
+    assert response.get_json()['error_count'] == 1
+    assert DietLog.query.filter_by(user_id=test_user).count() == 0
+
+def test_bulk_meal_log_validates_the_envelope(app, seeded_client, test_user, monkeypatch):
+    assert _post(seeded_client, '/api/diet/log/bulk', [_meal(test_user, 0)]).status_code == 400
+    assert _post(seeded_client, '/api/diet/log/bulk', {"items": []}).status_code == 400
+
+    monkeypatch.setitem(app.config, 'BULK_LOG_MAX_ITEMS', 3)
+    response = _post(seeded_client, '/api/diet/log/bulk', {"items": [_meal(test_user, i) for i in range(4)]})
+    assert response.status_code == 400
+
+def test_bulk_meal_log_query_count_is_constant(seeded_client, test_user, query_counter):
+    with query_counter() as statements:
+        response = _post(seeded_client, '/api/diet/log/bulk', {"items": [_meal(test_user, i) for i in range(50)]})
+    assert response.status_code == 201
+
+    # Returning the logs in request order batches the meals into one INSERT on
+    # PostgreSQL; SQLite can't order a batch's RETURNING rows, so there it is one per meal.
+    meal_inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT INTO DIET_LOG')]
+    assert len(meal_inserts) == (50 if db.engine.dialect.name == 'sqlite' else 1)
+    # Everything else is constant: the API key lookup (or cache hit), the ownership
+    # check and one upsert of the daily nutrition rollup
+    other = [s for s in statements if s not in meal_inserts]
+    assert len([s for s in other if s.lstrip().upper().startswith('INSERT')]) == 1
+    assert len(other) <= 3
+
+def _workout(user_id, i, exercise_count=3):
+    return {"user_id": user_id, "name": f"Synced workout {i}",
+            "exercises": [{"name": f"Lift {j}", "sets": 3, "reps": 10, "weight": 20 + j} for j in range(exercise_count)]}
+
+def test_bulk_workout_log_attaches_exercises_to_the_right_workout(seeded_client, test_user):
+    items = [_workout(test_user, i, exercise_count=i + 1) for i in range(6)]
+    response = _post(seeded_client, '/api/workout/log/bulk', {"items": items})
+
+    assert response.status_code == 201
+    workouts = response.get_json()['workouts']
+    assert [w['name'] for w in workouts] == [f"Synced workout {i}" for i in range(6)]
+    assert [len(w['exercises']) for w in workouts] == [1, 2, 3, 4, 5, 6]
+    assert WorkoutLog.query.filter_by(user_id=test_user).count() == 6
+
+def test_bulk_workout_log_reports_errors_per_item(seeded_client, test_user):
+    items = [_workout(test_user, 0), {"user_id": test_user, "name": "No exercises", "exercises": []}, _workout(99999, 2)]
+    response = _post(seeded_client, '/api/workout/log/bulk', {"items": items})
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['created_count'] == 1
+    assert [error['index'] for error in body['errors']] == [1, 2]
+    assert [workout['index'] for workout in body['workouts']] == [0]
+
+def test_bulk_workout_log_inserts_exercises_in_one_statement(seeded_client, test_user, query_counter):
+    items = [_workout(test_user, i) for i in range(20)]
+    with query_counter() as statements:
+        response = _post(seeded_client, '/api/workout/log/bulk', {"items": items})
+    assert response.status_code == 201
+
+    exercise_inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT INTO EXERCISE_ENTRY')]
+    assert len(exercise_inserts) == 1
+    assert ExerciseEntry.query.join(WorkoutLog).filter(WorkoutLog.user_id == test_user).count() == 60
@@ -0,0 +1,112 @@
+# tests/test_daily_nutrition.py
+import json
+from datetime import date, datetime, time, timedelta, timezone
+import pytest
+from app.models import db, DietLog, DailyNutrition
+from app.services.nutrition_rollup_service import nutrition_rollup, NutritionRollup
+from app.services.reporting_service import ReportingService
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user, query_counter) from conftest.py
+
+def _post(seeded_client, url, payload):
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    return seeded_client.post(url, headers=headers, data=json.dumps(payload))
+
+def _rollup(user_id):
+    return {row.day: row.to_dict() for row in DailyNutrition.query.filter_by(user_id=user_id)}
+
+def test_single_meal_log_updates_the_days_totals(seeded_client, test_user):
+    for calories in (400, 600):
+        meal = {"user_id": test_user, "meal_name": "Meal", "calories": calories,
+                "macros": {"protein_g": 30, "carbs_g": 50}, "date": "2022-04-10T12:00:00Z"}
+        assert _post(seeded_client, '/api/diet/log', meal).status_code == 201
+
+    day = _rollup(test_user)[date(2022, 4, 10)]
+    assert (day['calories'], day['protein_g'], day['carbs_g'], day['fat_g'], day['meal_count']) == (1000, 60, 100, 0, 2)
+
+def test_bulk_and_import_paths_update_the_rollup(seeded_client, test_user):
+    items = [{"user_id": test_user, "meal_name": "Bulk meal", "calories": 100, "date": f"2022-05-0{d}T08:00:00Z"} for d in (1, 1, 2)]
+    assert _post(seeded_client, '/api/diet/log/bulk', {"items": items}).status_code == 201
+
+    headers = {'Content-Type': 'application/x-ndjson', 'X-API-Key': seeded_client.api_key}
+    body = json.dumps({"user_id": test_user, "meal_name": "Imported meal", "calories": 250, "date": "2022-05-02T20:00:00Z"}) + "\n"
+    assert seeded_client.post('/api/import/diet', headers=headers, data=body).status_code == 201
+
+    rollup = _rollup(test_user)
+    assert rollup[date(2022, 5, 1)]['calories'] == 200 and rollup[date(2022, 5, 1)]['meal_count'] == 2
+    assert rollup[date(2022, 5, 2)]['calories'] == 350 and rollup[date(2022, 5, 2)]['meal_count'] == 2
+
+def test_deleting_a_meal_lowers_the_totals(seeded_client, test_user):
+    for name in ("Keep", "Drop"):
+        _post(seeded_client, '/api/diet/log', {"user_id": test_user, "meal_name": name, "calories": 300, "date": "2022-06-01T09:00:00Z"})
+    db.session.delete(DietLog.query.filter_by(user_id=test_user, meal_name="Drop").one())
+    db.session.commit()
+
+    assert _rollup(test_user)[date(2022, 6, 1)]['calories'] == 300
+    assert _rollup(test_user)[date(2022, 6, 1)]['meal_count'] == 1
+
+def test_editing_a_meal_moves_its_amounts(seeded_client, test_user):
+    for name in ("Keep", "Edit"):
+        _post(seeded_client, '/api/diet/log', {"user_id": test_user, "meal_name": name, "calories": 300,
+                                               "macros": {"protein_g": 20}, "date": "2022-06-10T09:00:00Z"})
+    meal = DietLog.query.filter_by(user_id=test_user, meal_name="Edit").one()
+    meal.calories, meal.protein_g = 450, 35
+    db.session.commit()
+    assert (_rollup(test_user)[date(2022, 6, 10)]['calories'], _rollup(test_user)[date(2022, 6, 10)]['protein_g']) == (750, 55)
+
+    # Set on an expired row, so the old date has to be loaded to take the meal off its day
+    db.session.expire(meal)
+    meal.date = datetime(2022, 6, 11, 9, 0)
+    db.session.commit()
+    rollup = _rollup(test_user)
+    assert (rollup[date(2022, 6, 10)]['calories'], rollup[date(2022, 6, 10)]['meal_count']) == (300, 1)
+    assert (rollup[date(2022, 6, 11)]['calories'], rollup[date(2022, 6, 11)]['meal_count']) == (450, 1)
+
+def test_databases_without_an_upsert_use_update_then_insert(seeded_client, test_user, monkeypatch):
+    # As on a dialect with no ON CONFLICT support
+    monkeypatch.setattr(NutritionRollup, '_dialect_insert', staticmethod(lambda connection: None))
+
+    assert _post(seeded_client, '/api/diet/log', {"user_id": test_user, "meal_name": "Single", "calories": 500,
+                                                  "date": "2022-08-01T09:00:00Z"}).status_code == 201
+    items = [{"user_id": test_user, "meal_name": "Bulk meal", "calories": 100, "macros": {"protein_g": 10},
+              "date": f"2022-08-0{d}T12:00:00Z"} for d in (1, 2, 2)]
+    assert _post(seeded_client, '/api/diet/log/bulk', {"items": items}).status_code == 201
+
+    rollup = _rollup(test_user)
+    assert (rollup[date(2022, 8, 1)]['calories'], rollup[date(2022, 8, 1)]['meal_count']) == (600, 2)
+    assert (rollup[date(2022, 8, 2)]['calories'], rollup[date(2022, 8, 2)]['protein_g']) == (200, 20)
+
+def test_rebuild_matches_the_incremental_rollup(app, seeded_client, test_user):
+    items = [{"user_id": test_user, "meal_name": f"Meal {i}", "calories": 100 + i,
+              "macros": {"fat_g": 5}, "date": f"2022-07-{i % 3 + 1:02d}T10:00:00Z"} for i in range(9)]
+    _post(seeded_client, '/api/diet/log/bulk', {"items": items})
+    incremental = _rollup(test_user)
+
+    DailyNutrition.query.filter_by(user_id=test_user).update({"calories": 0})
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=['nutrition', 'rebuild'])
+
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    assert _rollup(test_user) == incremental
+
+def test_adherence_reads_the_rollup(app, test_user, query_counter):
+    with query_counter() as statements:
+        ReportingService(test_user).get_diet_adherence_score(days=7)
+    assert any('daily_nutrition' in s for s in statements)
+    assert not any('FROM diet_log' in s for s in statements)
+
+def test_adherence_covers_whole_days_only(seeded_client, test_user):
+    service = ReportingService(test_user)
+    today = datetime.now(timezone.utc).date()
+    on_target = {"user_id": test_user, "meal_name": "On target", "calories": round(service.target_calories),
+                 "date": datetime.combine(today - timedelta(days=6), time(12, 0)).isoformat() + "Z"}
+    # On the day seven days ago, which only part of the window would cover
+    part_day = {"user_id": test_user, "meal_name": "Late snack", "calories": 100,
+                "date": datetime.combine(today - timedelta(days=7), time(23, 59)).isoformat() + "Z"}
+    for meal in (on_target, part_day):
+        assert _post(seeded_client, '/api/diet/log', meal).status_code == 201
+
+    assert service.get_diet_adherence_score(days=7) == pytest.approx(100, abs=0.1)
+    batch = ReportingService.get_weekly_reports([test_user])[test_user]
+    assert batch['summary']['diet_adherence_score'] == pytest.approx(100, abs=0.1)
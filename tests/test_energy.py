@@ -0,0 +1,151 @@
+# tests/test_energy.py
+
+import itertools
+import json
+import math
+import random
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.models import db, User
+from app.services.diet_planner import DietPlannerService
+from app.services.reporting_service import ReportingService
+from app.utils.energy import (
+    IncompleteProfileError, bmr, missing_measurements, target_calories, target_calories_for_user, target_calories_for_users
+)
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+# --- The per-user calculations the energy module replaced, kept verbatim as references ---
+
+def _reporting_reference(user):
+    if user.gender.lower() == 'male':
+        bmr = 10 * user.weight_kg + 6.25 * user.height_cm - 5 * user.age + 5
+    else:
+        bmr = 10 * user.weight_kg + 6.25 * user.height_cm - 5 * user.age - 161
+    activity_multipliers = {
+        'sedentary': 1.2, 'lightlyactive': 1.375, 'moderatelyactive': 1.55, 'veryactive': 1.725, 'extraactive': 1.9
+    }
+    user_activity_level = (user.activity_level or 'sedentary').lower().replace(" ", "")
+    tdee = bmr * activity_multipliers.get(user_activity_level, 1.2)
+    goal = user.fitness_goals.lower()
+    if 'loss' in goal:
+        return tdee - 500
+    elif 'gain' in goal:
+        return tdee + 500
+    return tdee
+
+def _diet_planner_reference(user, activity_level, adjustment=0):
+    if user.gender.lower() == 'male':
+        bmr = 10 * user.weight_kg + 6.25 * user.height_cm - 5 * user.age + 5
+    else:
+        bmr = 10 * user.weight_kg + 6.25 * user.height_cm - 5 * user.age - 161
+    activity_multipliers = {
+        'sedentary': 1.2, 'lightlyActive': 1.375, 'moderatelyActive': 1.55, 'veryActive': 1.725, 'extraActive': 1.9
+    }
+    tdee = bmr * activity_multipliers.get(activity_level, 1.2)
+    goal = user.fitness_goals.lower()
+    if 'loss' in goal:
+        base_calories = tdee - 500
+    elif 'gain' in goal:
+        base_calories = tdee + 500
+    else:
+        base_calories = tdee
+    return base_calories + adjustment
+
+ACTIVITY_LEVELS = ['sedentary', 'lightlyActive', 'moderatelyActive', 'veryActive', 'extraActive']
+
+def _random_users(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            weight_kg=round(rng.uniform(40, 150), 1), height_cm=round(rng.uniform(140, 210), 1),
+            age=rng.randint(14, 99), gender=rng.choice(['Male', 'Female', 'Other', 'male']),
+            activity_level=rng.choice(ACTIVITY_LEVELS + ['moderately active', None, 'unknown']),
+            fitness_goals=rng.choice(['Weight loss', 'Muscle gain', 'Stay fit', 'weight LOSS and toning'])
+        )
+        for _ in range(count)
+    ]
+
+def test_single_user_matches_the_reporting_calculation():
+    for user in _random_users(500):
+        assert target_calories_for_user(user) == _reporting_reference(user)
+
+def test_single_user_matches_the_diet_planner_calculation():
+    users = _random_users(100)
+    for user, level, adjustment in itertools.product(users, ACTIVITY_LEVELS, [0, -150, 100]):
+        expected = _diet_planner_reference(user, level, adjustment)
+        assert target_calories_for_user(user, activity_level=level, adjustment=adjustment) == expected
+
+def test_vectorized_targets_match_the_per_user_ones():
+    users = _random_users(5000)
+    targets = target_calories_for_users(users)
+
+    assert isinstance(targets, np.ndarray)
+    assert targets.shape == (5000,)
+    assert targets.tolist() == [_reporting_reference(user) for user in users]
+
+def test_vectorized_targets_take_per_user_adjustments():
+    users = _random_users(3)
+    targets = target_calories_for_users(users, adjustments=np.array([0, -100, 250]))
+    assert targets.tolist() == [_reporting_reference(user) + adjustment for user, adjustment in zip(users, [0, -100, 250])]
+
+def test_scalar_inputs_return_floats():
+    assert bmr(70, 175, 30, 'Male') == 10 * 70 + 6.25 * 175 - 5 * 30 + 5
+    result = target_calories(70, 175, 30, 'Female', 'veryActive', 'Stay fit')
+    assert isinstance(result, float)
+    assert result == (10 * 70 + 6.25 * 175 - 5 * 30 - 161) * 1.725
+
+def test_empty_batch():
+    assert target_calories_for_users([]).shape == (0,)
+
+def test_services_use_the_shared_engine(app, test_user):
+    user = db.session.get(User, test_user)
+    planner = DietPlannerService(user, form_data={"activityLevel": "veryActive"})
+    assert planner._calculate_target_calories(adjustment=-100) == _diet_planner_reference(user, "veryActive", -100)
+
+    single = ReportingService(test_user).get_weekly_report()
+    batch = ReportingService.get_weekly_reports([test_user])[test_user]
+    assert single['summary']['target_daily_calories'] == round(_reporting_reference(user))
+    assert batch['summary']['target_daily_calories'] == single['summary']['target_daily_calories']
+
+@pytest.mark.parametrize("weight, height, age, missing", [
+    (None, 175, 30, "weight_kg"), (70, float('nan'), 30, "height_cm"), (70, 175, None, "age"),
+])
+def test_single_user_without_a_measurement_is_rejected(weight, height, age, missing):
+    with pytest.raises(IncompleteProfileError, match=missing):
+        bmr(weight, height, age, 'Male')
+    with pytest.raises(IncompleteProfileError, match=missing):
+        target_calories(weight, height, age, 'Male', 'sedentary', 'Stay fit')
+
+def test_batch_marks_users_without_a_measurement():
+    users = _random_users(3)
+    users[1].age, users[1].weight_kg = None, float('nan')
+    targets = target_calories_for_users(users)
+
+    assert math.isnan(targets[1])
+    assert targets[[0, 2]].tolist() == [_reporting_reference(users[0]), _reporting_reference(users[2])]
+    assert missing_measurements(users[1]) == ['weight_kg', 'age']
+    assert missing_measurements(users[0]) == []
+
+def test_incomplete_profiles_get_a_400(app, seeded_client, test_user):
+    user = db.session.get(User, test_user)
+    user.height_cm = None
+    db.session.commit()
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+
+    plan = seeded_client.post('/api/diet/generate-plan', headers=headers,
+                              data=json.dumps({"user_id": test_user, "activityLevel": "sedentary", "diet_type": "veg"}))
+    report = seeded_client.get(f'/api/progress/{test_user}/weekly-report', headers=headers)
+    for response in (plan, report):
+        assert response.status_code == 400
+        assert response.get_json()['error'] == "Incomplete profile"
+        assert "height_cm" in response.get_json()['details']
+
+    # Rewards that don't depend on the calorie target still work
+    assert seeded_client.get(f'/api/reward/{test_user}/status', headers=headers).status_code == 200
+    assert ReportingService.get_weekly_reports([test_user])[test_user] is None
+
+    # Later tests run jobs over every user
+    user.height_cm = 182
+    db.session.commit()
@@ -0,0 +1,65 @@
+# tests/test_export.py
+import gzip
+import json
+import uuid
+import pytest
+from app.models import db, Client, User, DietLog, WorkoutLog, ExerciseEntry, WeightEntry
+from app.services.export_service import ExportService
+
+# Note: This file relies on the fixtures (app, seeded_client) from conftest.py
+
+@pytest.fixture()
+def tenant(app):
+    """A client of its own with one user and a little history, so the export is predictable."""
+    suffix = uuid.uuid4().hex[:8]
+    tenant = Client(company_name=f"Export Corp {suffix}")
+    db.session.add(tenant)
+    db.session.flush()
+    user = User(client_id=tenant.id, username=f"export_user_{suffix}", name="Export User",
+                contact_info=f"export.{suffix}@example.com", age=40, gender="Female",
+                weight_kg=60, height_cm=160, fitness_goals="Maintain")
+    db.session.add(user)
+    db.session.flush()
+    for i in range(3):
+        db.session.add(DietLog(client_id=tenant.id, user_id=user.id, meal_name=f"Meal {i}", calories=500))
+    workout = WorkoutLog(client_id=tenant.id, user_id=user.id, name="Export workout")
+    workout.exercises.append(ExerciseEntry(client_id=tenant.id, name="Row", sets=3, reps=12, weight=30))
+    db.session.add(workout)
+    db.session.add(WeightEntry(client_id=tenant.id, user_id=user.id, weight_kg=60))
+    db.session.commit()
+    return tenant
+
+def _lines(body):
+    return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+def test_export_streams_only_the_clients_rows(app, tenant, seeded_client):
+    response = app.test_client().get('/api/export', headers={'X-API-Key': tenant.api_key})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    records = _lines(response.get_data())
+    assert [record['type'] for record in records] == ['user', 'diet_log', 'diet_log', 'diet_log', 'workout_log', 'exercise_entry', 'weight_entry']
+    assert {record['client_id'] for record in records} == {tenant.id}
+    assert records[0]['username'].startswith("export_user_")
+    assert records[5]['workout_log_id'] == records[4]['id']
+
+def test_export_can_be_gzipped(app, tenant):
+    response = app.test_client().get('/api/export', headers={'X-API-Key': tenant.api_key, 'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(_lines(gzip.decompress(response.get_data()))) == 7
+
+def test_export_type_filter(app, tenant):
+    headers = {'X-API-Key': tenant.api_key}
+    records = _lines(app.test_client().get('/api/export?types=diet_log,weight_entry', headers=headers).get_data())
+    assert {record['type'] for record in records} == {'diet_log', 'weight_entry'}
+
+    assert app.test_client().get('/api/export?types=passwords', headers=headers).status_code == 400
+
+def test_export_chunks_are_bounded(app, tenant):
+    service = ExportService(tenant.id, yield_per=2, chunk_size=200)
+    chunks = list(service.iter_chunks())
+    assert len(chunks) > 1
+    assert max(len(chunk) for chunk in chunks[:-1]) < 200 + 400  # one chunk plus at most one line
+    assert len(_lines(b"".join(chunks))) == 7
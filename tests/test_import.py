@@ -0,0 +1,87 @@
+# tests/test_import.py
+import json
+from datetime import datetime
+from app.models import db, User, DietLog, WeightEntry, WorkoutLog, ExerciseEntry, MeasurementLog
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user, query_counter) from conftest.py
+
+def _import(seeded_client, log_type, body, content_type):
+    headers = {'Content-Type': content_type, 'X-API-Key': seeded_client.api_key}
+    return seeded_client.post(f'/api/import/{log_type}', headers=headers, data=body)
+
+def _ndjson(items):
+    return "\n".join(item if isinstance(item, str) else json.dumps(item) for item in items) + "\n"
+
+def test_ndjson_diet_import_in_batches(app, seeded_client, test_user, monkeypatch, query_counter):
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_SIZE', 10)
+    items = [{"user_id": test_user, "meal_name": f"Meal {i}", "calories": 500,
+              "date": f"2020-01-{i % 28 + 1:02d}T12:00:00Z"} for i in range(35)]
+
+    with query_counter() as statements:
+        response = _import(seeded_client, 'diet', _ndjson(items), 'application/x-ndjson')
+
+    assert response.status_code == 201, response.get_data(as_text=True)
+    assert response.get_json()['created_count'] == 35
+    assert DietLog.query.filter_by(user_id=test_user).count() == 35
+    assert DietLog.query.filter_by(user_id=test_user, meal_name="Meal 0").one().date == datetime(2020, 1, 1, 12, 0)
+    # One insert per batch of 10, plus its daily nutrition upsert
+    assert len([s for s in statements if s.lstrip().upper().startswith('INSERT INTO DIET_LOG')]) == 4
+    assert len([s for s in statements if s.lstrip().upper().startswith('INSERT INTO DAILY_NUTRITION')]) == 4
+
+def test_ndjson_errors_are_reported_by_line(seeded_client, test_user):
+    body = _ndjson([
+        {"user_id": test_user, "weight_kg": 90, "date": "2019-01-01"},
+        "{not json",
+        "",
+        {"user_id": test_user, "weight_kg": -1},
+        {"user_id": test_user, "weight_kg": 85, "date": "2019-06-01"},
+    ])
+    response = _import(seeded_client, 'weight', body, 'application/x-ndjson')
+
+    assert response.status_code == 207
+    summary = response.get_json()
+    assert summary['created_count'] == 2
+    assert [error['line'] for error in summary['errors']] == [2, 4]
+    # The user's current weight follows their latest entry, not the last line
+    assert db.session.get(User, test_user).weight_kg == 85
+
+def test_csv_measurement_import(seeded_client, test_user):
+    body = (
+        "user_id,date,waist_cm,chest_cm,arms_cm,hips_cm\n"
+        f"{test_user},2018-05-01T07:00:00+02:00,90,100,,95\n"
+        f"{test_user},2018-06-01,88,,,\n"
+    )
+    response = _import(seeded_client, 'measurements', body, 'text/csv')
+
+    assert response.status_code == 201, response.get_data(as_text=True)
+    logs = MeasurementLog.query.filter_by(user_id=test_user).order_by(MeasurementLog.date).all()
+    assert [log.date for log in logs] == [datetime(2018, 5, 1, 5, 0), datetime(2018, 6, 1)]
+    assert logs[0].arms_cm is None and logs[1].waist_cm == 88
+
+def test_csv_diet_import_folds_macros(seeded_client, test_user):
+    body = (
+        "user_id,meal_name,calories,protein_g,carbs_g,fat_g,date\n"
+        f"{test_user},Porridge,350,12,60,6,2017-02-03T08:00:00Z\n"
+    )
+    assert _import(seeded_client, 'diet', body, 'text/csv').status_code == 201
+    log = DietLog.query.filter_by(user_id=test_user).one()
+    assert (log.protein_g, log.carbs_g, log.fat_g) == (12, 60, 6)
+
+def test_csv_workout_rows_are_grouped_into_workouts(seeded_client, test_user):
+    body = (
+        "user_id,name,date,exercise_name,sets,reps,weight\n"
+        f"{test_user},Leg day,2016-01-04T18:00:00Z,Squat,5,5,100\n"
+        f"{test_user},Leg day,2016-01-04T18:00:00Z,Lunge,3,10,20\n"
+        f"{test_user},Push day,2016-01-06T18:00:00Z,Bench,5,5,80\n"
+    )
+    response = _import(seeded_client, 'workouts', body, 'text/csv')
+
+    assert response.status_code == 201, response.get_data(as_text=True)
+    workouts = WorkoutLog.query.filter_by(user_id=test_user).order_by(WorkoutLog.date).all()
+    assert [(w.name, len(w.exercises)) for w in workouts] == [("Leg day", 2), ("Push day", 1)]
+    assert workouts[0].date == datetime(2016, 1, 4, 18, 0)
+
+def test_import_rejects_unknown_types_and_formats(seeded_client, test_user):
+    assert _import(seeded_client, 'sleep', "{}\n", 'application/x-ndjson').status_code == 404
+    assert _import(seeded_client, 'diet', "{}", 'application/json').status_code == 415
+    assert _import(seeded_client, 'diet', "", 'application/x-ndjson').status_code == 400
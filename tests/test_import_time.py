@@ -0,0 +1,53 @@
+# tests/test_import_time.py
+
+import os
+import subprocess
+import sys
+import pytest
+
+# Modules that must only be loaded on first use, never by create_app()
+HEAVY_MODULES = ['google.generativeai', 'grpc', 'google.protobuf', 'numpy', 'apscheduler']
+
+# Cold-start budget for importing the app and running create_app(), in milliseconds.
+# Measured at roughly 800ms locally; override with IMPORT_TIME_BUDGET_MS on slow runners.
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', 2000))
+
+COLD_START = """
+import time
+start = time.perf_counter()
+from app import create_app
+create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'SECRET_KEY': 'x'})
+print((time.perf_counter() - start) * 1000)
+"""
+
+def _parse_importtime(stderr):
+    """Returns {module: cumulative microseconds} from `python -X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+@pytest.fixture(scope='module')
+def cold_start():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', COLD_START],
+        cwd=root, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return float(result.stdout.strip().splitlines()[-1]), _parse_importtime(result.stderr)
+
+def test_create_app_does_not_import_heavy_dependencies(cold_start):
+    _, modules = cold_start
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    assert loaded == [], f"create_app() imported {loaded}; import them where they are first used"
+
+def test_create_app_cold_start_is_within_budget(cold_start):
+    elapsed_ms, _ = cold_start
+    assert elapsed_ms < IMPORT_TIME_BUDGET_MS, (
+        f"Importing the app and running create_app() took {elapsed_ms:.0f}ms "
+        f"(budget {IMPORT_TIME_BUDGET_MS:.0f}ms); check `python -X importtime` for new heavy imports"
+    )
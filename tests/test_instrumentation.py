@@ -0,0 +1,87 @@
+# tests/test_instrumentation.py
+
+import json
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.models import db
+from app.services.llm_client import llm_client, FakeBackend
+from app.utils.instrumentation import instrumentation
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+@pytest.fixture
+def metrics_enabled(app):
+    """Turns instrumentation on for one test, starting from empty counters."""
+    instrumentation.reset()
+    instrumentation.enabled = True
+    yield instrumentation
+    instrumentation.enabled = False
+    instrumentation.metrics_token = None
+    instrumentation.reset()
+
+def _headers(seeded_client):
+    return {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+
+def _server_timing(response):
+    return dict(
+        (part.split(';')[0].strip(), part) for part in response.headers['Server-Timing'].split(',')
+    )
+
+def test_disabled_by_default(seeded_client, test_user):
+    response = seeded_client.get(f'/api/diet/{test_user}/logs', headers=_headers(seeded_client))
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+    assert seeded_client.get('/metrics').status_code == 404
+
+def test_server_timing_reports_db_statements(seeded_client, test_user, metrics_enabled):
+    response = seeded_client.get(f'/api/diet/{test_user}/logs', headers=_headers(seeded_client))
+    assert response.status_code == 200
+
+    timings = _server_timing(response)
+    assert set(timings) == {'db', 'total'}
+    assert 'statements"' in timings['db']
+
+def test_failed_statements_are_timed(app, metrics_enabled):
+    with app.test_request_context():
+        metrics_enabled._before_request()
+        with db.engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM no_such_table"))
+            connection.execute(text("SELECT 1"))
+        assert g._request_metrics["db_statements"] == 2
+        assert 0 < g._request_metrics["db_seconds"] < 1
+
+def test_metrics_are_labelled_by_route_pattern(seeded_client, test_user, metrics_enabled):
+    for _ in range(2):
+        seeded_client.get(f'/api/diet/{test_user}/logs', headers=_headers(seeded_client))
+
+    body = seeded_client.get('/metrics').get_data(as_text=True)
+    assert 'http_requests_total{method="GET",endpoint="/api/diet/<int:user_id>/logs",status="200"} 2' in body
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/api/diet/<int:user_id>/logs"} 2' in body
+    assert 'http_request_db_statements_bucket{method="GET",endpoint="/api/diet/<int:user_id>/logs",le="+Inf"} 2' in body
+    assert 'api_key_cache_requests_total{result="hit"}' in body
+    assert 'plan_cache_requests_total{result="miss"}' in body
+
+def test_llm_time_is_attributed_to_the_request(seeded_client, test_user, metrics_enabled):
+    previous = llm_client.set_backend(FakeBackend(lambda prompt, json_output: json.dumps({"weekly_plan": {}}), latency=0.01))
+    try:
+        payload = {"user_id": test_user, "activityLevel": "lightlyActive", "diet_type": "non-veg", "budget": "instrumented"}
+        response = seeded_client.post('/api/diet/generate-plan', headers=_headers(seeded_client), data=json.dumps(payload))
+    finally:
+        llm_client.set_backend(previous)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert 'llm' in _server_timing(response)
+
+    body = seeded_client.get('/metrics').get_data(as_text=True)
+    assert 'llm_requests_total{kind="json",outcome="success"} 1' in body
+
+def test_metrics_token_is_required_when_configured(client, metrics_enabled):
+    metrics_enabled.metrics_token = 'scrape-secret'
+    assert client.get('/metrics').status_code == 401
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
@@ -0,0 +1,41 @@
+# tests/test_llm_client.py
+import pytest
+from app.services import llm_client as llm_module
+from app.services.llm_client import LLMClient, FakeBackend
+
+# Note: This file relies on the fixtures (app) from conftest.py
+
+def test_backend_is_built_once_and_reused(app, monkeypatch):
+    built = []
+
+    class RecordingBackend(FakeBackend):
+        def __init__(self, api_key, model_name):
+            super().__init__()
+            built.append((api_key, model_name))
+
+    monkeypatch.setattr(llm_module, 'GeminiBackend', RecordingBackend)
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', 'test-key')
+    client = LLMClient()
+    client.init_app(app)
+
+    assert client.generate_text("first") == "0"
+    assert client.generate_json("second") == {"weekly_plan": {}}
+    assert built == [('test-key', 'gemini-2.5-pro')]
+
+def test_missing_api_key_is_reported(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'GEMINI_API_KEY', None)
+    client = LLMClient()
+    client.init_app(app)
+
+    assert not client.is_configured
+    with pytest.raises(ValueError):
+        client.generate_text("anything")
+
+def test_set_backend_returns_the_previous_one():
+    original = FakeBackend()
+    client = LLMClient(backend=original)
+    replacement = FakeBackend(lambda prompt, json_output: "42")
+
+    assert client.set_backend(replacement) is original
+    assert client.generate_text("how many?") == "42"
+    assert replacement.calls == 1 and original.calls == 0
@@ -0,0 +1,87 @@
+# tests/test_pagination.py
+from datetime import datetime, timedelta
+from app.models import db, User, DietLog, WorkoutLog, ExerciseEntry, WeightEntry
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+BASE_DATE = datetime(2025, 1, 1, 8, 0, 0)
+
+def _seed_diet_logs(user_id, count):
+    user = db.session.get(User, user_id)
+    for i in range(count):
+        db.session.add(DietLog(client_id=user.client_id, user_id=user.id, meal_name=f"Meal {i}",
+                               calories=400, date=BASE_DATE + timedelta(days=i)))
+    db.session.commit()
+
+def _fetch_all_pages(seeded_client, url, **params):
+    headers = {'X-API-Key': seeded_client.api_key}
+    items, cursor, pages = [], None, 0
+    while True:
+        query = dict(params)
+        if cursor:
+            query['cursor'] = cursor
+        response = seeded_client.get(url, headers=headers, query_string=query)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        body = response.get_json()
+        items.extend(body['items'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return items, pages
+
+def test_diet_logs_are_paginated_newest_first(app, seeded_client, test_user):
+    _seed_diet_logs(test_user, 7)
+    items, pages = _fetch_all_pages(seeded_client, f'/api/diet/{test_user}/logs', limit=3)
+    assert pages == 3
+    assert len(items) == 7
+    assert len({item['id'] for item in items}) == 7  # no duplicates across pages
+    dates = [item['date'] for item in items]
+    assert dates == sorted(dates, reverse=True)
+
+def test_rows_sharing_a_timestamp_are_not_skipped(app, seeded_client, test_user):
+    user = db.session.get(User, test_user)
+    for i in range(5):
+        db.session.add(DietLog(client_id=user.client_id, user_id=user.id, meal_name=f"Same Time {i}",
+                               calories=100, date=BASE_DATE))
+    db.session.commit()
+    items, _ = _fetch_all_pages(seeded_client, f'/api/diet/{test_user}/logs', limit=2)
+    assert len({item['id'] for item in items}) == 5
+
+def test_diet_logs_date_filters(app, seeded_client, test_user):
+    _seed_diet_logs(test_user, 10)
+    items, _ = _fetch_all_pages(seeded_client, f'/api/diet/{test_user}/logs', **{'from': '2025-01-03', 'to': '2025-01-05'})
+    assert [item['meal_name'] for item in items] == ["Meal 4", "Meal 3", "Meal 2"]
+
+def test_date_filters_accept_a_trailing_z(app, seeded_client, test_user):
+    _seed_diet_logs(test_user, 10)
+    items, _ = _fetch_all_pages(seeded_client, f'/api/diet/{test_user}/logs', **{'from': '2025-01-03T00:00:00Z', 'to': '2025-01-05'})
+    assert [item['meal_name'] for item in items] == ["Meal 4", "Meal 3", "Meal 2"]
+
+def test_workout_history_is_paginated(app, seeded_client, test_user):
+    user = db.session.get(User, test_user)
+    for i in range(5):
+        log = WorkoutLog(client_id=user.client_id, user_id=user.id, name=f"Workout {i}", date=BASE_DATE + timedelta(days=i))
+        log.exercises.append(ExerciseEntry(client_id=user.client_id, name="Squat", sets=3, reps=5, weight=100))
+        db.session.add(log)
+    db.session.commit()
+
+    items, pages = _fetch_all_pages(seeded_client, f'/api/workout/{test_user}/history', limit=2)
+    assert pages == 3
+    assert [item['name'] for item in items] == [f"Workout {i}" for i in range(4, -1, -1)]
+    assert all(len(item['exercises']) == 1 for item in items)
+
+def test_weight_history_is_paginated_oldest_first(app, seeded_client, test_user):
+    user = db.session.get(User, test_user)
+    for i in range(4):
+        db.session.add(WeightEntry(client_id=user.client_id, user_id=user.id, weight_kg=80 - i, date=BASE_DATE + timedelta(days=i)))
+    db.session.commit()
+
+    items, _ = _fetch_all_pages(seeded_client, f'/api/progress/{test_user}/weight', limit=3)
+    assert [item['weight_kg'] for item in items] == [80, 79, 78, 77]
+
+def test_invalid_pagination_parameters_fail(seeded_client, test_user):
+    headers = {'X-API-Key': seeded_client.api_key}
+    assert seeded_client.get(f'/api/diet/{test_user}/logs?limit=0', headers=headers).status_code == 400
+    assert seeded_client.get(f'/api/diet/{test_user}/logs?limit=abc', headers=headers).status_code == 400
+    assert seeded_client.get(f'/api/diet/{test_user}/logs?cursor=garbage', headers=headers).status_code == 400
+    assert seeded_client.get(f'/api/progress/{test_user}/weight?from=yesterday', headers=headers).status_code == 400
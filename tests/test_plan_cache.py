@@ -0,0 +1,111 @@
+# tests/test_plan_cache.py
+import json
+import pytest
+from app.models import db, User, PlanCacheEntry
+from app.services.llm_client import llm_client, FakeBackend
+from app.services.plan_cache_service import PlanCache, plan_cache, make_cache_key
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+@pytest.fixture()
+def fake_llm(app):
+    """Swaps the shared LLM client's backend for a counter and a canned plan."""
+    calls = []
+
+    def _respond(prompt, json_output):
+        calls.append(prompt)
+        return json.dumps({"weekly_plan": {"Monday": {}}, "call": len(calls)})
+
+    previous = llm_client.set_backend(FakeBackend(_respond))
+    yield calls
+    llm_client.set_backend(previous)
+
+def _post(seeded_client, url, payload):
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    return seeded_client.post(url, headers=headers, data=json.dumps(payload))
+
+def test_identical_diet_requests_hit_the_cache(seeded_client, test_user, fake_llm):
+    payload = {"user_id": test_user, "activityLevel": "veryActive", "diet_type": "veg", "budget": "4321"}
+    first = _post(seeded_client, '/api/diet/generate-plan', payload)
+    second = _post(seeded_client, '/api/diet/generate-plan', payload)
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.headers['X-Plan-Cache'] == 'MISS'
+    assert second.headers['X-Plan-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    assert len(fake_llm) == 1
+
+def test_different_inputs_miss_the_cache(seeded_client, test_user, fake_llm):
+    payload = {"user_id": test_user, "activityLevel": "sedentary", "diet_type": "veg", "budget": "1111"}
+    _post(seeded_client, '/api/diet/generate-plan', payload)
+    payload["diet_type"] = "non-veg"
+    response = _post(seeded_client, '/api/diet/generate-plan', payload)
+    assert response.headers['X-Plan-Cache'] == 'MISS'
+    assert len(fake_llm) == 2
+
+def test_bypass_flag_forces_a_fresh_workout_plan(seeded_client, test_user, fake_llm):
+    payload = {"user_id": test_user, "fitnessLevel": "advanced", "equipment": "Home gym"}
+    _post(seeded_client, '/api/workout/generate-plan', payload)
+    bypasses_before = plan_cache.stats()['bypasses']
+
+    response = _post(seeded_client, '/api/workout/generate-plan', dict(payload, bypass_cache=True))
+    assert response.headers['X-Plan-Cache'] == 'MISS'
+    assert response.get_json()['call'] == 2
+    assert plan_cache.stats()['bypasses'] == bypasses_before + 1
+
+    # The fresh plan replaced the cached one
+    response = _post(seeded_client, '/api/workout/generate-plan', payload)
+    assert response.headers['X-Plan-Cache'] == 'HIT'
+    assert response.get_json()['call'] == 2
+
+def test_cache_key_ignores_prompt_indentation():
+    assert make_cache_key('diet', "  Line one\n\n      Line   two  ") == make_cache_key('diet', "Line one\nLine two")
+    assert make_cache_key('diet', "Line one") != make_cache_key('workout', "Line one")
+
+def test_cache_key_includes_the_model_name():
+    assert make_cache_key('diet', "Line one", 'gemini-2.5-pro') != make_cache_key('diet', "Line one", 'gemini-2.5-flash')
+
+def test_expired_entries_are_not_served(app):
+    cache = PlanCache(ttl_seconds=-1)
+    cache.set('diet', 'an expired prompt', {"plan": 1})
+    assert cache.get('diet', 'an expired prompt') is None
+    assert cache.stats()['misses'] == 1
+
+def test_cache_size_is_bounded(app):
+    PlanCacheEntry.query.delete()
+    db.session.commit()
+
+    cache = PlanCache(max_entries=3, evict_interval=0)
+    for i in range(5):
+        cache.set('diet', f'bounded prompt {i}', {"plan": i})
+
+    assert PlanCacheEntry.query.count() == 3
+    assert cache.stats()['evictions'] == 2
+    assert cache.get('diet', 'bounded prompt 0') is None
+    assert cache.get('diet', 'bounded prompt 4') == {"plan": 4}
+
+def test_eviction_runs_at_most_once_per_interval(app, query_counter):
+    PlanCacheEntry.query.delete()
+    db.session.commit()
+
+    cache = PlanCache(max_entries=1, evict_interval=60)
+    with query_counter() as statements:
+        for i in range(3):
+            cache.set('diet', f'throttled prompt {i}', {"plan": i})
+
+    assert len([s for s in statements if 'count(' in s.lower()]) == 1
+    assert PlanCacheEntry.query.count() == 3  # the surplus waits for the next eviction
+    cache._next_eviction = 0.0
+    cache.set('diet', 'throttled prompt 3', {"plan": 3})
+    assert PlanCacheEntry.query.count() == 1
+    assert cache.get('diet', 'throttled prompt 3') == {"plan": 3}
+
+def test_storing_a_plan_leaves_the_callers_session_alone(app, test_user):
+    user = db.session.get(User, test_user)
+    user.fitness_goals = "Uncommitted goal"  # pending work in the request session
+
+    PlanCache().set('diet', f'isolated prompt {test_user}', {"plan": 1})
+    db.session.rollback()
+
+    assert db.session.get(User, test_user).fitness_goals != "Uncommitted goal"
+    assert PlanCache().get('diet', f'isolated prompt {test_user}') == {"plan": 1}
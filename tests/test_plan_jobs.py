@@ -0,0 +1,126 @@
+# tests/test_plan_jobs.py
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import update
+from app.models import db, User, PlanJob, WorkoutPlan
+from app.services.llm_client import llm_client, FakeBackend
+from app.services.plan_job_service import plan_jobs
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+@pytest.fixture()
+def fake_llm(app):
+    def _respond(prompt, json_output):
+        if "FAIL" in prompt:
+            raise RuntimeError("Gemini is down")
+        return json.dumps({"weekly_schedule": {"Monday": {"day_type": "Rest"}}})
+
+    previous = llm_client.set_backend(FakeBackend(_respond))
+    yield
+    llm_client.set_backend(previous)
+
+def _submit(seeded_client, url, payload):
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    response = seeded_client.post(url, headers=headers, data=json.dumps(payload))
+    assert response.status_code == 202, response.get_data(as_text=True)
+    body = response.get_json()
+    assert response.headers['Location'] == body['status_url']
+    plan_jobs.wait(body['job_id'], timeout=10)
+    return body
+
+def test_diet_plan_job_runs_in_background(seeded_client, test_user, fake_llm):
+    body = _submit(seeded_client, '/api/diet/plan-jobs',
+                   {"user_id": test_user, "activityLevel": "sedentary", "diet_type": "veg", "bypass_cache": True})
+    assert body['status'] == 'pending'
+
+    response = seeded_client.get(body['status_url'], headers={'X-API-Key': seeded_client.api_key})
+    assert response.status_code == 200
+    job = response.get_json()
+    assert job['status'] == 'succeeded'
+    assert job['result'] == {"weekly_schedule": {"Monday": {"day_type": "Rest"}}}
+    assert job['finished_at'] is not None
+
+def test_workout_plan_job_saves_the_plan(seeded_client, test_user, fake_llm):
+    body = _submit(seeded_client, '/api/workout/plan-jobs',
+                   {"user_id": test_user, "fitnessLevel": "beginner", "equipment": "Gym access", "bypass_cache": True})
+    job = seeded_client.get(body['status_url'], headers={'X-API-Key': seeded_client.api_key}).get_json()
+    assert job['status'] == 'succeeded'
+    assert WorkoutPlan.query.filter_by(user_id=test_user).count() == 1
+
+def test_failed_generation_is_reported_on_the_job(app, seeded_client, test_user, fake_llm):
+    from app.models import db, User
+    user = db.session.get(User, test_user)
+    user.fitness_goals = "FAIL please"
+    db.session.commit()
+
+    body = _submit(seeded_client, '/api/workout/plan-jobs',
+                   {"user_id": test_user, "fitnessLevel": "beginner", "equipment": "Gym access"})
+    job = seeded_client.get(body['status_url'], headers={'X-API-Key': seeded_client.api_key}).get_json()
+    assert job['status'] == 'failed'
+    assert "Gemini is down" in job['error']
+
+def test_jobs_are_scoped_to_kind_and_client(seeded_client, test_user, fake_llm):
+    body = _submit(seeded_client, '/api/diet/plan-jobs',
+                   {"user_id": test_user, "activityLevel": "sedentary", "diet_type": "veg"})
+    headers = {'X-API-Key': seeded_client.api_key}
+    assert seeded_client.get(f"/api/workout/plan-jobs/{body['job_id']}", headers=headers).status_code == 404
+    assert seeded_client.get('/api/diet/plan-jobs/not-a-job', headers=headers).status_code == 404
+
+def test_plan_job_for_nonexistent_user_fails(seeded_client, fake_llm):
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    payload = {"user_id": 99999, "activityLevel": "sedentary", "diet_type": "veg"}
+    response = seeded_client.post('/api/diet/plan-jobs', headers=headers, data=json.dumps(payload))
+    assert response.status_code == 404
+
+def _orphaned_job(user_id, status, age):
+    user = db.session.get(User, user_id)
+    when = datetime.now(timezone.utc) - age
+    job = PlanJob(client_id=user.client_id, user_id=user_id, kind='diet', status=status, created_at=when,
+                  started_at=when if status == 'running' else None)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+def test_jobs_orphaned_by_a_restart_are_failed_when_polled(seeded_client, test_user):
+    headers = {'X-API-Key': seeded_client.api_key}
+    for status in ('pending', 'running'):
+        job_id = _orphaned_job(test_user, status, age=timedelta(hours=2))
+        job = seeded_client.get(f'/api/diet/plan-jobs/{job_id}', headers=headers).get_json()
+        assert job['status'] == 'failed'
+        assert "interrupted" in job['error']
+        assert job['finished_at'] is not None
+
+def test_recent_jobs_are_left_alone(seeded_client, test_user):
+    job_id = _orphaned_job(test_user, 'running', age=timedelta(minutes=1))
+    job = seeded_client.get(f'/api/diet/plan-jobs/{job_id}', headers={'X-API-Key': seeded_client.api_key}).get_json()
+    assert job['status'] == 'running'
+
+def test_a_job_failed_as_stale_is_not_started_later(app, seeded_client, test_user, fake_llm):
+    job_id = _orphaned_job(test_user, 'pending', age=timedelta(hours=2))
+    plan_jobs.fail_if_stale(db.session.get(PlanJob, job_id))
+
+    plan_jobs._run(job_id)
+    db.session.expire_all()
+    assert db.session.get(PlanJob, job_id).status == 'failed'
+
+def test_a_job_failed_as_stale_while_running_keeps_its_failure(app, seeded_client, test_user, fake_llm, monkeypatch):
+    job_id = _orphaned_job(test_user, 'pending', age=timedelta(seconds=0))
+    job = db.session.get(PlanJob, job_id)
+    job.kind, job.request_data = 'workout', {"fitnessLevel": "beginner", "equipment": "Gym access"}
+    db.session.commit()
+    generate = plan_jobs._generate
+
+    def _generate_while_failed_elsewhere(job):
+        # Another worker's poll gives up on the job while the LLM call is in flight
+        db.session.execute(update(PlanJob).where(PlanJob.id == job_id).values(status='failed', error="interrupted"))
+        db.session.commit()
+        return generate(job)
+
+    monkeypatch.setattr(plan_jobs, '_generate', _generate_while_failed_elsewhere)
+    plan_jobs._run(job_id)
+
+    db.session.expire_all()
+    job = db.session.get(PlanJob, job_id)
+    assert (job.status, job.error, job.result) == ('failed', "interrupted", None)
+    assert WorkoutPlan.query.filter_by(user_id=test_user).count() == 0
@@ -0,0 +1,77 @@
+# tests/test_query_counts.py
+from datetime import datetime, timedelta
+from app.models import db, User, WorkoutLog, ExerciseEntry, WeightEntry
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user, query_counter) from conftest.py
+# These are regression tests: the number of SQL statements a request issues must not
+# grow with the size of the user's history.
+
+def _seed_workouts(user_id, count, exercises_per_workout=3):
+    user = db.session.get(User, user_id)
+    start = datetime(2024, 1, 1, 7, 0, 0)
+    for i in range(count):
+        log = WorkoutLog(client_id=user.client_id, user_id=user.id, name=f"Session {i}", date=start + timedelta(days=i))
+        for j in range(exercises_per_workout):
+            log.exercises.append(ExerciseEntry(client_id=user.client_id, name=f"Lift {j}", sets=3, reps=8, weight=50))
+        db.session.add(log)
+    db.session.commit()
+    db.session.expire_all()
+
+def _count_history_queries(seeded_client, user_id, query_counter):
+    headers = {'X-API-Key': seeded_client.api_key}
+    with query_counter() as statements:
+        response = seeded_client.get(f'/api/workout/{user_id}/history?limit=500', headers=headers)
+    assert response.status_code == 200
+    return len(statements), response.get_json()['items']
+
+def test_workout_history_query_count_is_constant(app, seeded_client, test_user, query_counter):
+    _seed_workouts(test_user, 2)
+    small_count, small_items = _count_history_queries(seeded_client, test_user, query_counter)
+
+    _seed_workouts(test_user, 40)
+    large_count, large_items = _count_history_queries(seeded_client, test_user, query_counter)
+
+    assert len(small_items) == 2
+    assert len(large_items) == 42
+    assert all(len(item['exercises']) == 3 for item in large_items)
+    assert large_count == small_count
+
+def _seed_weights(user_id, weights, start=datetime(2023, 1, 1, 8, 0, 0)):
+    user = db.session.get(User, user_id)
+    for i, weight in enumerate(weights):
+        db.session.add(WeightEntry(client_id=user.client_id, user_id=user.id, weight_kg=weight, date=start + timedelta(days=7 * i)))
+    db.session.commit()
+    db.session.expire_all()
+
+def _count_reward_queries(seeded_client, user_id, query_counter):
+    headers = {'X-API-Key': seeded_client.api_key}
+    with query_counter() as statements:
+        response = seeded_client.get(f'/api/reward/{user_id}/status', headers=headers)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+def test_reward_status_query_count_is_constant(app, seeded_client, test_user, query_counter):
+    # Close to the user's current weight, so no milestone is unlocked along the way
+    _seed_weights(test_user, [76, 75])
+    small_count, _ = _count_reward_queries(seeded_client, test_user, query_counter)
+
+    _seed_weights(test_user, [75.5] * 60, start=datetime(2023, 3, 1, 8, 0, 0))
+    large_count, _ = _count_reward_queries(seeded_client, test_user, query_counter)
+
+    assert large_count == small_count
+
+def test_weight_milestone_uses_the_earliest_weight(app, seeded_client, test_user, query_counter):
+    # Logged out of order: the earliest entry by date is the heaviest one
+    _seed_weights(test_user, [74], start=datetime(2024, 6, 1, 8, 0, 0))
+    _seed_weights(test_user, [90], start=datetime(2023, 1, 1, 8, 0, 0))
+    user = db.session.get(User, test_user)
+    user.weight_kg = 80
+    db.session.commit()
+
+    _, body = _count_reward_queries(seeded_client, test_user, query_counter)
+    assert "5% Weight Loss Milestone" in body['newly_unlocked_rewards']
+    assert [entry.weight_kg for entry in db.session.get(User, test_user).weight_history] == [90, 74]
+
+    # Once unlocked, the achievement is not granted again
+    _, body = _count_reward_queries(seeded_client, test_user, query_counter)
+    assert body['newly_unlocked_rewards'] == []
@@ -0,0 +1,59 @@
+# tests/test_query_plans.py
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, text
+from app.models import db, DietLog, WorkoutLog, WeightEntry, MeasurementLog, WorkoutPlan, Achievement, ExerciseEntry
+
+# These tests run EXPLAIN QUERY PLAN against the SQLite test database to make sure
+# the hot read paths are served by the composite indexes rather than table scans.
+
+def _query_plan(query):
+    statement = query.statement if hasattr(query, 'statement') else query
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return " ".join(row[-1] for row in rows)
+
+def _since():
+    return datetime.now(timezone.utc) - timedelta(days=7)
+
+def test_diet_log_history_uses_index(app):
+    plan = _query_plan(DietLog.query.filter_by(user_id=1, client_id=1).order_by(DietLog.date.desc()))
+    assert "ix_diet_log_client_user_date" in plan
+    assert "TEMP B-TREE" not in plan  # ordering comes from the index, no sort step
+
+def test_diet_adherence_range_uses_index(app):
+    query = db.session.query(func.date(DietLog.date), func.sum(DietLog.calories)).filter(
+        DietLog.client_id == 1, DietLog.user_id == 1, DietLog.date >= _since()
+    ).group_by(func.date(DietLog.date))
+    assert "ix_diet_log_client_user_date" in _query_plan(query)
+
+def test_workout_history_uses_index(app):
+    plan = _query_plan(WorkoutLog.query.filter_by(user_id=1, client_id=1).order_by(WorkoutLog.date.desc()))
+    assert "ix_workout_log_client_user_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_weekly_workout_count_uses_index(app):
+    query = db.session.query(func.count(WorkoutLog.id)).filter(
+        WorkoutLog.client_id == 1, WorkoutLog.user_id == 1, WorkoutLog.date >= _since()
+    )
+    assert "ix_workout_log_client_user_date" in _query_plan(query)
+
+def test_weight_history_uses_index(app):
+    plan = _query_plan(WeightEntry.query.filter_by(user_id=1, client_id=1).order_by(WeightEntry.date.asc()))
+    assert "ix_weight_entry_client_user_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_measurement_history_uses_index(app):
+    plan = _query_plan(MeasurementLog.query.filter_by(user_id=1, client_id=1).order_by(MeasurementLog.date.desc()))
+    assert "ix_measurement_log_client_user_date" in plan
+
+def test_workout_plan_lookup_uses_index(app):
+    plan = _query_plan(WorkoutPlan.query.filter_by(user_id=1, client_id=1).order_by(WorkoutPlan.created_at.desc()))
+    assert "ix_workout_plan_client_user_created_at" in plan
+
+def test_achievement_listing_uses_index(app):
+    plan = _query_plan(Achievement.query.filter_by(user_id=1, client_id=1).order_by(Achievement.unlocked_at.desc()))
+    assert "ix_achievement_client_user_unlocked_at" in plan
+
+def test_exercise_lookup_uses_index(app):
+    plan = _query_plan(ExerciseEntry.query.filter(ExerciseEntry.workout_log_id.in_([1, 2, 3])))
+    assert "ix_exercise_entry_workout_log_id" in plan
@@ -0,0 +1,93 @@
+# tests/test_reporting_service.py
+import json
+from datetime import datetime, timedelta, timezone
+from app.models import db, User, DietLog, WorkoutLog, WeightEntry
+from app.services.reporting_service import ReportingService
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user, query_counter) from conftest.py
+
+def _seed_user(client_id, index, weights, workouts, meals):
+    now = datetime.now(timezone.utc)
+    user = User(
+        client_id=client_id, username=f"report_user_{index}_{now.timestamp()}", name=f"Report User {index}",
+        contact_info=f"report.{index}.{now.timestamp()}@example.com", age=30 + index,
+        gender="Male" if index % 2 else "Female", weight_kg=70 + index, height_cm=170,
+        fitness_goals=["Weight loss", "Muscle gain", "Stay fit"][index % 3],
+        activity_level=["sedentary", "Lightly Active", None][index % 3]
+    )
+    db.session.add(user)
+    db.session.flush()
+    for day, weight in weights:
+        db.session.add(WeightEntry(client_id=client_id, user_id=user.id, weight_kg=weight, date=now - timedelta(days=day)))
+    for day in workouts:
+        db.session.add(WorkoutLog(client_id=client_id, user_id=user.id, name="Session", date=now - timedelta(days=day)))
+    for day, calories in meals:
+        db.session.add(DietLog(client_id=client_id, user_id=user.id, meal_name="Meal", calories=calories, date=now - timedelta(days=day)))
+    return user
+
+def test_batch_reports_match_single_user_reports(app, seeded_client, query_counter):
+    from app.models import Client
+    client_id = Client.query.filter_by(company_name="Test Fitness Corp").first().id
+    users = [
+        _seed_user(client_id, 0, weights=[(6, 80.0), (3, 79.4), (1, 78.9)], workouts=[1, 2, 5], meals=[(1, 1800), (1, 400), (2, 2100)]),
+        _seed_user(client_id, 1, weights=[(2, 90.0)], workouts=[], meals=[(3, 2500)]),
+        _seed_user(client_id, 2, weights=[(10, 60.0), (2, 61.0), (1, 61.5)], workouts=[9, 1], meals=[(12, 1000)]),
+        _seed_user(client_id, 3, weights=[], workouts=[], meals=[]),
+    ]
+    db.session.commit()
+    ids = [user.id for user in users]
+
+    with query_counter() as statements:
+        batch = ReportingService.get_weekly_reports(ids)
+
+    assert len(statements) == 4  # users, weights, workouts, diet: independent of the number of users
+    for user in users:
+        assert batch[user.id] == ReportingService(user.id).get_weekly_report()
+
+    assert batch[users[0].id]["summary"]["weight_change_kg"] == -1.1
+    assert batch[users[0].id]["summary"]["workouts_completed"] == 3
+    assert batch[users[1].id]["summary"]["weight_change_kg"] == 0.0
+    assert batch[users[3].id]["summary"]["diet_adherence_score"] == 0
+
+def test_batch_reports_skip_unknown_users(app):
+    assert ReportingService.get_weekly_reports([]) == {}
+    assert ReportingService.get_weekly_reports([987654]) == {}
+
+def _post(seeded_client, url, payload):
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    return seeded_client.post(url, headers=headers, data=json.dumps(payload))
+
+def test_diet_summary_aggregates_per_day(seeded_client, test_user, query_counter):
+    meals = [("2023-01-01T08:00:00Z", 500, 30), ("2023-01-01T19:00:00Z", 900, 50), ("2023-01-03T12:00:00Z", 2000, 100),
+             ("2023-01-09T12:00:00Z", 1500, 10)]  # outside the window
+    items = [{"user_id": test_user, "meal_name": "Meal", "calories": calories, "macros": {"protein_g": protein}, "date": when}
+             for when, calories, protein in meals]
+    assert _post(seeded_client, '/api/diet/log/bulk', {"items": items}).status_code == 201
+
+    headers = {'X-API-Key': seeded_client.api_key}
+    with query_counter() as statements:
+        response = seeded_client.get(f'/api/diet/{test_user}/weekly-summary?from=2023-01-01&to=2023-01-07', headers=headers)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    summary = response.get_json()
+    assert summary['period'] == {"from": "2023-01-01", "to": "2023-01-07", "days": 7}
+    assert summary['days_logged'] == 2
+    assert summary['totals']['calories'] == 3400 and summary['totals']['meal_count'] == 3
+    assert summary['totals']['protein_g'] == 180
+    assert summary['daily_averages']['calories'] == 1700
+    assert [(day['day'], day['calories']) for day in summary['days']] == [("2023-01-01", 1400), ("2023-01-03", 2000)]
+    assert not any('FROM diet_log' in s for s in statements)
+
+def test_diet_summary_defaults_to_the_last_seven_days(seeded_client, test_user):
+    response = seeded_client.get(f'/api/diet/{test_user}/weekly-summary', headers={'X-API-Key': seeded_client.api_key})
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert summary['period']['days'] == 7
+    assert summary['period']['to'] == datetime.now(timezone.utc).date().isoformat()
+    assert summary['days_logged'] == 0 and summary['adherence_score'] == 0
+
+def test_diet_summary_rejects_bad_windows(seeded_client, test_user):
+    headers = {'X-API-Key': seeded_client.api_key}
+    for query in ("days=0", "days=abc", "from=2023-02-01&to=2023-01-01", "from=yesterday", "days=400"):
+        response = seeded_client.get(f'/api/diet/{test_user}/weekly-summary?{query}', headers=headers)
+        assert response.status_code == 400, query
@@ -0,0 +1,168 @@
+# tests/test_rule_based_planner.py
+
+import json
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import pytest
+from app.services.llm_client import llm_client, FakeBackend
+from app.services.rule_based_planner import (
+    DAYS, FOODS, MEAL_SPLIT, build_diet_plan, build_workout_plan, rule_based_calorie_adjustment,
+    call_within_budget, _budget_executor
+)
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+@pytest.mark.parametrize("target", [1500, 2200, 3000])
+def test_diet_plan_matches_the_prompt_shape_and_target(target):
+    plan = build_diet_plan(target, diet_type='veg', primary_goal='Weight loss')
+
+    assert list(plan['weekly_plan']) == list(DAYS)
+    assert plan['summary']['target_daily_calories'] == str(target)
+    for meals in plan['weekly_plan'].values():
+        assert list(meals) == [meal for meal, _ in MEAL_SPLIT]
+        assert all(set(entry) == {"items", "portion", "calories"} for entry in meals.values())
+        day_total = sum(entry['calories'] for entry in meals.values())
+        assert abs(day_total - target) <= target * 0.1
+
+def test_veg_plan_has_no_meat_or_eggs():
+    plan = build_diet_plan(2000, diet_type='veg')
+    items = " ".join(entry['items'].lower() for meals in plan['weekly_plan'].values() for entry in meals.values())
+    for word in ('egg', 'chicken', 'fish', 'omelette'):
+        assert word not in items
+
+def test_diet_plan_leaves_out_dislikes_and_allergens():
+    plan = build_diet_plan(2000, diet_type='non-veg', disliked_foods="Paneer, fish", allergies="peanuts")
+    items = " ".join(entry['items'].lower() for meals in plan['weekly_plan'].values() for entry in meals.values())
+    assert 'paneer' not in items
+    assert 'fish' not in items
+    assert 'peanut' not in items
+
+def test_diet_plan_leaves_out_dishes_tagged_with_an_allergen():
+    plan = build_diet_plan(2000, diet_type='veg', allergies="Lactose intolerant; peanuts")
+    items = {entry['items'] for meals in plan['weekly_plan'].values() for entry in meals.values()}
+    tagged = {food[2] for food in FOODS if {'dairy', 'peanut'} & set(food[5])}
+    assert items and not items & tagged
+    assert "Buttermilk with almonds" not in items  # no curd or milk in the name, but still dairy
+    assert "Roasted makhana" in items
+
+def test_diet_plan_refuses_when_exclusions_leave_a_meal_empty():
+    # Every veg breakfast has dal, dairy, gluten or peanuts in it
+    with pytest.raises(ValueError, match="breakfast"):
+        build_diet_plan(2000, diet_type='veg', disliked_foods="dal, idli", allergies="dairy, gluten, peanut")
+
+@pytest.mark.parametrize("per_week, training_days", [("3", 3), ("5 days", 5), ("3-4", 3), (None, 3), ("9", 6)])
+def test_workout_plan_schedules_rest_days(per_week, training_days):
+    plan = build_workout_plan('intermediate', 'Gym access', per_week, primary_goal='Build muscle')
+
+    schedule = plan['weekly_schedule']
+    assert list(schedule) == list(DAYS)
+    workouts = [day for day in schedule.values() if day['day_type'] != 'Rest']
+    assert len(workouts) == training_days
+    for day in workouts:
+        assert 1 <= len(day['exercises']) <= 7
+        for exercise in day['exercises']:
+            assert set(exercise) == {"name", "sets", "reps", "rest_seconds", "form_guidance"}
+
+def test_workout_plan_uses_the_equipment_and_level():
+    plan = build_workout_plan('advanced', 'bodyweight only', "6")
+    names = {exercise['name'] for day in plan['weekly_schedule'].values() for exercise in day.get('exercises', [])}
+    assert 'Bench press' not in names
+    assert 'Push-ups' in names
+    first_day = plan['weekly_schedule']['Monday']['exercises'][0]
+    assert (first_day['sets'], first_day['reps'], first_day['rest_seconds']) == (4, 8, 60)
+
+@pytest.mark.parametrize("goal, change, adherence, expected", [
+    ("Weight loss", 0.3, 90, -150),
+    ("Weight loss", -0.6, 90, 0),
+    ("Weight gain", -0.2, 85, 150),
+    ("Weight loss", 0.3, 40, 0),
+    ("Maintain weight", 0.8, 95, -100),
+])
+def test_rule_based_calorie_adjustment(goal, change, adherence, expected):
+    assert rule_based_calorie_adjustment(goal, change, adherence) == expected
+
+# --- Latency budget ---
+
+def test_budget_calls_get_the_remaining_budget_as_their_timeout():
+    timeout = call_within_budget(lambda timeout: timeout, 5)
+    assert 4 < timeout <= 5
+
+def test_budget_calls_still_queued_at_the_deadline_never_start():
+    release, started = threading.Event(), threading.Event()
+    try:
+        # Occupy every budget thread, then queue one more call behind them
+        for _ in range(_budget_executor._max_workers):
+            with pytest.raises(FutureTimeoutError):
+                call_within_budget(lambda timeout: release.wait(5), 0.01)
+        with pytest.raises(FutureTimeoutError):
+            call_within_budget(lambda timeout: started.set(), 0.05)
+    finally:
+        release.set()
+    assert not started.wait(0.2)
+
+# --- Planner modes ---
+
+@pytest.fixture
+def planner_mode(app, monkeypatch):
+    def _set(mode, budget=20):
+        monkeypatch.setitem(app.config, 'PLANNER_MODE', mode)
+        monkeypatch.setitem(app.config, 'PLANNER_LLM_BUDGET', budget)
+    return _set
+
+@pytest.fixture
+def backend():
+    """Installs a FakeBackend built from the given arguments; restored afterwards."""
+    previous = llm_client.set_backend(None)
+    def _install(responder=None, latency=0.0):
+        fake = FakeBackend(responder or (lambda prompt, json_output: json.dumps({"weekly_plan": {"from": "llm"}})), latency)
+        llm_client.set_backend(fake)
+        return fake
+    yield _install
+    llm_client.set_backend(previous)
+
+def _generate(seeded_client, user_id):
+    payload = {"user_id": user_id, "activityLevel": "moderatelyActive", "diet_type": "veg", "bypass_cache": True}
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    return seeded_client.post('/api/diet/generate-plan', headers=headers, data=json.dumps(payload))
+
+def test_rules_mode_never_calls_the_llm(seeded_client, test_user, planner_mode, backend):
+    planner_mode('rules')
+    fake = backend()
+    workout = seeded_client.post('/api/workout/generate-plan', data=json.dumps(
+        {"user_id": test_user, "fitnessLevel": "beginner", "equipment": "Home gym"}
+    ), headers={'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key})
+    diet = _generate(seeded_client, test_user)
+
+    assert diet.status_code == 200 and workout.status_code == 200
+    assert diet.headers['X-Plan-Source'] == 'rules'
+    assert len(diet.get_json()['weekly_plan']) == 7
+    assert 'weekly_schedule' in workout.get_json()
+    assert fake.calls == 0
+
+def test_rules_mode_works_without_an_llm_key(seeded_client, test_user, planner_mode, backend):
+    planner_mode('rules')  # no backend installed and no GEMINI_API_KEY
+    assert _generate(seeded_client, test_user).status_code == 200
+
+def test_fallback_mode_uses_the_llm_when_it_answers(seeded_client, test_user, planner_mode, backend):
+    planner_mode('fallback', budget=5)
+    backend()
+    response = _generate(seeded_client, test_user)
+    assert response.headers['X-Plan-Source'] == 'llm'
+    assert response.get_json() == {"weekly_plan": {"from": "llm"}}
+
+def test_fallback_mode_answers_from_rules_after_the_budget(seeded_client, test_user, planner_mode, backend):
+    planner_mode('fallback', budget=0.05)
+    backend(latency=1.0)
+    response = _generate(seeded_client, test_user)
+    assert response.status_code == 200
+    assert response.headers['X-Plan-Source'] == 'rules'
+
+def test_fallback_mode_answers_from_rules_when_the_llm_fails(seeded_client, test_user, planner_mode, backend):
+    def _down(prompt, json_output):
+        raise RuntimeError("Gemini is down")
+
+    planner_mode('fallback')
+    backend(_down)
+    response = _generate(seeded_client, test_user)
+    assert response.status_code == 200
+    assert response.headers['X-Plan-Source'] == 'rules'
@@ -0,0 +1,78 @@
+# tests/test_saved_plans.py
+
+import json
+import uuid
+import pytest
+from app.models import db, Client, User, DietPlan, WorkoutPlan
+from app.services.llm_client import llm_client, FakeBackend
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user, query_counter) from conftest.py
+
+@pytest.fixture
+def fake_llm(app):
+    calls = []
+
+    def _respond(prompt, json_output):
+        calls.append(prompt)
+        return json.dumps({"weekly_plan": {"Monday": {}}, "weekly_schedule": {"Monday": {}}, "call": len(calls)})
+
+    previous = llm_client.set_backend(FakeBackend(_respond))
+    yield calls
+    llm_client.set_backend(previous)
+
+def _headers(seeded_client):
+    return {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+
+def test_generated_diet_plan_is_saved_and_served(seeded_client, test_user, fake_llm):
+    payload = {"user_id": test_user, "activityLevel": "sedentary", "diet_type": "veg", "bypass_cache": True}
+    for _ in range(2):
+        response = seeded_client.post('/api/diet/generate-plan', headers=_headers(seeded_client), data=json.dumps(payload))
+        assert response.status_code == 200
+
+    assert DietPlan.query.filter_by(user_id=test_user).count() == 2
+
+    response = seeded_client.get(f'/api/diet/{test_user}/plan/latest', headers=_headers(seeded_client))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['user_id'] == test_user
+    assert body['generated_plan']['call'] == 2
+    assert len(fake_llm) == 2  # serving the latest plan never calls the LLM
+
+def test_latest_workout_plan_is_served(seeded_client, test_user, fake_llm):
+    payload = {"user_id": test_user, "fitnessLevel": "beginner", "equipment": "Home gym", "bypass_cache": True}
+    response = seeded_client.post('/api/workout/generate-plan', headers=_headers(seeded_client), data=json.dumps(payload))
+    assert response.status_code == 200
+
+    response = seeded_client.get(f'/api/workout/{test_user}/plan/latest', headers=_headers(seeded_client))
+    assert response.status_code == 200
+    assert response.get_json()['generated_plan']['call'] == len(fake_llm)
+
+@pytest.mark.parametrize("kind", ["diet", "workout"])
+def test_latest_plan_is_one_query(seeded_client, test_user, query_counter, kind):
+    user = db.session.get(User, test_user)
+    model = DietPlan if kind == 'diet' else WorkoutPlan
+    db.session.add(model(client_id=user.client_id, user_id=user.id, generated_plan={"n": 1}))
+    db.session.commit()
+
+    seeded_client.get(f'/api/{kind}/{test_user}/plan/latest', headers=_headers(seeded_client))  # warm the API key cache
+    with query_counter() as statements:
+        response = seeded_client.get(f'/api/{kind}/{test_user}/plan/latest', headers=_headers(seeded_client))
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+@pytest.mark.parametrize("kind", ["diet", "workout"])
+def test_latest_plan_not_found(seeded_client, test_user, kind):
+    response = seeded_client.get(f'/api/{kind}/{test_user}/plan/latest', headers=_headers(seeded_client))
+    assert response.status_code == 404
+
+def test_latest_plan_is_scoped_to_the_client(seeded_client, test_user):
+    other_tenant = Client(company_name=f"Other Plans Corp {uuid.uuid4().hex[:8]}")
+    db.session.add(other_tenant)
+    db.session.commit()
+    user = db.session.get(User, test_user)
+    db.session.add(DietPlan(client_id=user.client_id, user_id=user.id, generated_plan={"secret": True}))
+    db.session.commit()
+
+    response = seeded_client.get(f'/api/diet/{test_user}/plan/latest', headers={'X-API-Key': other_tenant.api_key})
+    assert response.status_code == 404
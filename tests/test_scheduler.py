@@ -0,0 +1,147 @@
+# tests/test_scheduler.py
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+import pytest
+from app.models import db, Client, JobRun, SchedulerLease
+from app.services.scheduler_service import JobScheduler
+from app.services.llm_client import llm_client, FakeBackend
+
+# Note: This file relies on the fixtures (app) from conftest.py
+
+@pytest.fixture()
+def scheduler(app):
+    """A scheduler standing in for one process, with a job that counts its runs."""
+    calls = []
+    scheduler = JobScheduler()
+    scheduler.init_app(app)
+    scheduler.calls = calls
+    return scheduler
+
+def _counting_job(calls, fail=False):
+    def _job(**kwargs):
+        calls.append(kwargs)
+        if fail:
+            raise RuntimeError("job exploded")
+        return {"processed": len(calls)}
+    return _job
+
+def test_job_run_is_recorded(scheduler):
+    scheduler.register('record_job', _counting_job(scheduler.calls), hour=2)
+    run = scheduler.run_job('record_job')
+
+    assert run['status'] == 'succeeded'
+    assert run['summary'] == {"processed": 1}
+    assert run['trigger'] == 'schedule'
+    assert run['finished_at'] is not None
+    assert JobRun.query.filter_by(job_name='record_job').count() == 1
+    # The lease is handed back once the job is done
+    lease = db.session.get(SchedulerLease, 'record_job')
+    db.session.refresh(lease)
+    assert lease.expires_at <= datetime.now(timezone.utc).replace(tzinfo=None)
+
+def test_only_the_lease_holder_runs_the_job(app, scheduler):
+    other_process = JobScheduler()
+    other_process.init_app(app)
+    with app.app_context():
+        assert other_process.acquire_lease('leased_job')
+
+    scheduler.register('leased_job', _counting_job(scheduler.calls), hour=2)
+    assert scheduler.run_job('leased_job') is None
+    assert scheduler.run_job('leased_job', force=True) is None
+    assert scheduler.calls == []
+    assert JobRun.query.filter_by(job_name='leased_job').count() == 0
+
+def test_expired_lease_is_taken_over(app, scheduler):
+    now = datetime.now(timezone.utc)
+    db.session.add(SchedulerLease(name='expired_job', holder='dead-host:1:abc',
+                                  acquired_at=now - timedelta(hours=7), expires_at=now - timedelta(hours=1)))
+    db.session.add(JobRun(job_name='expired_job', holder='dead-host:1:abc', started_at=now - timedelta(hours=7)))
+    db.session.commit()
+
+    scheduler.register('expired_job', _counting_job(scheduler.calls), hour=2)
+    assert scheduler.run_job('expired_job')['status'] == 'succeeded'
+    statuses = sorted(run.status for run in JobRun.query.filter_by(job_name='expired_job'))
+    assert statuses == ['abandoned', 'succeeded']
+
+def test_heartbeat_keeps_the_lease_while_a_long_job_runs(app, scheduler, monkeypatch):
+    scheduler.lease_ttl, scheduler.heartbeat_interval = 0.3, 0.05
+    # The test database is one SQLite connection shared by every thread, so the
+    # heartbeat and the job's own lease check take turns on it.
+    db_lock = threading.Lock()
+    renew_lease, renewals = scheduler.renew_lease, []
+    def _renew(name):
+        with db_lock:
+            renewals.append(renew_lease(name))
+            return renewals[-1]
+    monkeypatch.setattr(scheduler, 'renew_lease', _renew)
+
+    other_process = JobScheduler()
+    other_process.init_app(app)
+    seen = {}
+    def _long_job():
+        time.sleep(0.6)  # twice the lease TTL
+        with db_lock:
+            seen['other_process_took_lease'] = other_process.acquire_lease('long_job')
+        return {}
+
+    scheduler.register('long_job', _long_job, hour=2)
+    run = scheduler.run_job('long_job', force=True)
+
+    assert run['status'] == 'succeeded'
+    assert seen['other_process_took_lease'] is False
+    assert len(renewals) >= 3 and all(renewals)
+    # Nothing was marked abandoned while its holder was still renewing
+    assert [r.status for r in JobRun.query.filter_by(job_name='long_job')] == ['succeeded']
+
+def test_a_job_already_running_in_this_process_is_not_started_again(scheduler):
+    nested = {}
+    def _job():
+        nested['run'] = scheduler.run_job('reentrant_job', force=True)
+        return {}
+
+    scheduler.register('reentrant_job', _job, hour=2)
+    assert scheduler.run_job('reentrant_job')['status'] == 'succeeded'
+    assert nested['run'] is None
+    assert JobRun.query.filter_by(job_name='reentrant_job').count() == 1
+
+def test_recent_success_is_not_repeated_unless_forced(scheduler):
+    scheduler.register('weekly_like_job', _counting_job(scheduler.calls), hour=2)
+    assert scheduler.run_job('weekly_like_job') is not None
+    assert scheduler.run_job('weekly_like_job') is None
+    assert len(scheduler.calls) == 1
+
+    run = scheduler.run_job('weekly_like_job', force=True)
+    assert run['trigger'] == 'manual'
+    assert len(scheduler.calls) == 2
+
+def test_failed_job_is_recorded(scheduler):
+    scheduler.register('failing_job', _counting_job(scheduler.calls, fail=True), hour=2)
+    run = scheduler.run_job('failing_job')
+    assert run['status'] == 'failed'
+    assert run['error'] == "job exploded"
+
+    # A failure doesn't count as a recent success, so the next firing retries
+    assert scheduler.run_job('failing_job') is not None
+
+def test_cli_runs_the_weekly_job_on_demand(app):
+    tenant = Client(company_name="CLI Job Corp")
+    db.session.add(tenant)
+    db.session.commit()
+
+    previous = llm_client.set_backend(FakeBackend())
+    try:
+        result = app.test_cli_runner().invoke(args=['jobs', 'run', 'weekly_adaptive_planning', '--client-id', str(tenant.id)])
+    finally:
+        llm_client.set_backend(previous)
+
+    assert result.exit_code == 0, result.output
+    assert "succeeded" in result.output
+    run = JobRun.query.filter_by(job_name='weekly_adaptive_planning').order_by(JobRun.id.desc()).first()
+    assert run.trigger == 'manual'
+    assert run.summary['processed'] == 0
+
+def test_cli_rejects_unknown_jobs(app):
+    result = app.test_cli_runner().invoke(args=['jobs', 'run', 'no_such_job'])
+    assert result.exit_code != 0
+    assert "Unknown job" in result.output
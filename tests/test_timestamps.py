@@ -0,0 +1,52 @@
+# tests/test_timestamps.py
+import json
+from datetime import datetime, timezone
+import pytest
+from app.models import db, DietLog, WeightEntry, WorkoutLog, MeasurementLog
+from app.utils.timestamps import to_utc, parse_isoformat
+
+# Note: This file relies on the fixtures (app, seeded_client, test_user) from conftest.py
+
+def _post(seeded_client, url, payload):
+    headers = {'Content-Type': 'application/json', 'X-API-Key': seeded_client.api_key}
+    return seeded_client.post(url, headers=headers, data=json.dumps(payload))
+
+def test_to_utc_normalizes_offsets_and_dates():
+    assert to_utc("2023-03-01T09:30:00+05:30") == datetime(2023, 3, 1, 4, 0, tzinfo=timezone.utc)
+    assert to_utc("2023-03-01T04:00:00Z") == datetime(2023, 3, 1, 4, 0, tzinfo=timezone.utc)
+    assert to_utc("2023-03-01") == datetime(2023, 3, 1, tzinfo=timezone.utc)
+    assert to_utc(None) is None
+    with pytest.raises(ValueError):
+        to_utc("last tuesday")
+
+def test_parse_isoformat_accepts_z_on_every_python():
+    # datetime.fromisoformat only learned 'Z' in Python 3.11
+    expected = datetime(2023, 3, 1, 4, 0, tzinfo=timezone.utc)
+    assert parse_isoformat("2023-03-01T04:00:00Z") == expected
+    assert parse_isoformat("2023-03-01T04:00:00.250z") == expected.replace(microsecond=250000)
+    with pytest.raises(ValueError):
+        parse_isoformat("Z")
+
+@pytest.mark.parametrize("url, payload, model", [
+    ('/api/diet/log', {"meal_name": "Old breakfast", "calories": 400}, DietLog),
+    ('/api/progress/weight/log', {"weight_kg": 81.5}, WeightEntry),
+    ('/api/progress/measurements/log', {"waist_cm": 85}, MeasurementLog),
+    ('/api/workout/log', {"name": "Old workout", "exercises": [{"name": "Squat", "sets": 3, "reps": 5, "weight": 100}]}, WorkoutLog),
+])
+def test_single_log_routes_store_the_supplied_date(seeded_client, test_user, url, payload, model):
+    response = _post(seeded_client, url, dict(payload, user_id=test_user, date="2021-06-15T08:00:00-04:00"))
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+    row = model.query.filter_by(user_id=test_user).one()
+    db.session.refresh(row)
+    assert row.date == datetime(2021, 6, 15, 12, 0)
+
+def test_missing_date_defaults_to_now(seeded_client, test_user):
+    before = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert _post(seeded_client, '/api/diet/log', {"user_id": test_user, "meal_name": "Lunch", "calories": 600}).status_code == 201
+    assert DietLog.query.filter_by(user_id=test_user).one().date >= before.replace(microsecond=0)
+
+def test_invalid_date_is_rejected(seeded_client, test_user):
+    response = _post(seeded_client, '/api/progress/weight/log', {"user_id": test_user, "weight_kg": 80, "date": "yesterday"})
+    assert response.status_code == 400
+    assert "date" in response.get_json()['details'][0]['loc']